@@ -3,6 +3,26 @@ ASGI config for core project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Chế độ chạy: WSGI (core.wsgi) vẫn là đường chính cho các trang web và API ghi.
+Các endpoint polling/chỉ-đọc trong pms/async_views.py (bảng phòng, số yêu cầu
+mới, KPI, phòng trống, cổng QR) được viết async; chạy thêm một tiến trình ASGI
+song song và cho reverse proxy chuyển riêng các đường dẫn đó sang:
+
+    gunicorn core.wsgi:application --workers 3 --bind 127.0.0.1:8000
+    uvicorn core.asgi:application --workers 2 --host 127.0.0.1 --port 8001
+
+    # nginx
+    location ~ ^/(api/live/|ajax/new-requests-count/|guest/request/) {
+        proxy_pass http://127.0.0.1:8001;
+    }
+
+Cả hai tiến trình dùng chung settings/DB; nếu có nhiều tiến trình hãy đặt
+CACHE_LOCATION để cache (phiên bản danh mục, thế hệ xác thực) được chia sẻ.
+So sánh số kết nối đồng thời mỗi worker chịu được:
+
+    python manage.py bench_concurrency http://127.0.0.1:8000/api/live/dashboard/ --token ...
+    python manage.py bench_concurrency http://127.0.0.1:8001/api/live/dashboard/ --token ...
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
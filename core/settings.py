@@ -3,8 +3,10 @@ Django settings for core project.
 """
 
 from pathlib import Path
+from datetime import timedelta
 import os
 import dj_database_url # Thư viện hữu ích cho cấu hình database
+from django.core.exceptions import ImproperlyConfigured
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -45,12 +47,20 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Số liệu cho /metrics (chỉ chạy khi METRICS bật)
+    'pms.middleware.MetricsMiddleware',
+    # Đo SQL/template/tổng thời gian mỗi request (chỉ chạy khi REQUEST_TIMING bật)
+    'pms.middleware.RequestTimingMiddleware',
     # Thêm WhiteNoise ở vị trí này, ngay sau SecurityMiddleware
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    # Nén gzip cho phản hồi API lớn
+    'pms.middleware.ApiGZipMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # Profile theo yêu cầu cho superuser (chỉ chạy khi PROFILING bật)
+    'pms.middleware.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -61,8 +71,15 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
+            # Luôn dùng cached loader: template chỉ được parse một lần mỗi tiến trình.
+            # Khi DEBUG, runserver tự xóa cache này lúc file template đổi.
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -78,10 +95,16 @@ WSGI_APPLICATION = 'core.wsgi.application'
 
 # Database
 # Sử dụng biến môi trường DATABASE_URL nếu có (cho môi trường Production)
+# Kết nối được giữ lại giữa các request (DB_CONN_MAX_AGE giây, 0 = đóng sau mỗi
+# request) và được kiểm tra còn sống trước khi dùng lại.
+DB_CONN_MAX_AGE = int(os.environ.get('DB_CONN_MAX_AGE', '600'))
+
 if os.environ.get('DATABASE_URL'):
     DATABASES = {
         'default': dj_database_url.config(
-            default=os.environ.get('DATABASE_URL')
+            default=os.environ.get('DATABASE_URL'),
+            conn_max_age=DB_CONN_MAX_AGE,
+            conn_health_checks=True,
         )
     }
 else:
@@ -90,9 +113,59 @@ else:
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
             'NAME': BASE_DIR / 'db.sqlite3',
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
         }
     }
 
+# DB bản sao (tùy chọn) cho báo cáo/xuất file, xem pms/db_router.py
+if os.environ.get('DATABASE_REPLICA_URL'):
+    DATABASES['replica'] = dj_database_url.config(
+        env='DATABASE_REPLICA_URL',
+        conn_max_age=DB_CONN_MAX_AGE,
+        conn_health_checks=True,
+    )
+    # Khi chạy test, replica chỉ là bí danh của DB test default
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+
+# Pool kết nối của Django (chỉ PostgreSQL + psycopg 3): DB_POOL=1. Pool thay cho
+# kết nối bền nên CONN_MAX_AGE phải bằng 0. Cần psycopg[pool] (requirements.txt);
+# psycopg2 không hỗ trợ pool nên báo lỗi ngay khi khởi động thay vì lúc kết nối.
+if os.environ.get('DB_POOL') == '1':
+    try:
+        import psycopg_pool  # noqa: F401
+    except ImportError:
+        raise ImproperlyConfigured("DB_POOL=1 cần psycopg 3 kèm psycopg_pool: pip install 'psycopg[binary,pool]'") from None
+    for db in DATABASES.values():
+        if db['ENGINE'] == 'django.db.backends.postgresql':
+            db['CONN_MAX_AGE'] = 0
+            db.setdefault('OPTIONS', {})['pool'] = {
+                'min_size': int(os.environ.get('DB_POOL_MIN', '2')),
+                'max_size': int(os.environ.get('DB_POOL_MAX', '10')),
+            }
+
+# Cấu hình SQLite cho nhiều lễ tân ghi cùng lúc:
+# - WAL: đọc không chặn ghi; synchronous=NORMAL đủ an toàn khi đã dùng WAL.
+# - timeout: busy_timeout của SQLite, chờ khóa thay vì báo "database is locked".
+# - IMMEDIATE: mọi transaction.atomic() (check-out, đặt phòng...) lấy khóa ghi
+#   ngay khi BEGIN, tránh lỗi khi hai transaction cùng nâng từ đọc lên ghi.
+# WAL cần checkpoint định kỳ: python manage.py sqlite_checkpoint --every 300
+SQLITE_OPTIONS = {
+    'init_command': ';'.join([
+        'PRAGMA journal_mode=WAL',
+        'PRAGMA synchronous=NORMAL',
+        f"PRAGMA mmap_size={int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))}",
+        f"PRAGMA cache_size=-{int(os.environ.get('SQLITE_CACHE_KB', 64 * 1024))}",
+    ]),
+    'timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT', '20')),
+    'transaction_mode': 'IMMEDIATE',
+}
+for db in DATABASES.values():
+    if db['ENGINE'] == 'django.db.backends.sqlite3':
+        db['OPTIONS'] = {**SQLITE_OPTIONS, **db.get('OPTIONS', {})}
+
+DATABASE_ROUTERS = ['pms.db_router.ReplicaRouter']
+
 
 # Password validation (Giữ lại cấu hình mặc định)
 AUTH_PASSWORD_VALIDATORS = [
@@ -171,5 +244,154 @@ LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/login/'
 LOGIN_URL = 'login'
 
+# CẤU HÌNH CACHE
+# Mỗi thẻ phòng là một khóa cache: mặc định 300 khóa của Django không đủ cho lưới vài trăm phòng
+CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', '5000'))
+
+# Mặc định bộ nhớ trong tiến trình. Khi chạy nhiều worker gunicorn, đặt
+# CACHE_LOCATION (vd. /var/tmp/pms_cache) để các worker dùng chung cache (phiên đăng nhập, fragment).
+if os.environ.get('CACHE_LOCATION'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('CACHE_LOCATION'),
+            'OPTIONS': {'MAX_ENTRIES': CACHE_MAX_ENTRIES},
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'pms-default',
+            'OPTIONS': {'MAX_ENTRIES': CACHE_MAX_ENTRIES},
+        }
+    }
+
+# Số phiên bản của các cache trong bộ nhớ worker (danh mục, fragment, lịch giá): luôn dùng chung giữa
+# các worker, kể cả khi 'default' là LocMemCache, để ghi ở worker này làm mới mọi worker khác.
+# Mặc định file trên máy chủ; chạy nhiều máy thì trỏ VERSION_CACHE_LOCATION sang thư mục dùng chung
+# hoặc thay alias này bằng Redis/Memcached (kiểm tra: python manage.py check --deploy).
+CACHES['versions'] = {
+    'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+    'LOCATION': os.environ.get('VERSION_CACHE_LOCATION', BASE_DIR / '.cache' / 'versions'),
+    'TIMEOUT': None,
+    'OPTIONS': {'MAX_ENTRIES': CACHE_MAX_ENTRIES},
+}
+
+# Lưu trữ booking đã đóng (pms/archive.py, lệnh archive_reservations): booking Completed/Cancelled
+# kết thúc quá AFTER_DAYS ngày được chuyển sang bảng lưu trữ, mỗi transaction BATCH_SIZE booking
+ARCHIVE = {
+    'AFTER_DAYS': int(os.environ.get('ARCHIVE_AFTER_DAYS', '365')),
+    'BATCH_SIZE': int(os.environ.get('ARCHIVE_BATCH_SIZE', '500')),
+}
+
+# Ảnh giấy tờ khách (pms/photo_retention.py, lệnh retain_guest_photos): chuyển khỏi media
+# sau AFTER_DAYS ngày kể từ lần trả phòng cuối, vào DIR dạng file lẻ ('dir') hoặc tarball theo tháng ('tar.gz')
+PHOTO_RETENTION = {
+    'AFTER_DAYS': int(os.environ.get('PHOTO_RETENTION_DAYS', '180')),
+    'DIR': os.environ.get('PHOTO_COLD_DIR', BASE_DIR / 'cold_storage'),
+    'FORMAT': os.environ.get('PHOTO_COLD_FORMAT', 'dir'),
+    'BATCH_SIZE': int(os.environ.get('PHOTO_RETENTION_BATCH_SIZE', '100')),
+}
+
+# Lịch giá phòng theo ngày (pms/rates.py): số ngày trước/sau hôm nay được tính sẵn thành mảng giá,
+# đêm ngoài cửa sổ tính theo giá gốc của phòng
+RATES = {
+    'DAYS_BEFORE': int(os.environ.get('RATES_DAYS_BEFORE', '730')),
+    'DAYS_AFTER': int(os.environ.get('RATES_DAYS_AFTER', '1095')),
+}
+
+# Dự báo công suất (pms/forecast.py, /api/forecast/): học từ HISTORY_DAYS ngày gần nhất (cần hơn 2 năm
+# cho mô hình mùa vụ), pickup đo trên PICKUP_WINDOW_DAYS đêm vừa qua, dự báo HORIZON_DAYS ngày tới
+FORECAST = {
+    'HISTORY_DAYS': int(os.environ.get('FORECAST_HISTORY_DAYS', '740')),
+    'HORIZON_DAYS': int(os.environ.get('FORECAST_HORIZON_DAYS', '90')),
+    'PICKUP_WINDOW_DAYS': int(os.environ.get('FORECAST_PICKUP_WINDOW_DAYS', '182')),
+}
+
+# Thời gian giữ fragment template (thẻ phòng dashboard, hàng lịch đặt phòng), 0 = tắt.
+# Fragment hết hiệu lực theo phiên bản khi dữ liệu đổi, xem pms/fragments.py
+FRAGMENT_CACHE_SECONDS = int(os.environ.get('FRAGMENT_CACHE_SECONDS', '600'))
+
+# Phiên đăng nhập web: chỉ đọc session từ cache khi cache dùng chung giữa các worker
+# (nếu mỗi worker một LocMemCache thì đăng xuất ở worker này không xóa được cache ở worker khác)
+if os.environ.get('CACHE_LOCATION'):
+    SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
+# Xác thực có cache cho user của phiên web và token API (xem pms/authentication.py).
+# Giữ ModelBackend phía sau: phiên đăng nhập cũ lưu đường dẫn backend này trong _auth_user_backend,
+# bỏ đi thì mọi người dùng đang đăng nhập bị đăng xuất khi triển khai. Đăng nhập mới dùng backend có cache.
+AUTHENTICATION_BACKENDS = ['pms.authentication.CachedModelBackend', 'django.contrib.auth.backends.ModelBackend']
+
+# Hạn dùng của token API (ngày); đăng nhập lại khi quá nửa hạn sẽ nhận token mới
+API_TOKEN_TTL = timedelta(days=int(os.environ.get('API_TOKEN_TTL_DAYS', '30')))
+
+# Số reverse proxy tin cậy đứng trước ứng dụng (nginx, load balancer). 0 = bỏ qua X-Forwarded-For,
+# IP khách là REMOTE_ADDR; N > 0 = lấy địa chỉ thứ N tính từ phải sang trong X-Forwarded-For
+# (các địa chỉ bên trái do khách tự gửi nên không tin được)
+TRUSTED_PROXY_COUNT = int(os.environ.get('TRUSTED_PROXY_COUNT', '0'))
+
+# CẤU HÌNH DJANGO REST FRAMEWORK
+# Phân trang keyset (created_at, id) cho mọi ViewSet, không COUNT(*) mỗi trang
+REST_FRAMEWORK = {
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'pms.authentication.CachedTokenAuthentication',
+        'rest_framework.authentication.SessionAuthentication',
+    ],
+    'DEFAULT_PAGINATION_CLASS': 'pms.pagination.KeysetPagination',
+    # orjson + tùy chọn dạng cột (?format=columnar) cho App
+    'DEFAULT_RENDERER_CLASSES': [
+        'pms.renderers.FastJSONRenderer',
+        'pms.renderers.ColumnarJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+}
+
+# ĐO HIỆU NĂNG TỪNG REQUEST (pms/middleware.py: RequestTimingMiddleware)
+# Bật bằng REQUEST_TIMING=1. Header Server-Timing lộ số truy vấn/thời gian DB:
+# đặt REQUEST_TIMING_HEADER=0 nếu không muốn trả cho client.
+# Dòng log "slow_request {...}" (logger pms.performance) khi vượt một trong các ngưỡng.
+REQUEST_TIMING = {
+    'ENABLED': os.environ.get('REQUEST_TIMING') == '1',
+    'SERVER_TIMING_HEADER': os.environ.get('REQUEST_TIMING_HEADER', '1') == '1',
+    'SLOW_REQUEST_MS': float(os.environ.get('SLOW_REQUEST_MS', '500')),
+    'SLOW_QUERY_COUNT': int(os.environ.get('SLOW_QUERY_COUNT', '50')),
+    # Cùng một câu SQL (khác tham số) chạy từ chừng này lần trở lên: nghi N+1
+    'DUPLICATE_QUERY_THRESHOLD': int(os.environ.get('DUPLICATE_QUERY_THRESHOLD', '10')),
+}
+
+# PROFILE THEO YÊU CẦU (pms/profiling.py): bật bằng PROFILING=1, superuser gửi
+# header "X-Profile: 1" hoặc ?_profile=1 (cprofile: profiler tất định). Xem ở /admin/profiles/.
+PROFILING = {
+    'ENABLED': os.environ.get('PROFILING') == '1',
+    'DIR': os.environ.get('PROFILE_DIR', os.path.join(BASE_DIR, 'profiles')),
+    'MAX_PER_HOUR': int(os.environ.get('PROFILE_MAX_PER_HOUR', '30')),
+    'INTERVAL_MS': float(os.environ.get('PROFILE_INTERVAL_MS', '5')),
+    'KEEP': int(os.environ.get('PROFILE_KEEP', '200')),
+}
+
+# SỐ LIỆU PROMETHEUS (pms/metrics.py): bật bằng METRICS=1, Prometheus scrape /metrics.
+# STORE là file SQLite dùng chung cho mọi worker gunicorn trên cùng máy.
+# Đặt METRICS_TOKEN để bắt buộc header "Authorization: Bearer <token>"; không đặt thì
+# chỉ tài khoản is_staff đã đăng nhập xem được /metrics.
+METRICS = {
+    'ENABLED': os.environ.get('METRICS') == '1',
+    'STORE': os.environ.get('METRICS_STORE', os.path.join(BASE_DIR, 'metrics.sqlite3')),
+    'TOKEN': os.environ.get('METRICS_TOKEN', ''),
+    'FLUSH_SECONDS': float(os.environ.get('METRICS_FLUSH_SECONDS', '1')),
+    'GAUGE_REBUILD_SECONDS': int(os.environ.get('METRICS_GAUGE_REBUILD_SECONDS', '3600')),
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'pms.performance': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
\ No newline at end of file
@@ -19,7 +19,12 @@ from django.urls import path, include
 from django.conf import settings             # <--- Thêm
 from django.conf.urls.static import static
 
+from pms.admin import profile_download_view, profile_list_view
+
 urlpatterns = [
+    # Trang admin riêng của PMS, phải đứng trước admin.site.urls
+    path('admin/profiles/', admin.site.admin_view(profile_list_view), name='admin-profiles'),
+    path('admin/profiles/<str:profile_id>/', admin.site.admin_view(profile_download_view), name='admin-profile-download'),
     path('admin/', admin.site.urls),
     path('', include('pms.urls')),
 ]
@@ -1,5 +1,12 @@
+from django.conf import settings
 from django.contrib import admin
-from .models import Hotel, Room, Guest, Reservation, ServiceCharge, GuestRequest, StaffSchedule
+from django.core.exceptions import PermissionDenied
+from django.http import FileResponse, Http404
+from django.template.response import TemplateResponse
+
+from .models import Hotel, Room, Guest, Reservation, ServiceCharge, GuestRequest, StaffSchedule, RateRule
+from .models import ArchivedGuestRequest, ArchivedReservation, ArchivedServiceCharge
+from .profiling import list_profiles, profile_path
 
 # Đăng ký lại đơn giản
 admin.site.register(Hotel)
@@ -8,4 +15,40 @@ admin.site.register(Guest)
 admin.site.register(Reservation)
 admin.site.register(ServiceCharge)
 admin.site.register(GuestRequest)
-admin.site.register(StaffSchedule)
\ No newline at end of file
+admin.site.register(StaffSchedule)
+admin.site.register(RateRule)
+
+
+# Dữ liệu đã lưu trữ (pms/archive.py): chỉ xem
+@admin.register(ArchivedReservation, ArchivedServiceCharge, ArchivedGuestRequest)
+class ArchiveAdmin(admin.ModelAdmin):
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+# Trang xem các profile hiệu năng (pms/profiling.py), chỉ superuser
+def _require_superuser(request):
+    if not request.user.is_superuser:
+        raise PermissionDenied
+
+
+def profile_list_view(request):
+    _require_superuser(request)
+    context = {
+        **admin.site.each_context(request),
+        'title': "Profile hiệu năng",
+        'profiles': list_profiles(),
+        'enabled': settings.PROFILING['ENABLED'],
+        'max_per_hour': settings.PROFILING['MAX_PER_HOUR'],
+    }
+    return TemplateResponse(request, 'admin/pms/profiles.html', context)
+
+
+def profile_download_view(request, profile_id):
+    _require_superuser(request)
+    path = profile_path(profile_id)
+    if path is None:
+        raise Http404
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=path.name)
@@ -1,15 +1,26 @@
 from rest_framework import viewsets, status, filters
+from rest_framework.decorators import action
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.authentication import TokenAuthentication 
+from rest_framework.authtoken.models import Token
+from rest_framework.authtoken.views import ObtainAuthToken
 from django.shortcuts import get_object_or_404
+from django.http import Http404
+from django.utils.cache import parse_etags
+from django.urls import reverse
 from django.utils import timezone
 from datetime import timedelta 
 from django.db.models import Q, Sum
 from django.db import transaction
 
 from .models import Room, Guest, Reservation, ServiceItem, GuestRequest, ServiceCharge, StaffSchedule
+from .lookup import lookup_guests
+from .eager_loading import EagerLoadingMixin, eager_loading_plan
+from .authentication import CachedTokenAuthentication, token_expires_at, token_needs_rotation
+from .pagination import KEY_FIELDS, DEFAULT_PAGE_SIZE, keyset_page
+from . import catalog, forecast, quotes, rates
+from .kpi import get_kpis
 from .serializers import (
     RoomSerializer, GuestSerializer, ReservationSerializer, 
     ServiceItemSerializer, GuestRequestSerializer,
@@ -17,58 +28,69 @@ from .serializers import (
 )
 
 # --- 1. API cho Dashboard (Danh sách phòng & Trạng thái) ---
-class DashboardAPIView(APIView):
-    authentication_classes = [TokenAuthentication]
-    permission_classes = [IsAuthenticated] 
-
-    def get(self, request):
-        rooms = Room.objects.all().order_by('room_number')
-        room_data = []
+CHECKIN_ALERT_WINDOW = timedelta(minutes=30)
+
+def current_reservations_queryset():
+    """Booking đang hiệu lực, sớm nhất trước; room_board giữ booking đầu tiên của mỗi phòng."""
+    return Reservation.objects.filter(status__in=['Confirmed', 'Occupied']).select_related('guest').order_by('check_in_date')
+
+def dashboard_data():
+    """Danh sách phòng + booking hiện tại; dùng chung cho Dashboard và Bootstrap."""
+    # Một truy vấn cho mọi phòng thay vì một truy vấn mỗi phòng
+    return room_board(Room.objects.all().order_by('room_number'), current_reservations_queryset())
+
+def room_board(rooms, current_reservations):
+    """Dựng dữ liệu bảng phòng từ các đối tượng đã nạp sẵn (không truy vấn thêm)."""
+    room_data = []
+    current_by_room = {}
+    for res in current_reservations:
+        current_by_room.setdefault(res.room_id, res)
+
+    now = timezone.now()
+    for room in rooms:
+        current_res = current_by_room.get(room.id)
+        is_alerting = False
+        guest_name = ""
+        reservation_id = None
         
-        active_reservations = Reservation.objects.filter(
-            status__in=['Confirmed', 'Occupied']
-        ).select_related('guest')
-
-        CHECKIN_ALERT_WINDOW = timedelta(minutes=30) 
+        status_display = room.get_status_display()
 
-        for room in rooms:
-            current_res = active_reservations.filter(room=room).first()
-            is_alerting = False
-            guest_name = ""
-            reservation_id = None
+        if current_res:
+            guest_name = current_res.guest.full_name
+            reservation_id = current_res.id
             
-            status_display = room.get_status_display()
-
-            if current_res:
-                guest_name = current_res.guest.full_name
-                reservation_id = current_res.id
-                
-                if current_res.status == 'Confirmed':
-                    status_display = "Đã đặt (Vàng)"
-                    time_until_checkin = current_res.check_in_date - timezone.now()
-                    if time_until_checkin < CHECKIN_ALERT_WINDOW and time_until_checkin > timedelta(0):
-                        is_alerting = True
-                
-                elif current_res.status == 'Occupied':
-                     status_display = "Đang có khách (Đỏ)"
+            if current_res.status == 'Confirmed':
+                status_display = "Đã đặt (Vàng)"
+                time_until_checkin = current_res.check_in_date - now
+                if time_until_checkin < CHECKIN_ALERT_WINDOW and time_until_checkin > timedelta(0):
+                    is_alerting = True
             
-            room_data.append({
-                'room_id': room.id,
-                'room_number': room.room_number,
-                'room_type': room.room_type,
-                'price': room.price_per_night,
-                'status': room.status,           
-                'status_display': status_display,
-                'guest_name': guest_name,       
-                'reservation_id': reservation_id,
-                'is_alerting': is_alerting
-            })
+            elif current_res.status == 'Occupied':
+                 status_display = "Đang có khách (Đỏ)"
         
-        return Response(room_data)
+        room_data.append({
+            'room_id': room.id,
+            'room_number': room.room_number,
+            'room_type': room.room_type,
+            'price': room.price_per_night,
+            'status': room.status,           
+            'status_display': status_display,
+            'guest_name': guest_name,       
+            'reservation_id': reservation_id,
+            'is_alerting': is_alerting
+        })
+    return room_data
+
+class DashboardAPIView(APIView):
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated] 
+
+    def get(self, request):
+        return Response(dashboard_data())
 
 # --- 2. API Chi tiết 1 Phòng ---
 class RoomDetailAPIView(APIView):
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
 
     def get(self, request, room_id):
@@ -77,7 +99,7 @@ class RoomDetailAPIView(APIView):
         current_res = Reservation.objects.filter(
             room=room, 
             status__in=['Confirmed', 'Occupied']
-        ).select_related('guest').first()
+        ).select_related('guest', 'room').first()
 
         serializer = RoomSerializer(room)
         data = serializer.data
@@ -90,22 +112,34 @@ class RoomDetailAPIView(APIView):
             
         return Response(data)
 
+def catalog_response(request, entry):
+    """Trả danh mục từ cache kèm ETag; client gửi If-None-Match đúng thì nhận 304."""
+    client_etags = {etag.removeprefix('W/') for etag in parse_etags(request.headers.get('If-None-Match', ''))}
+    response = Response(status=status.HTTP_304_NOT_MODIFIED) if entry.etag in client_etags else Response(entry.data)
+    response['ETag'] = entry.etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
 # --- 3. Các ViewSets cơ bản ---
-class ServiceItemViewSet(viewsets.ModelViewSet):
-    authentication_classes = [TokenAuthentication]
+class ServiceItemViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated] 
     queryset = ServiceItem.objects.all()
     serializer_class = ServiceItemSerializer
+    pagination_class = None  # Danh mục nhỏ, không có created_at -> trả về toàn bộ
+
+    def list(self, request, *args, **kwargs):
+        return catalog_response(request, catalog.get_catalog('services'))
 
-class GuestRequestViewSet(viewsets.ModelViewSet):
-    authentication_classes = [TokenAuthentication]
+class GuestRequestViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
     queryset = GuestRequest.objects.all().order_by('-created_at')
     serializer_class = GuestRequestSerializer
 
 # --- 4. API Thêm Dịch Vụ ---
 class AddServiceChargeAPIView(APIView):
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
@@ -133,7 +167,7 @@ class AddServiceChargeAPIView(APIView):
     
 # --- 5. API Check-out ---
 class CheckoutAPIView(APIView):
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
 
     def get(self, request, reservation_id):
@@ -149,7 +183,7 @@ class CheckoutAPIView(APIView):
             num_nights += 1
         if num_nights == 0: num_nights = 1
 
-        total_room_cost = num_nights * room.price_per_night
+        total_room_cost, price_per_night = rates.quote_room(room, reservation.check_in_date, num_nights)
         service_charges = ServiceCharge.objects.filter(reservation=reservation)
         total_service_cost = sum(charge.total_price for charge in service_charges)
         final_bill = total_room_cost + total_service_cost
@@ -160,7 +194,7 @@ class CheckoutAPIView(APIView):
             "check_in": reservation.check_in_date,
             "check_out_now": check_out_time,
             "num_nights": num_nights,
-            "price_per_night": room.price_per_night,
+            "price_per_night": price_per_night,
             "total_room_cost": total_room_cost,
             "total_service_cost": total_service_cost,
             "final_bill": final_bill
@@ -179,13 +213,13 @@ class CheckoutAPIView(APIView):
         reservation.save()
 
         room.status = 'Vacant' # Hoặc 'Dirty' nếu muốn quy trình dọn dẹp
-        room.save()
+        room.save(update_fields=['status'])
 
         return Response({"message": f"Đã trả phòng {room.room_number} thành công. Tổng thu: {request.data.get('final_bill', 0)}"})
 
 # --- 6. API Check-in (Cho khách đã đặt trước) ---
 class CheckinAPIView(APIView):
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
 
     def post(self, request, reservation_id):
@@ -200,13 +234,13 @@ class CheckinAPIView(APIView):
         reservation.save()
 
         room.status = 'Occupied'
-        room.save()
+        room.save(update_fields=['status'])
 
         return Response({"message": f"Check-in thành công cho phòng {room.room_number}"})
     
 # --- 7. API Walk-in Check-in (Khách vãng lai) ---
 class WalkInCheckinAPIView(APIView):
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
 
     def post(self, request, room_id):
@@ -255,7 +289,7 @@ class WalkInCheckinAPIView(APIView):
                 )
 
                 room.status = 'Occupied'
-                room.save()
+                room.save(update_fields=['status'])
 
             return Response({"message": f"Check-in thành công phòng {room.room_number}"})
             
@@ -267,17 +301,22 @@ class WalkInCheckinAPIView(APIView):
 # ==========================================================
 
 # --- 8. API Quản lý Khách hàng (CRUD) ---
-class GuestViewSet(viewsets.ModelViewSet):
-    authentication_classes = [TokenAuthentication]
+class GuestViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
     queryset = Guest.objects.all().order_by('-created_at')
     serializer_class = GuestSerializer
     filter_backends = [filters.SearchFilter]
     search_fields = ['full_name', 'phone', 'id_number']
 
+    @action(detail=False, methods=['get'])
+    def lookup(self, request):
+        """Gợi ý khách cũ theo tiền tố CCCD/SĐT: /api/guests/lookup/?q=079"""
+        return Response({'results': lookup_guests(request.query_params.get('q', ''))})
+
 # --- 9. API Quản lý Đặt phòng (Tạo, Xem, Hủy) ---
-class BookingViewSet(viewsets.ModelViewSet):
-    authentication_classes = [TokenAuthentication]
+class BookingViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
     queryset = Reservation.objects.all().order_by('-created_at')
     serializer_class = ReservationSerializer
@@ -320,9 +359,12 @@ class BookingViewSet(viewsets.ModelViewSet):
             
             if room.status == 'Vacant':
                 room.status = 'Booked'
-                room.save()
+                room.save(update_fields=['status'])
 
-            return Response(ReservationSerializer(reservation).data, status=status.HTTP_201_CREATED)
+            data = ReservationSerializer(reservation).data
+            nights = rates.booking_nights(reservation.check_in_date, reservation.check_out_date)
+            data['quoted_room_cost'], _ = rates.quote_room(room, reservation.check_in_date, nights)
+            return Response(data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     def destroy(self, request, *args, **kwargs):
@@ -337,39 +379,150 @@ class BookingViewSet(viewsets.ModelViewSet):
         room = reservation.room
         if room.status == 'Booked':
             room.status = 'Vacant'
-            room.save()
+            room.save(update_fields=['status'])
             
         return Response({"message": "Đã hủy đặt phòng thành công"})
 
 # --- 10. API Xem lịch làm việc ---
+def staff_schedule_data():
+    today = timezone.now().date()
+    schedules = StaffSchedule.objects.filter(date__gte=today).order_by('date')
+    return StaffScheduleSerializer(schedules, many=True).data
+
 class StaffScheduleAPIView(APIView):
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        today = timezone.now().date()
-        schedules = StaffSchedule.objects.filter(date__gte=today).order_by('date')
-        serializer = StaffScheduleSerializer(schedules, many=True)
-        return Response(serializer.data)
+        return Response(staff_schedule_data())
 
 # --- 11. API Thống kê nhanh ---
+def management_stats_data(hotel_id=None):
+    """Một truy vấn mỗi bảng + micro-cache vài giây (xem kpi.py)."""
+    return get_kpis(hotel_id)
+
 class ManagementStatsAPIView(APIView):
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        today = timezone.now().date()
-        
-        completed_bookings = Reservation.objects.filter(
-            status='Completed', 
-            check_out_date__date=today
-        )
-        
+        hotel_id = request.query_params.get('hotel')
+        if hotel_id is not None and not hotel_id.isdigit():
+            return Response({"error": "Mã khách sạn không hợp lệ."}, status=400)
+        return Response(management_stats_data(int(hotel_id) if hotel_id else None))
+
+# --- 12. API Danh mục (dịch vụ, cấu hình phòng, nhân viên) có cache ---
+class CatalogVersionAPIView(APIView):
+    """App gọi một request nhỏ này để biết danh mục nào cần tải lại."""
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        return Response(catalog.get_versions())
+
+class CatalogAPIView(APIView):
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, name):
+        if name not in catalog.CATALOGS:
+            raise Http404
+        return catalog_response(request, catalog.get_catalog(name))
+
+# --- 13. API Bootstrap: gộp các lệnh gọi lúc App khởi động vào một request ---
+class BootstrapAPIView(APIView):
+    """
+    Thay cho 5 request riêng lẻ (dashboard, services, staff-schedule,
+    management-stats, guest-requests): xác thực token một lần, danh mục dịch
+    vụ và thống kê lấy từ cache trong tiến trình. Chọn phần cần lấy bằng
+    ?sections=dashboard,services
+    """
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+    SECTIONS = ('dashboard', 'services', 'staff_schedule', 'management_stats', 'guest_requests')
+
+    def get(self, request):
+        requested = request.query_params.get('sections')
+        sections = [name for name in requested.split(',') if name in self.SECTIONS] if requested else self.SECTIONS
+
+        data = {'catalog_versions': catalog.get_versions()}
+        if 'dashboard' in sections:
+            data['dashboard'] = dashboard_data()
+        if 'services' in sections:
+            data['services'] = catalog.get_catalog('services').data
+        if 'staff_schedule' in sections:
+            data['staff_schedule'] = staff_schedule_data()
+        if 'management_stats' in sections:
+            data['management_stats'] = management_stats_data()
+        if 'guest_requests' in sections:
+            data['guest_requests'] = self.guest_requests_page(request)
+        return Response(data)
+
+    def guest_requests_page(self, request):
+        plan = eager_loading_plan(GuestRequestSerializer())
+        plan.only.update(KEY_FIELDS)
+        rows, next_cursor, _ = keyset_page(plan.apply(GuestRequest.objects.all()), None, DEFAULT_PAGE_SIZE)
+        next_url = None
+        if next_cursor:
+            next_url = request.build_absolute_uri(f"{reverse('guestrequest-list')}?cursor={next_cursor}")
+        return {
+            'next': next_url,
+            'previous': None,
+            'results': GuestRequestSerializer(rows, many=True).data,
+        }
+
+# --- 14. API Đăng nhập / Đăng xuất (token có hạn dùng) ---
+class LoginAPIView(ObtainAuthToken):
+    """Như obtain_auth_token nhưng token quá nửa hạn dùng sẽ được cấp mới."""
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user = serializer.validated_data['user']
+        with transaction.atomic():
+            token, created = Token.objects.get_or_create(user=user)
+            if not created and token_needs_rotation(token):
+                token.delete()
+                token = Token.objects.create(user=user)
+        return Response({'token': token.key, 'expires_at': token_expires_at(token.created)})
+
+class LogoutAPIView(APIView):
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        Token.objects.filter(key=request.auth.key).delete()
+        return Response({"message": "Đã đăng xuất."})
+
+# --- 15. API Báo giá hàng loạt (nhiều phòng/loại phòng x khoảng ngày, xem pms/quotes.py) ---
+class QuoteAPIView(APIView):
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        """{"lines": [{"room_id" | "room_type" [+ "hotel_id"], "check_in", "check_out"}, ...]}"""
+        # Thân JSON không phải object (vd. một mảng): báo lỗi như khi thiếu 'lines'
+        raw_lines = request.data.get('lines') if isinstance(request.data, dict) else None
+        try:
+            lines = quotes.parse_lines(raw_lines)
+        except quotes.InvalidQuote as exc:
+            return Response({"error": str(exc)}, status=400)
+        results = quotes.quote(lines)
         return Response({
-            "total_rooms": Room.objects.count(),
-            "occupied_rooms": Room.objects.filter(status='Occupied').count(),
-            "vacant_rooms": Room.objects.filter(status='Vacant').count(),
-            "guests_in_house": Reservation.objects.filter(status='Occupied').count(),
-            "pending_requests": GuestRequest.objects.filter(status='New').count(),
-            "today_checkouts": completed_bookings.count()
-        })
\ No newline at end of file
+            'lines': results,
+            'available_total': sum(line['total'] for line in results if line.get('available')),
+        })
+
+# --- 16. API Dự báo công suất 90 ngày (xem pms/forecast.py) ---
+class ForecastAPIView(APIView):
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        hotel_id = request.query_params.get('hotel')
+        if hotel_id is not None and not hotel_id.isdigit():
+            return Response({"error": "Mã khách sạn không hợp lệ."}, status=400)
+        result = forecast.get_forecast(int(hotel_id) if hotel_id else None)
+        if result is None:
+            raise Http404
+        return Response(result)
@@ -0,0 +1,121 @@
+"""
+Lưu trữ nóng/lạnh cho booking.
+
+Booking đã đóng (Completed/Cancelled) có ngày trả phòng (hoặc ngày nhận phòng
+nếu không có) cũ hơn mốc cắt được chuyển sang ArchivedReservation, kèm phụ phí,
+danh sách khách ở và yêu cầu của khách, rồi xóa khỏi bảng nghiệp vụ. Mỗi lô
+chạy trong một transaction riêng nên dừng giữa chừng không để lại dữ liệu nửa
+vời, chạy lại thì làm tiếp từ chỗ còn lại. Id được giữ nguyên khi chuyển.
+
+Nghiệp vụ lễ tân (dashboard, lịch đặt phòng, hóa đơn, check-in/out, tra cứu
+khách) chỉ đọc bảng nóng qua các model gốc: chúng chỉ làm việc với booking
+Confirmed/Occupied, vốn không bao giờ bị lưu trữ. Báo cáo đọc cả hai nơi qua
+stays_history(), service_revenue(), service_charges() ở dưới, KPI (kpi.py) và
+dự báo (forecast.py).
+
+Chạy định kỳ:  python manage.py archive_reservations [--days 365] [--batch-size 500]
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q, Sum
+from django.utils import timezone
+
+from .models import (
+    ArchivedGuestRequest, ArchivedReservation, ArchivedServiceCharge,
+    GuestRequest, Reservation, ServiceCharge,
+)
+
+CLOSED_STATUSES = ('Completed', 'Cancelled')
+
+RESERVATION_FIELDS = ('id', 'room_id', 'guest_id', 'check_in_date', 'check_out_date', 'deposit', 'status', 'note', 'created_at')
+CHARGE_FIELDS = ('id', 'reservation_id', 'item_name', 'quantity', 'price', 'created_at')
+REQUEST_FIELDS = ('id', 'room_id', 'reservation_id', 'content', 'status', 'assigned_staff_id', 'created_at')
+
+
+def default_cutoff():
+    return timezone.now() - timedelta(days=settings.ARCHIVE['AFTER_DAYS'])
+
+
+def archivable(cutoff):
+    """Booking đã đóng, kết thúc trước mốc cắt."""
+    return Reservation.objects.filter(status__in=CLOSED_STATUSES).filter(
+        Q(check_out_date__lt=cutoff) | Q(check_out_date__isnull=True, check_in_date__lt=cutoff)
+    )
+
+
+@transaction.atomic
+def archive_batch(reservation_ids):
+    """Chuyển một lô booking (kèm dữ liệu con) sang bảng lưu trữ. Trả về số booking đã chuyển."""
+    # Khóa và đọc lại trong transaction: booking có thể vừa bị sửa/xóa sau khi chọn lô
+    reservations = list(Reservation.objects.select_for_update().filter(
+        pk__in=reservation_ids, status__in=CLOSED_STATUSES).values(*RESERVATION_FIELDS))
+    ids = [row['id'] for row in reservations]
+    if not ids:
+        return 0
+    ArchivedReservation.objects.bulk_create([ArchivedReservation(**row) for row in reservations])
+    ArchivedServiceCharge.objects.bulk_create([
+        ArchivedServiceCharge(**row) for row in ServiceCharge.objects.filter(reservation_id__in=ids).values(*CHARGE_FIELDS)
+    ])
+    ArchivedOccupant = ArchivedReservation.occupants.through
+    ArchivedOccupant.objects.bulk_create([
+        ArchivedOccupant(archivedreservation_id=reservation_id, guest_id=guest_id)
+        for reservation_id, guest_id in Reservation.occupants.through.objects.filter(
+            reservation_id__in=ids).values_list('reservation_id', 'guest_id')
+    ])
+    ArchivedGuestRequest.objects.bulk_create([
+        ArchivedGuestRequest(**row) for row in GuestRequest.objects.filter(reservation_id__in=ids).values(*REQUEST_FIELDS)
+    ])
+    # Xóa con trước để Reservation.delete() không phải gom lại (GuestRequest là SET_NULL)
+    GuestRequest.objects.filter(reservation_id__in=ids).delete()
+    ServiceCharge.objects.filter(reservation_id__in=ids).delete()
+    Reservation.objects.filter(pk__in=ids).delete()
+    return len(ids)
+
+
+def archive_reservations(cutoff=None, batch_size=None, progress=None):
+    """Chuyển mọi booking đủ điều kiện theo từng lô. Trả về tổng số booking đã chuyển."""
+    cutoff = cutoff or default_cutoff()
+    batch_size = batch_size or settings.ARCHIVE['BATCH_SIZE']
+    total = 0
+    while True:
+        ids = list(archivable(cutoff).order_by('id').values_list('id', flat=True)[:batch_size])
+        if not ids:
+            break
+        moved = archive_batch(ids)
+        if not moved:
+            break  # cả lô vừa bị đổi trạng thái: không còn gì để chuyển
+        total += moved
+        if progress:
+            progress(total)
+    return total
+
+
+# --- Đọc cho báo cáo: bảng nóng + bảng lưu trữ ---
+
+def stays_history(**filters):
+    """(check_in, check_out, giá phòng) của các booking khớp filters ở cả hai nơi."""
+    fields = ('check_in_date', 'check_out_date', 'room__price_per_night')
+    # order_by(): UNION không cho ORDER BY (Meta.ordering) trong từng vế
+    return Reservation.objects.filter(**filters).order_by().values_list(*fields).union(
+        ArchivedReservation.objects.filter(**filters).order_by().values_list(*fields), all=True
+    )
+
+
+def service_revenue(**reservation_filters):
+    """Tổng đơn giá phụ phí của các booking khớp filters ở cả hai nơi."""
+    lookups = {f'reservation__{key}': value for key, value in reservation_filters.items()}
+    hot = ServiceCharge.objects.filter(**lookups).aggregate(total=Sum('price'))['total'] or 0
+    cold = ArchivedServiceCharge.objects.filter(**lookups).aggregate(total=Sum('price'))['total'] or 0
+    return hot + cold
+
+
+def service_charges(**filters):
+    """Các khoản phụ phí khớp filters (kèm booking, phòng, khách) ở cả hai nơi, mới nhất trước."""
+    related = ('reservation__room', 'reservation__guest')
+    charges = [
+        *ServiceCharge.objects.filter(**filters).select_related(*related),
+        *ArchivedServiceCharge.objects.filter(**filters).select_related(*related),
+    ]
+    return sorted(charges, key=lambda charge: (charge.created_at, charge.id), reverse=True)
@@ -0,0 +1,112 @@
+"""
+View async cho các endpoint chỉ-đọc được gọi liên tục (polling, quét QR).
+
+Chạy dưới ASGI (xem core/asgi.py) mỗi request chờ DB bằng ORM async nên một
+worker giữ được hàng trăm kết nối chậm/long-poll thay vì mỗi kết nối chiếm
+trọn một worker gunicorn sync. Dưới WSGI các view này vẫn chạy đúng (Django
+tự bọc async_to_sync), chỉ không có lợi ích về số kết nối đồng thời.
+
+API dùng chung định dạng JSON với bản DRF (FastJSONRenderer) và xác thực
+bằng cùng token có cache (CachedTokenAuthentication.aauthenticate).
+"""
+from functools import wraps
+
+from django.contrib.auth.decorators import login_required
+from django.http import Http404, HttpResponse, JsonResponse
+from django.shortcuts import render
+from rest_framework import exceptions
+
+from .api_views import current_reservations_queryset, room_board
+from .authentication import CachedTokenAuthentication
+from .availability import InvalidStay, available_rooms, parse_stay
+from .kpi import aget_kpis
+from .models import GuestRequest, Room
+from .portal import aget_portal_stay, allow_submission, asubmit_request, client_ip
+from .renderers import FastJSONRenderer
+
+_renderer = FastJSONRenderer()
+
+
+def api_response(data, status=200):
+    return HttpResponse(_renderer.render(data), content_type='application/json', status=status)
+
+
+def token_required(view):
+    """Tương đương authentication_classes/IsAuthenticated của các APIView."""
+    authenticator = CachedTokenAuthentication()
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        try:
+            result = await authenticator.aauthenticate(request)
+        except exceptions.AuthenticationFailed as exc:
+            result, detail = None, exc.detail
+        else:
+            detail = exceptions.NotAuthenticated.default_detail
+        if result is None:
+            response = api_response({'detail': str(detail)}, status=401)
+            response['WWW-Authenticate'] = authenticator.authenticate_header(request)
+            return response
+        request.user, request.auth = result
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+# --- Bảng phòng (như /api/dashboard/) ---
+@token_required
+async def live_dashboard(request):
+    rooms = [room async for room in Room.objects.order_by('room_number')]
+    reservations = [res async for res in current_reservations_queryset()]
+    return api_response(room_board(rooms, reservations))
+
+
+# --- KPI quản lý (như /api/management-stats/) ---
+@token_required
+async def live_management_stats(request):
+    hotel_id = request.GET.get('hotel')
+    if hotel_id is not None and not hotel_id.isdigit():
+        return api_response({"error": "Mã khách sạn không hợp lệ."}, status=400)
+    return api_response(await aget_kpis(int(hotel_id) if hotel_id else None))
+
+
+# --- Phòng trống: ?check_in=2025-01-10&check_out=2025-01-12[&room_type=...&hotel=...] ---
+@token_required
+async def live_availability(request):
+    hotel_id = request.GET.get('hotel')
+    if hotel_id is not None and not hotel_id.isdigit():
+        return api_response({"error": "Mã khách sạn không hợp lệ."}, status=400)
+    try:
+        start, end = parse_stay(request.GET.get('check_in'), request.GET.get('check_out'))
+    except InvalidStay as exc:
+        return api_response({"error": str(exc)}, status=400)
+    rooms = available_rooms(start, end, request.GET.get('room_type'), int(hotel_id) if hotel_id else None)
+    return api_response({
+        'check_in': start,
+        'check_out': end,
+        'rooms': [room async for room in rooms],
+    })
+
+
+# --- Web: số yêu cầu mới (polling từ mọi trang) ---
+@login_required
+async def check_new_requests_count(request):
+    count = await GuestRequest.objects.filter(status='New').acount()
+    return JsonResponse({'count': count})
+
+
+# --- Cổng yêu cầu công khai (quét QR) ---
+async def guest_request_portal(request, room_id):
+    # Phòng + lượt ở hiện tại lấy từ cache (xem portal.py), không truy vấn DB mỗi lần quét QR
+    stay = await aget_portal_stay(room_id)
+    if stay is None: raise Http404
+    room = stay.room
+    if not stay.reservation_id: return render(request, 'pms/guest_inactive.html', {'room': room})
+    if request.method == 'POST':
+        content = (request.POST.get('content') or '').strip()
+        if content:
+            if not allow_submission(room.id, client_ip(request)):
+                return render(request, 'pms/guest_success.html', {'room': room, 'message': 'Quý khách gửi yêu cầu quá nhanh. Vui lòng đợi ít phút rồi thử lại.'}, status=429)
+            await asubmit_request(stay, content)
+            return render(request, 'pms/guest_success.html', {'room': room, 'message': 'Yêu cầu của quý khách đã được ghi nhận. Nhân viên sẽ xử lý sớm nhất.'})
+    context = {'room': room, 'guest_name': stay.guest_name}
+    return render(request, 'pms/guest_request_form.html', context)
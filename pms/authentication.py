@@ -0,0 +1,112 @@
+"""
+Xác thực có cache cho đường nóng (polling dashboard).
+
+- CachedTokenAuthentication: token -> user giữ trong LRU của worker, không còn
+  JOIN authtoken_token/auth_user ở mỗi request API. Token có hạn dùng
+  (settings.API_TOKEN_TTL) và được cấp mới khi đăng nhập lại lúc đã quá nửa hạn.
+- CachedModelBackend: user của phiên web (session) cũng được cache như vậy.
+
+Mỗi mục cache gắn với một "thế hệ" lưu trong cache dùng chung giữa các worker
+(local_cache.version_cache); đăng xuất, đổi mật khẩu, xóa nhân viên... sẽ tăng
+thế hệ (xem signals.py) nên mọi mục cũ mất hiệu lực ngay ở mọi worker, không
+phải chờ AUTH_CACHE_TTL.
+"""
+import copy
+import time
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.utils import timezone
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication, get_authorization_header
+
+from .local_cache import LRUCache, version_cache
+
+AUTH_CACHE_SIZE = 1024
+AUTH_CACHE_TTL = 30  # giây
+GENERATION_KEY = 'pms:auth-generation'
+
+auth_cache = LRUCache(AUTH_CACHE_SIZE, AUTH_CACHE_TTL, name='auth')
+
+
+def get_generation():
+    generation = version_cache.get(GENERATION_KEY)
+    if generation is None:
+        generation = time.time_ns()
+        if not version_cache.add(GENERATION_KEY, generation, timeout=None):
+            generation = version_cache.get(GENERATION_KEY, generation)
+    return generation
+
+
+def invalidate_auth_cache():
+    version_cache.set(GENERATION_KEY, time.time_ns(), timeout=None)
+    auth_cache.clear()
+
+
+def _cached(key):
+    entry = auth_cache.get(key)
+    if entry is None or entry[0] != get_generation():
+        return None
+    return entry[1]
+
+
+def _remember(key, value):
+    auth_cache.set(key, (get_generation(), value))
+
+
+def token_ttl():
+    return getattr(settings, 'API_TOKEN_TTL', timedelta(days=30))
+
+
+def token_expires_at(token_created):
+    return token_created + token_ttl()
+
+
+def token_needs_rotation(token):
+    """Đăng nhập lại khi token đã quá nửa hạn dùng thì cấp token mới."""
+    return timezone.now() >= token.created + token_ttl() / 2
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    def authenticate_credentials(self, key):
+        cached = _cached(('token', key))
+        if cached is None:
+            user, token = super().authenticate_credentials(key)
+            cached = (user, token)
+            _remember(('token', key), cached)
+        user, token = cached
+
+        if timezone.now() >= token_expires_at(token.created):
+            token.delete()
+            raise exceptions.AuthenticationFailed("Token đã hết hạn, vui lòng đăng nhập lại.")
+        # Bản sao để view có sửa request.user cũng không làm bẩn cache
+        return copy.copy(user), token
+
+    async def aauthenticate(self, request):
+        """Cho view async (ASGI): token còn trong cache thì không phải chuyển luồng."""
+        header = get_authorization_header(request).split()
+        if len(header) == 2 and header[0].lower() == self.keyword.lower().encode():
+            cached = _cached(('token', header[1].decode(errors='replace')))
+            if cached is not None and timezone.now() < token_expires_at(cached[1].created):
+                return copy.copy(cached[0]), cached[1]
+        return await sync_to_async(self.authenticate)(request)
+
+
+class CachedModelBackend(ModelBackend):
+    def get_user(self, user_id):
+        user = _cached(('user', user_id))
+        if user is None:
+            user = super().get_user(user_id)
+            if user is None:
+                return None
+            _remember(('user', user_id), user)
+        return copy.copy(user)
+
+    async def aget_user(self, user_id):
+        # ModelBackend.aget_user truy vấn thẳng DB, bỏ qua cache ở trên
+        user = _cached(('user', user_id))
+        if user is None:
+            return await sync_to_async(self.get_user)(user_id)
+        return copy.copy(user)
@@ -0,0 +1,76 @@
+"""
+Tìm phòng trống cho một khoảng lưu trú.
+
+Một phòng bận nếu có booking Confirmed/Occupied giao với khoảng [check_in,
+check_out) - cùng điều kiện chống trùng lịch với create_booking, cộng thêm
+booking đang ở chưa có ngày trả phòng (coi như chưa kết thúc). Tất cả gói
+trong một truy vấn (NOT IN subquery), dùng được cả với ORM đồng bộ lẫn async.
+"""
+from datetime import datetime, time, timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Reservation, Room
+
+# Khi chỉ truyền ngày: nhận phòng 14:00, trả phòng 12:00 (mốc tính đêm của hóa đơn)
+CHECK_IN_TIME = time(14, 0)
+CHECK_OUT_TIME = time(12, 0)
+MAX_STAY = timedelta(days=90)
+
+ROOM_FIELDS = ('id', 'room_number', 'room_type', 'price_per_night', 'hotel_id', 'status')
+
+
+class InvalidStay(ValueError):
+    pass
+
+
+def _parse_moment(raw, default_time, tz):
+    raw = (raw or '').strip()
+    # parse_datetime cũng nhận 'YYYY-MM-DD' (thành 00:00) nên phải thử dạng ngày trước
+    try:
+        day = parse_date(raw) if len(raw) == 10 else None
+        value = datetime.combine(day, default_time) if day else parse_datetime(raw)
+    except ValueError:
+        value = None
+    if value is None:
+        raise InvalidStay(f"Thời gian không hợp lệ: {raw!r}")
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value, tz)
+    return value
+
+
+def parse_stay(check_in, check_out, tz=None):
+    """Đọc khoảng lưu trú từ chuỗi ISO (ngày hoặc ngày giờ); thiếu check_out thì ở 1 đêm.
+    tz: múi giờ cho giờ không kèm múi (mặc định múi giờ hiện tại) - truyền sẵn khi đọc nhiều dòng."""
+    tz = tz or timezone.get_current_timezone()
+    start = _parse_moment(check_in, CHECK_IN_TIME, tz)
+    if check_out:
+        end = _parse_moment(check_out, CHECK_OUT_TIME, tz)
+    else:
+        end = datetime.combine(timezone.localtime(start, tz).date() + timedelta(days=1), CHECK_OUT_TIME)
+        end = timezone.make_aware(end, tz)
+    if end <= start:
+        raise InvalidStay("Thời gian trả phòng phải sau thời gian nhận phòng.")
+    if end - start > MAX_STAY:
+        raise InvalidStay(f"Khoảng lưu trú tối đa {MAX_STAY.days} ngày.")
+    return start, end
+
+
+def busy_reservations(start, end):
+    return Reservation.objects.filter(
+        Q(status__in=['Confirmed', 'Occupied']),
+        Q(check_in_date__lt=end),
+        Q(check_out_date__gt=start) | Q(check_out_date__isnull=True),
+    )
+
+
+def available_rooms(start, end, room_type=None, hotel_id=None):
+    """QuerySet các phòng (dạng values) còn trống trong cả khoảng [start, end)."""
+    rooms = Room.objects.exclude(id__in=busy_reservations(start, end).values('room_id'))
+    if room_type:
+        rooms = rooms.filter(room_type=room_type)
+    if hotel_id is not None:
+        rooms = rooms.filter(hotel_id=hotel_id)
+    return rooms.order_by('room_number').values(*ROOM_FIELDS)
@@ -0,0 +1,84 @@
+"""
+Cache trong tiến trình cho dữ liệu danh mục (dịch vụ, cấu hình phòng, nhân viên).
+
+Các danh mục này chỉ đổi vài lần mỗi tháng nên được giữ trong bộ nhớ của
+worker kèm một số phiên bản. Số phiên bản nằm trong cache dùng chung giữa các
+worker (local_cache.version_cache, settings.CACHES['versions']) và được tăng khi
+có ghi (xem signals.py); mỗi lần đọc chỉ so sánh phiên bản, khác thì nạp lại,
+nên ghi ở worker này cũng làm mới danh mục (và ETag) ở mọi worker khác.
+"""
+import threading
+import time
+
+from django.contrib.auth.models import User
+
+from .local_cache import CacheStats, version_cache
+from .models import Room, ServiceItem
+from .serializers import RoomCatalogSerializer, ServiceItemSerializer, StaffSerializer
+
+VERSION_KEY = 'pms:catalog-version:{}'
+
+CATALOGS = {
+    'services': (lambda: ServiceItem.objects.order_by('item_name'), ServiceItemSerializer),
+    'rooms': (lambda: Room.objects.order_by('room_number'), RoomCatalogSerializer),
+    'staff': (lambda: User.objects.order_by('-date_joined'), StaffSerializer),
+}
+
+# Các trường Room thay đổi theo nghiệp vụ hằng ngày, không làm đổi danh mục
+ROOM_LIVE_FIELDS = frozenset({'status'})
+
+_local = {}
+_lock = threading.Lock()
+_stats = CacheStats('catalog')
+
+
+class CatalogEntry:
+    def __init__(self, version, objects, serializer_class):
+        self.version = version
+        self.objects = objects
+        self._serializer_class = serializer_class
+        self._data = None
+
+    @property
+    def data(self):
+        if self._data is None:
+            self._data = self._serializer_class(self.objects, many=True).data
+        return self._data
+
+    @property
+    def etag(self):
+        return f'"{self.version}"'
+
+
+def get_version(name):
+    version = version_cache.get(VERSION_KEY.format(name))
+    if version is None:
+        # Cache trống (mới khởi động/bị đẩy ra): tạo phiên bản mới theo thời gian
+        version = f"{name}-{time.time_ns()}"
+        if not version_cache.add(VERSION_KEY.format(name), version, timeout=None):
+            version = version_cache.get(VERSION_KEY.format(name), version)
+    return version
+
+
+def get_versions():
+    return {name: get_version(name) for name in CATALOGS}
+
+
+def invalidate(name):
+    version_cache.set(VERSION_KEY.format(name), f"{name}-{time.time_ns()}", timeout=None)
+    with _lock:
+        _local.pop(name, None)
+
+
+def get_catalog(name):
+    version = get_version(name)
+    entry = _local.get(name)
+    if entry is not None and entry.version == version:
+        _stats.hits += 1
+        return entry
+    _stats.misses += 1
+    queryset_factory, serializer_class = CATALOGS[name]
+    entry = CatalogEntry(version, list(queryset_factory()), serializer_class)
+    with _lock:
+        _local[name] = entry
+    return entry
@@ -0,0 +1,41 @@
+"""
+Kiểm tra cấu hình khi triển khai (python manage.py check --deploy).
+"""
+from django.conf import settings
+from django.core.checks import Error, Tags, Warning, register
+
+CACHED_LOADER = 'django.template.loaders.cached.Loader'
+PER_PROCESS_CACHES = ('django.core.cache.backends.locmem.LocMemCache', 'django.core.cache.backends.dummy.DummyCache')
+
+
+@register(Tags.templates, deploy=True)
+def check_cached_template_loader(app_configs, **kwargs):
+    """Production phải dùng cached loader, không parse lại template mỗi request."""
+    errors = []
+    for engine in settings.TEMPLATES:
+        if engine['BACKEND'] != 'django.template.backends.django.DjangoTemplates':
+            continue
+        loaders = engine.get('OPTIONS', {}).get('loaders')
+        if loaders is None:
+            continue  # Django tự bọc loader mặc định bằng cached loader
+        if not any((loader[0] if isinstance(loader, (list, tuple)) else loader) == CACHED_LOADER for loader in loaders):
+            errors.append(Error(
+                "TEMPLATES đặt OPTIONS['loaders'] nhưng không có cached loader.",
+                hint=f"Bọc các loader trong ('{CACHED_LOADER}', [...]).",
+                id='pms.E001',
+            ))
+    return errors
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_version_cache(app_configs, **kwargs):
+    """Số phiên bản (catalog.py, fragments.py, rates.py) phải dùng chung giữa các worker."""
+    backend = settings.CACHES.get('versions', {}).get('BACKEND')
+    if backend is None or backend in PER_PROCESS_CACHES:
+        return [Warning(
+            "CACHES['versions'] không dùng chung giữa các worker: ghi ở worker này không làm mới "
+            "danh mục, fragment và lịch giá ở worker khác.",
+            hint="Dùng FileBasedCache (một máy chủ) hoặc Redis/Memcached cho alias 'versions'.",
+            id='pms.W002',
+        )]
+    return []
@@ -0,0 +1,76 @@
+"""
+Đưa các truy vấn đọc của báo cáo/xuất file sang DB bản sao (replica) nếu có.
+
+Chỉ các đoạn code được bọc trong `reporting_reads()` mới đọc từ replica, nên
+nghiệp vụ lễ tân (check-in/out, đặt phòng) luôn đọc-ghi trên `default` và
+không bị ảnh hưởng bởi độ trễ sao chép. Replica được cấu hình qua
+DATABASE_REPLICA_URL (xem settings.py); không có hoặc replica không kết nối
+được thì mọi thứ tự quay về `default`.
+
+Thử cục bộ bằng hai file SQLite:
+
+    cp db.sqlite3 /tmp/replica.sqlite3
+    DATABASE_REPLICA_URL=sqlite:////tmp/replica.sqlite3 python manage.py runserver
+"""
+import contextvars
+import logging
+import time
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+REPLICA_ALIAS = 'replica'
+REPLICA_APPS = frozenset({'pms'})
+REPLICA_RETRY_AFTER = 30  # giây chờ trước khi thử lại replica bị lỗi
+
+_reporting = contextvars.ContextVar('pms_reporting_reads', default=False)
+_replica_down_until = 0.0
+
+
+@contextmanager
+def reporting_reads():
+    """Decorator/context manager: các truy vấn đọc bên trong đi sang replica."""
+    token = _reporting.set(True)
+    try:
+        yield
+    finally:
+        _reporting.reset(token)
+
+
+def replica_configured():
+    return REPLICA_ALIAS in connections.settings
+
+
+def replica_available():
+    global _replica_down_until
+    if not replica_configured() or time.monotonic() < _replica_down_until:
+        return False
+    try:
+        connections[REPLICA_ALIAS].ensure_connection()
+    except DatabaseError:
+        logger.warning("Replica không kết nối được, đọc báo cáo từ default trong %ss", REPLICA_RETRY_AFTER, exc_info=True)
+        _replica_down_until = time.monotonic() + REPLICA_RETRY_AFTER
+        return False
+    return True
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not _reporting.get() or model._meta.app_label not in REPLICA_APPS:
+            return None
+        # Đang trong transaction ghi thì phải đọc đúng dữ liệu vừa ghi
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return REPLICA_ALIAS if replica_available() else None
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replica là bản sao của default nên quan hệ giữa hai bên luôn hợp lệ
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != REPLICA_ALIAS
@@ -0,0 +1,180 @@
+"""
+Phát hiện và gộp hồ sơ khách bị trùng (do gõ sai CCCD tạo ra Guest mới).
+
+Không so sánh mọi cặp: mỗi khách được chia vào các "khối" theo khóa chặn
+(tên chuẩn hóa + ngày sinh, số điện thoại chuẩn hóa), chỉ các cặp trong cùng
+khối mới được chấm điểm mờ. Khối quá lớn (vd. SĐT dùng chung của công ty du
+lịch) bị bỏ qua để giữ độ phức tạp gần tuyến tính.
+"""
+import re
+import unicodedata
+from collections import defaultdict, namedtuple
+from difflib import SequenceMatcher
+from itertools import combinations
+
+from django.db import transaction
+
+from . import fragments
+from .models import ArchivedReservation, Guest, Reservation
+
+DEFAULT_THRESHOLD = 0.8
+MAX_BLOCK_SIZE = 50
+BATCH_SIZE = 5000
+
+GuestKey = namedtuple('GuestKey', 'id name id_number phone dob')
+Candidate = namedtuple('Candidate', 'score first second')
+
+MERGE_FILL_FIELDS = ('dob', 'phone', 'license_plate', 'address', 'photo_front', 'photo_back')
+
+
+def normalize_name(value):
+    """'Nguyễn  Văn Đức' -> 'nguyen van duc'"""
+    value = (value or '').replace('đ', 'd').replace('Đ', 'D')
+    value = unicodedata.normalize('NFKD', value)
+    value = ''.join(c for c in value if not unicodedata.combining(c))
+    return ' '.join(value.lower().split())
+
+
+def normalize_phone(value):
+    digits = re.sub(r'\D', '', value or '')
+    if digits.startswith('84') and len(digits) > 9:
+        digits = '0' + digits[2:]
+    return digits if len(digits) >= 8 else ''
+
+
+def _similarity(a, b):
+    if not a or not b:
+        return 0.0
+    return SequenceMatcher(None, a, b).ratio()
+
+
+def score_pair(a, b):
+    """Điểm 0..1: tên (50%), ngày sinh (20%), SĐT (15%), độ giống CCCD (15%)."""
+    score = 0.5 * _similarity(a.name, b.name)
+    if a.dob and a.dob == b.dob:
+        score += 0.2
+    if a.phone and a.phone == b.phone:
+        score += 0.15
+    score += 0.15 * _similarity(a.id_number, b.id_number)
+    return round(score, 3)
+
+
+def blocking_keys(guest):
+    if guest.dob and guest.name:
+        yield ('nd', guest.name, guest.dob)
+    if guest.phone:
+        yield ('p', guest.phone)
+
+
+def iter_guest_keys(queryset=None):
+    queryset = queryset if queryset is not None else Guest.objects.all()
+    rows = queryset.order_by().values_list('id', 'full_name', 'id_number', 'phone', 'dob')
+    for pk, full_name, id_number, phone, dob in rows.iterator(chunk_size=BATCH_SIZE):
+        yield GuestKey(pk, normalize_name(full_name), (id_number or '').upper(), normalize_phone(phone), dob)
+
+
+def find_duplicates(queryset=None, threshold=DEFAULT_THRESHOLD, max_block_size=MAX_BLOCK_SIZE):
+    """Trả về danh sách Candidate (điểm giảm dần) có điểm >= threshold."""
+    guests = {}
+    blocks = defaultdict(list)
+    for guest in iter_guest_keys(queryset):
+        guests[guest.id] = guest
+        for key in blocking_keys(guest):
+            blocks[key].append(guest.id)
+
+    seen = set()
+    candidates = []
+    for ids in blocks.values():
+        if len(ids) < 2 or len(ids) > max_block_size:
+            continue
+        for first, second in combinations(sorted(ids), 2):
+            if (first, second) in seen:
+                continue
+            seen.add((first, second))
+            score = score_pair(guests[first], guests[second])
+            if score >= threshold:
+                candidates.append(Candidate(score, first, second))
+
+    candidates.sort(key=lambda c: (-c.score, c.first, c.second))
+    return candidates
+
+
+def cluster_candidates(candidates):
+    """Gom các cặp thành nhóm (union-find); khách có id nhỏ nhất làm hồ sơ chính."""
+    parent = {}
+
+    def find(x):
+        parent.setdefault(x, x)
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for c in candidates:
+        a, b = find(c.first), find(c.second)
+        if a != b:
+            parent[max(a, b)] = min(a, b)
+
+    groups = defaultdict(list)
+    for x in list(parent):
+        root = find(x)
+        if x != root:
+            groups[root].append(x)
+    return {primary: sorted(dups) for primary, dups in groups.items()}
+
+
+@transaction.atomic
+def merge_guests(primary_id, duplicate_ids):
+    """
+    Gộp các hồ sơ trùng vào primary bằng vài câu UPDATE hàng loạt:
+    main_bookings và stays được trỏ sang hồ sơ chính, các trường còn trống
+    được bổ sung từ bản trùng, rồi xóa bản trùng. Yêu cầu của khách gắn với
+    Reservation nên tự đi theo booking.
+    """
+    duplicate_ids = [pk for pk in duplicate_ids if pk != primary_id]
+    if not duplicate_ids:
+        return 0
+    primary = Guest.objects.select_for_update().get(pk=primary_id)
+    duplicates = list(Guest.objects.filter(pk__in=duplicate_ids).order_by('-created_at'))
+
+    Reservation.objects.filter(guest_id__in=duplicate_ids).update(guest_id=primary_id)
+
+    Occupant = Reservation.occupants.through
+    reservation_ids = set(
+        Occupant.objects.filter(guest_id__in=duplicate_ids).values_list('reservation_id', flat=True)
+    )
+    Occupant.objects.bulk_create(
+        [Occupant(reservation_id=rid, guest_id=primary_id) for rid in reservation_ids],
+        ignore_conflicts=True,
+    )
+    Occupant.objects.filter(guest_id__in=duplicate_ids).delete()
+
+    # Lịch sử đã lưu trữ (archive.py) cũng phải theo về hồ sơ chính, nếu không sẽ bị xóa cùng bản trùng
+    ArchivedReservation.objects.filter(guest_id__in=duplicate_ids).update(guest_id=primary_id)
+    ArchivedOccupant = ArchivedReservation.occupants.through
+    archived_ids = set(
+        ArchivedOccupant.objects.filter(guest_id__in=duplicate_ids).values_list('archivedreservation_id', flat=True)
+    )
+    ArchivedOccupant.objects.bulk_create(
+        [ArchivedOccupant(archivedreservation_id=rid, guest_id=primary_id) for rid in archived_ids],
+        ignore_conflicts=True,
+    )
+    ArchivedOccupant.objects.filter(guest_id__in=duplicate_ids).delete()
+
+    changed = []
+    for field in MERGE_FILL_FIELDS:
+        if getattr(primary, field):
+            continue
+        for dup in duplicates:
+            if getattr(dup, field):
+                setattr(primary, field, getattr(dup, field))
+                changed.append(field)
+                break
+    if changed:
+        # update() để không chạy lại bước nén ảnh trong Guest.save()
+        Guest.objects.filter(pk=primary_id).update(**{f: getattr(primary, f) for f in changed})
+
+    Guest.objects.filter(pk__in=duplicate_ids).delete()
+    # Booking được trỏ sang khách khác bằng update(), không có signal cho từng phòng
+    transaction.on_commit(fragments.invalidate_all)
+    return len(duplicates)
@@ -0,0 +1,97 @@
+"""
+Tự suy ra select_related / prefetch_related / only() từ các trường của serializer.
+
+Ví dụ ReservationSerializer có guest_name = CharField(source='guest.full_name')
+và room_number = CharField(source='room.room_number') -> select_related('guest',
+'room') + only('guest__full_name', 'room__room_number', ...), nên liệt kê N
+booking chỉ tốn một truy vấn thay vì 2N+1.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+
+from .pagination import KEY_FIELDS
+
+
+class EagerLoadingPlan:
+    def __init__(self):
+        self.select_related = set()
+        self.prefetch_related = set()
+        self.only = set()
+        # Trường tính toán (property) không biết cần cột nào -> không dùng only()
+        self.restrict_columns = True
+
+    def apply(self, queryset):
+        if self.select_related:
+            queryset = queryset.select_related(*sorted(self.select_related))
+        if self.prefetch_related:
+            queryset = queryset.prefetch_related(*sorted(self.prefetch_related))
+        if self.restrict_columns and self.only:
+            queryset = queryset.only(*sorted(self.only | self.select_related))
+        return queryset
+
+
+def _walk(plan, model, field, source_attrs, prefix=''):
+    current = model
+    path = prefix
+    for index, attr in enumerate(source_attrs):
+        is_last = index == len(source_attrs) - 1
+        if attr.startswith('get_') and attr.endswith('_display'):
+            attr = attr[len('get_'):-len('_display')]
+        try:
+            model_field = current._meta.get_field(attr)
+        except FieldDoesNotExist:
+            plan.restrict_columns = False
+            return
+        full = f'{path}__{attr}' if path else attr
+
+        if model_field.many_to_many or model_field.one_to_many:
+            plan.prefetch_related.add(full)
+            return
+        if model_field.is_relation and not is_last:
+            plan.select_related.add(full)
+            current, path = model_field.related_model, full
+            continue
+        if model_field.is_relation and isinstance(field, serializers.BaseSerializer):
+            plan.select_related.add(full)
+            _collect(plan, model_field.related_model, field, prefix=full)
+            return
+        # Cột thường, hoặc khóa ngoại chỉ cần *_id (PrimaryKeyRelatedField)
+        plan.only.add(full)
+        return
+
+
+def _collect(plan, model, serializer, prefix=''):
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        if isinstance(field, serializers.ListSerializer):
+            if field.source != '*':
+                _walk(plan, model, field, field.source_attrs, prefix)
+            continue
+        if field.source == '*':
+            plan.restrict_columns = False
+            continue
+        _walk(plan, model, field, field.source_attrs, prefix)
+
+
+def eager_loading_plan(serializer):
+    plan = EagerLoadingPlan()
+    _collect(plan, serializer.Meta.model, serializer)
+    return plan
+
+
+class EagerLoadingMixin:
+    """
+    Mixin cho ViewSet: tự áp dụng kế hoạch eager-loading của serializer cho
+    các action đọc (list, retrieve), để số truy vấn không tăng theo số dòng.
+    """
+    eager_loading_actions = ('list', 'retrieve')
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if getattr(self, 'action', None) not in self.eager_loading_actions:
+            return queryset
+        plan = eager_loading_plan(self.get_serializer())
+        # Cột dùng cho con trỏ phân trang phải luôn được nạp
+        plan.only.update(KEY_FIELDS if self.paginator is not None and hasattr(queryset.model, 'created_at') else ())
+        return plan.apply(queryset)
@@ -0,0 +1,160 @@
+"""
+Dự báo số phòng có khách cho HORIZON_DAYS ngày tới, theo từng khách sạn và cả chuỗi
+(lịch trực ở management_dashboard/add_staff_schedule, /api/forecast/).
+
+Dữ liệu là booking không bị hủy ở bảng nóng và bảng lưu trữ (archive.py) từ
+HISTORY_DAYS ngày trước tới tương lai. Mỗi booking chiếm các đêm [ngày nhận phòng,
+ngày trả phòng) theo giờ địa phương, tối thiểu 1 đêm; khách đang ở chưa có ngày
+trả được tính tới hết hôm nay.
+
+Mọi phép tính chạy trên cả mảng booking bằng pandas/NumPy, không lặp theo đêm:
+
+- Công suất theo đêm: mảng hiệu (+1 ở đêm đầu, -1 sau đêm cuối của mỗi booking)
+  cộng dồn theo ngày. Với các đêm tương lai đây là số phòng đã đặt (on the books, OTB).
+- Mùa vụ: trung bình các đêm cùng thứ (đêm đó và +-1 tuần) của 1 và 2 năm trước
+  (lùi 364/728 ngày), nhân hệ số xu hướng = 28 đêm vừa qua / cùng kỳ năm trước.
+- Pickup: từ PICKUP_WINDOW_DAYS đêm đã qua, trung bình số phòng được đặt khi chỉ
+  còn dưới L ngày (lead của một đêm-booking = đêm - ngày tạo booking; histogram
+  lead cũng dựng bằng mảng hiệu). Dự báo pickup = OTB + pickup[L].
+
+Hai mô hình được trộn với trọng số pickup giảm tuyến tính theo L (gần thì tin
+OTB + pickup, xa thì tin mùa vụ), rồi kẹp trong [OTB, số phòng]. Kết quả cho mọi
+khách sạn được tính một lần mỗi ngày và giữ trong cache của Django tới hết ngày.
+"""
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .db_router import reporting_reads
+from .kpi import local_day_range
+from .models import ArchivedReservation, Hotel, Reservation
+
+CACHE_KEY = 'pms:forecast:{}'
+STAY_FIELDS = ('room__hotel_id', 'status', 'check_in_date', 'check_out_date', 'created_at')
+SEASONAL_LAGS = (364, 728)  # 52 và 104 tuần: giữ nguyên thứ trong tuần
+SEASONAL_OFFSETS = (-7, 0, 7)
+TREND_DAYS = 28
+
+
+def _stays(since):
+    """DataFrame các booking còn chiếm phòng sau mốc since, từ cả bảng nóng lẫn bảng lưu trữ."""
+    recent = Q(check_out_date__gte=since) | Q(check_out_date__isnull=True)
+    hot = Reservation.objects.exclude(status='Cancelled').filter(recent).order_by().values_list(*STAY_FIELDS)
+    cold = ArchivedReservation.objects.exclude(status='Cancelled').filter(recent).order_by().values_list(*STAY_FIELDS)
+    return pd.DataFrame.from_records(list(hot.union(cold, all=True)), columns=['hotel', 'status', 'check_in', 'check_out', 'created_at'])
+
+
+def _day_index(column, origin, tz):
+    """Cột datetime (có múi giờ) -> số ngày địa phương kể từ origin (NaN nếu trống)."""
+    local = pd.to_datetime(column, utc=True).dt.tz_convert(tz).dt.tz_localize(None).dt.normalize()
+    return ((local - pd.Timestamp(origin)) / pd.Timedelta(days=1)).to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def _interval_counts(rows, starts, ends, shape):
+    """Đếm số khoảng [start, end) phủ mỗi ô của từng hàng: mảng hiệu rồi cộng dồn."""
+    diff = np.zeros((shape[0], shape[1] + 1))
+    keep = ends > starts
+    np.add.at(diff, (rows[keep], starts[keep]), 1)
+    np.add.at(diff, (rows[keep], ends[keep]), -1)
+    return np.cumsum(diff, axis=1)[:, :shape[1]]
+
+
+def compute_forecast(today=None):
+    config = settings.FORECAST
+    today = today or timezone.localdate()
+    history, horizon, window = config['HISTORY_DAYS'], config['HORIZON_DAYS'], config['PICKUP_WINDOW_DAYS']
+    origin = today - timedelta(days=history)
+    days = history + horizon  # đêm origin .. today + horizon - 1; hôm nay ở vị trí history
+    tz = timezone.get_current_timezone()
+
+    hotels = list(Hotel.objects.annotate(rooms=Count('room')).order_by('name').values('id', 'name', 'code', 'rooms'))
+    position = {hotel['id']: index for index, hotel in enumerate(hotels)}
+    capacity = np.array([hotel['rooms'] for hotel in hotels], dtype=np.float64)
+
+    stays = _stays(local_day_range(origin)[0])
+    stays = stays[stays['hotel'].isin(position)]
+    rows = stays['hotel'].map(position).to_numpy(dtype=np.int64)
+    first = _day_index(stays['check_in'], origin, tz)
+    last = _day_index(stays['check_out'], origin, tz)
+    created = _day_index(stays['created_at'], origin, tz)
+    # Chưa có ngày trả: 1 đêm, khách đang ở thì tới hết hôm nay
+    in_house = (stays['status'] == 'Occupied').to_numpy()
+    last = np.where(np.isnan(last), np.where(in_house, np.maximum(first + 1, history + 1), first + 1), last)
+    last = np.maximum(last, first + 1)
+    # Chỉ booking đã tồn tại tới hôm nay (on the books thật sự)
+    known = created < history + 1
+    rows, first, last, created = rows[known], first[known], last[known], created[known]
+
+    nights = _interval_counts(rows, np.clip(first, 0, days).astype(np.int64), np.clip(last, 0, days).astype(np.int64), (len(hotels), days))
+    nights = np.minimum(nights, capacity[:, None])
+    future = np.arange(history, days)
+    on_books = nights[:, future]
+
+    # Mùa vụ: cùng thứ của các năm trước, điều chỉnh theo xu hướng gần đây
+    samples = [future - lag + offset for lag in SEASONAL_LAGS for offset in SEASONAL_OFFSETS]
+    samples = [index for index in samples if index.min() >= 0]
+    seasonal = np.full(on_books.shape, np.nan)
+    if samples and history >= TREND_DAYS + SEASONAL_LAGS[0]:
+        seasonal = np.mean([nights[:, index] for index in samples], axis=0)
+        recent = nights[:, history - TREND_DAYS:history].sum(axis=1)
+        last_year = nights[:, history - TREND_DAYS - SEASONAL_LAGS[0]:history - SEASONAL_LAGS[0]].sum(axis=1)
+        trend = np.clip(np.divide(recent, last_year, out=np.ones_like(recent), where=last_year > 0), 0.5, 2.0)
+        seasonal = seasonal * trend[:, None]
+
+    # Pickup: histogram lead của các đêm-booking trong cửa sổ đã qua [history - window, history)
+    window = min(window, history)
+    lo = np.clip(first, history - window, history)
+    hi = np.clip(last, history - window, history)
+    lead_lo = np.clip(lo - created, 0, horizon).astype(np.int64)
+    lead_hi = np.clip(hi - created, 0, horizon).astype(np.int64)
+    lead_counts = _interval_counts(rows, lead_lo, lead_hi, (len(hotels), horizon))
+    # booked_late[h, L] = số đêm-booking được đặt khi còn dưới L ngày (L = 0 .. horizon - 1)
+    booked_late = np.concatenate([np.zeros((len(hotels), 1)), np.cumsum(lead_counts, axis=1)[:, :-1]], axis=1)
+    pickup = on_books + booked_late / max(window, 1)
+
+    weight = 1 - np.arange(horizon) / horizon
+    blended = np.where(np.isnan(seasonal), pickup, weight * pickup + (1 - weight) * np.nan_to_num(seasonal))
+    forecast = np.clip(blended, on_books, capacity[:, None])
+
+    dates = [today + timedelta(days=offset) for offset in range(horizon)]
+
+    def series(rooms, otb, seasonal_part, pickup_part, expected):
+        return [
+            {'date': day, 'on_the_books': int(otb[i]), 'forecast': int(round(expected[i])),
+             'seasonal': None if np.isnan(seasonal_part[i]) else round(float(seasonal_part[i]), 1),
+             'pickup': round(float(pickup_part[i]), 1),
+             'occupancy': round(100 * float(expected[i]) / rooms, 1) if rooms else 0.0}
+            for i, day in enumerate(dates)
+        ]
+
+    chain_rooms = int(capacity.sum())
+    chain_seasonal = np.nansum(seasonal, axis=0) if not np.isnan(seasonal).all() else np.full(horizon, np.nan)
+    return {
+        'generated_for': today,
+        'hotels': [
+            {**hotel, 'days': series(hotel['rooms'], on_books[i], seasonal[i], pickup[i], forecast[i])}
+            for i, hotel in enumerate(hotels)
+        ],
+        'chain': {'rooms': chain_rooms, 'days': series(chain_rooms, on_books.sum(axis=0), chain_seasonal, pickup.sum(axis=0), forecast.sum(axis=0))},
+    }
+
+
+def get_forecast(hotel_id=None):
+    """Dự báo của hôm nay (cache tới hết ngày). hotel_id: chỉ một khách sạn, None: cả chuỗi.
+    Trả về {'rooms', 'days': [...]} (kèm id/name/code nếu là một khách sạn), None nếu không có khách sạn đó."""
+    today = timezone.localdate()
+    key = CACHE_KEY.format(today.isoformat())
+    result = cache.get(key)
+    if result is None:
+        with reporting_reads():
+            result = compute_forecast(today)
+        _, midnight = local_day_range(today)
+        cache.set(key, result, timeout=max(int((midnight - timezone.now()).total_seconds()), 60))
+    if hotel_id is None:
+        return result['chain']
+    return next((hotel for hotel in result['hotels'] if hotel['id'] == hotel_id), None)
@@ -1,7 +1,19 @@
 from django import forms
+from django.urls import reverse
 from .models import Guest, Reservation, ServiceCharge, ServiceItem, StaffSchedule
 from django.contrib.auth.models import User
 
+class GuestPhotoInput(forms.ClearableFileInput):
+    """Ô tải ảnh giấy tờ: link "Hiện tại" đi qua view guest-photo thay vì MEDIA_URL,
+    vì ảnh đã chuyển sang kho lạnh (photo_retention.py) không còn nằm dưới /media/."""
+    template_name = 'pms/widgets/guest_photo_input.html'
+    photo_url = None
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        context['widget']['photo_url'] = self.photo_url
+        return context
+
 class GuestForm(forms.ModelForm):
     class Meta:
         model = Guest
@@ -15,6 +27,8 @@ class GuestForm(forms.ModelForm):
             'dob': forms.DateInput(attrs={'class': 'datepicker', 'placeholder': 'dd/mm/yyyy'}, format='%d/%m/%Y'),
             'full_name': forms.TextInput(attrs={'placeholder': 'Nguyễn Văn A'}),
             'id_number': forms.TextInput(attrs={'placeholder': 'Số CCCD/Hộ chiếu'}),
+            'photo_front': GuestPhotoInput,
+            'photo_back': GuestPhotoInput,
         }
         labels = {
             'full_name': 'Họ và Tên',
@@ -28,6 +42,12 @@ class GuestForm(forms.ModelForm):
             'license_plate': 'Biển số xe',
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance.pk:
+            self.fields['photo_front'].widget.photo_url = reverse('guest-photo', args=[self.instance.pk, 'front'])
+            self.fields['photo_back'].widget.photo_url = reverse('guest-photo', args=[self.instance.pk, 'back'])
+
 class ReservationForm(forms.ModelForm):
     class Meta:
         model = Reservation
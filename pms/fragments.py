@@ -0,0 +1,66 @@
+"""
+Cache fragment template cho các trang lưới phòng.
+
+- dashboard.html: mỗi thẻ phòng được cache theo phòng kèm phiên bản của phòng đó.
+- booking_management.html: mỗi hàng lịch (một ngày x mọi phòng) được cache theo
+  cửa sổ ngày kèm phiên bản chung của booking.
+
+Giống catalog.py, số phiên bản nằm trong cache dùng chung giữa các worker
+(local_cache.version_cache) và được đổi sau khi ghi (signals.py): fragment cũ
+không bị xóa mà tự hết hiệu lực vì khóa mới khác khóa cũ, kể cả fragment còn
+nằm trong LocMemCache của worker khác. Mọi phiên bản còn gắn với một "thế hệ" chung, invalidate_all() đổi thế
+hệ cho các thao tác ghi hàng loạt không phát signal (update(), bulk_create()).
+"""
+import time
+
+from django.conf import settings
+
+from .local_cache import version_cache
+
+GENERATION_KEY = 'pms:fragments:generation'
+RESERVATIONS_KEY = 'pms:fragments:reservations'
+ROOM_KEY = 'pms:fragments:room:{}'
+
+
+def timeout():
+    """Số giây giữ fragment (0 = không cache)."""
+    return settings.FRAGMENT_CACHE_SECONDS
+
+
+def _new_version():
+    return str(time.time_ns())
+
+
+def _versions(keys):
+    found = version_cache.get_many(keys)
+    # Cache trống (mới khởi động/bị đẩy ra): tạo phiên bản mới
+    missing = {key: _new_version() for key in keys if key not in found}
+    if missing:
+        version_cache.set_many(missing, timeout=None)
+        found.update(missing)
+    return found
+
+
+def room_versions(room_ids):
+    """{room_id: phiên bản} cho thẻ phòng, một lần đọc cache cho cả lưới."""
+    keys = {room_id: ROOM_KEY.format(room_id) for room_id in room_ids}
+    found = _versions([GENERATION_KEY, *keys.values()])
+    generation = found[GENERATION_KEY]
+    return {room_id: f"{generation}.{found[key]}" for room_id, key in keys.items()}
+
+
+def calendar_version():
+    found = _versions([GENERATION_KEY, RESERVATIONS_KEY])
+    return f"{found[GENERATION_KEY]}.{found[RESERVATIONS_KEY]}"
+
+
+def invalidate_rooms(room_ids):
+    """Phòng (hoặc booking/khách của phòng) vừa đổi: làm mới thẻ các phòng này và lịch."""
+    version = _new_version()
+    changed = {ROOM_KEY.format(room_id): version for room_id in room_ids}
+    changed[RESERVATIONS_KEY] = version
+    version_cache.set_many(changed, timeout=None)
+
+
+def invalidate_all():
+    version_cache.set(GENERATION_KEY, _new_version(), timeout=None)
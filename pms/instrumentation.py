@@ -0,0 +1,111 @@
+"""
+Đo chi phí của từng request: số truy vấn, thời gian DB, truy vấn lặp lại
+(dấu hiệu N+1), thời gian render template và tổng thời gian.
+
+Số liệu của request hiện tại nằm trong một ContextVar nên dùng được cho cả view
+đồng bộ lẫn async (truy vấn chạy qua sync_to_async vẫn cùng context).
+RequestTimingMiddleware và MetricsMiddleware (middleware.py) bật việc đo; bên
+ngoài request thì các hàm ở đây không làm gì.
+"""
+import contextvars
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+from django.template.base import Template
+
+_current = contextvars.ContextVar('pms_request_stats', default=None)
+
+
+class RequestStats:
+    __slots__ = ('started', 'queries', 'db_seconds', 'template_seconds', 'sql_counts', '_template_depth')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.template_seconds = 0.0
+        self.sql_counts = Counter()
+        self._template_depth = 0
+
+    @property
+    def total_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    @property
+    def db_ms(self):
+        return self.db_seconds * 1000
+
+    @property
+    def template_ms(self):
+        return self.template_seconds * 1000
+
+    @property
+    def duplicate_queries(self):
+        """Số truy vấn thừa: cùng câu SQL (khác tham số) chạy lại nhiều lần."""
+        return sum(count - 1 for count in self.sql_counts.values() if count > 1)
+
+    def top_duplicates(self, limit=3):
+        return [(sql, count) for sql, count in self.sql_counts.most_common(limit) if count > 1]
+
+
+def current_stats():
+    return _current.get()
+
+
+@contextmanager
+def measure():
+    """Đo request hiện tại. Lồng nhau (nhiều middleware cùng đo) thì dùng chung
+    một RequestStats, truy vấn chỉ được đếm một lần."""
+    stats = _current.get()
+    if stats is not None:
+        yield stats
+        return
+    stats = RequestStats()
+    token = _current.set(stats)
+    try:
+        # Gắn vào mọi DB (default, replica)
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(record_query))
+            yield stats
+    finally:
+        _current.reset(token)
+
+
+def record_query(execute, sql, params, many, context):
+    """Dùng với connection.execute_wrapper()."""
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.db_seconds += time.perf_counter() - started
+        stats.queries += 1
+        stats.sql_counts[sql] += 1
+
+
+_original_render = Template.render
+
+
+def _timed_render(self, context):
+    stats = _current.get()
+    # {% include %}/{% extends %} gọi lồng Template.render: chỉ tính lớp ngoài cùng
+    if stats is None or stats._template_depth:
+        return _original_render(self, context)
+    stats._template_depth += 1
+    started = time.perf_counter()
+    try:
+        return _original_render(self, context)
+    finally:
+        stats.template_seconds += time.perf_counter() - started
+        stats._template_depth -= 1
+
+
+def instrument_templates():
+    """Bọc Template.render (một lần cho mỗi tiến trình) để đo thời gian render."""
+    if Template.render is not _timed_render:
+        Template.render = _timed_render
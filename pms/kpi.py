@@ -0,0 +1,111 @@
+"""
+Bộ đếm KPI trực tiếp cho quản lý.
+
+Mỗi bảng chỉ một truy vấn: các con số được tính bằng tổng hợp có điều kiện
+(COUNT(*) FILTER (WHERE ...)) và nhóm theo khách sạn, tổng toàn chuỗi được cộng
+lại trong Python. Điều kiện ngày dùng khoảng [đầu ngày, đầu ngày hôm sau) thay
+vì __month/__year/__date để dùng được index trên cột thời gian.
+
+Kết quả được giữ trong micro-cache vài giây: nhiều điện thoại quản lý cùng làm
+mới một lúc chỉ tốn một lần tính (các request đến cùng lúc chờ nhau trên khóa).
+"""
+from datetime import datetime, timedelta
+
+from asgiref.sync import sync_to_async
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .local_cache import MicroCache
+from .models import ArchivedReservation, GuestRequest, Reservation, Room
+
+MICRO_CACHE_TTL = 5  # giây
+
+ROOM_COUNTERS = {
+    'total_rooms': Count('id'),
+    'occupied_rooms': Count('id', filter=Q(status='Occupied')),
+    'vacant_rooms': Count('id', filter=Q(status='Vacant')),
+    'dirty_rooms': Count('id', filter=Q(status='Dirty')),
+    'booked_rooms': Count('id', filter=Q(status='Booked')),
+}
+
+
+def local_day_range(day):
+    start = timezone.make_aware(datetime.combine(day, datetime.min.time()))
+    return start, start + timedelta(days=1)
+
+
+def local_month_range(day):
+    first = day.replace(day=1)
+    next_first = (first + timedelta(days=32)).replace(day=1)
+    return (
+        timezone.make_aware(datetime.combine(first, datetime.min.time())),
+        timezone.make_aware(datetime.combine(next_first, datetime.min.time())),
+    )
+
+
+def _grouped(queryset, hotel_field, counters):
+    rows = queryset.order_by().values(hotel_field).annotate(**counters)
+    return {row.pop(hotel_field): row for row in rows}
+
+
+def compute_kpis(hotel_id=None):
+    today = timezone.localdate()
+    day_start, day_end = local_day_range(today)
+    month_start, month_end = local_month_range(today)
+
+    rooms = Room.objects.all()
+    reservations = Reservation.objects.all()
+    requests = GuestRequest.objects.all()
+    archived = ArchivedReservation.objects.all()
+    if hotel_id is not None:
+        rooms = rooms.filter(hotel_id=hotel_id)
+        reservations = reservations.filter(room__hotel_id=hotel_id)
+        requests = requests.filter(room__hotel_id=hotel_id)
+        archived = archived.filter(room__hotel_id=hotel_id)
+
+    per_hotel, names = {}, {}
+    for row in rooms.order_by().values('hotel_id', 'hotel__name').annotate(**ROOM_COUNTERS):
+        hotel = row.pop('hotel_id')
+        names[hotel] = row.pop('hotel__name')
+        per_hotel[hotel] = row
+    for hotel, counts in _grouped(reservations, 'room__hotel_id', {
+        'guests_in_house': Count('id', filter=Q(status='Occupied')),
+        'today_checkouts': Count('id', filter=Q(status='Completed', check_out_date__gte=day_start, check_out_date__lt=day_end)),
+        'today_arrivals': Count('id', filter=Q(status='Confirmed', check_in_date__gte=day_start, check_in_date__lt=day_end)),
+        'month_check_ins': Count('id', filter=Q(check_in_date__gte=month_start, check_in_date__lt=month_end)),
+    }).items():
+        per_hotel.setdefault(hotel, {}).update(counts)
+    # Booking đã lưu trữ (xem archive.py) vẫn tính vào lượt nhận phòng trong tháng
+    for hotel, counts in _grouped(archived, 'room__hotel_id', {
+        'month_check_ins': Count('id', filter=Q(check_in_date__gte=month_start, check_in_date__lt=month_end)),
+    }).items():
+        row = per_hotel.setdefault(hotel, {})
+        row['month_check_ins'] = row.get('month_check_ins', 0) + counts['month_check_ins']
+    for hotel, counts in _grouped(requests, 'room__hotel_id', {
+        'pending_requests': Count('id', filter=Q(status='New')),
+    }).items():
+        per_hotel.setdefault(hotel, {}).update(counts)
+
+    counter_names = list(ROOM_COUNTERS) + ['guests_in_house', 'today_checkouts', 'today_arrivals', 'month_check_ins', 'pending_requests']
+    hotels = []
+    for hotel, counts in sorted(per_hotel.items()):
+        hotels.append({'hotel_id': hotel, 'hotel_name': names.get(hotel, ''), **{name: counts.get(name, 0) for name in counter_names}})
+
+    totals = {name: sum(h[name] for h in hotels) for name in counter_names}
+    return {**totals, 'hotels': hotels, 'generated_at': timezone.now()}
+
+
+kpi_cache = MicroCache(MICRO_CACHE_TTL, name='kpi')
+
+
+def get_kpis(hotel_id=None):
+    return kpi_cache.get_or_compute(('kpi', hotel_id), lambda: compute_kpis(hotel_id))
+
+
+async def aget_kpis(hotel_id=None):
+    """Bản async: trúng micro-cache thì trả ngay trên event loop, trượt thì tính
+    trong luồng đồng bộ (giữ single-flight bằng khóa luồng của MicroCache)."""
+    cached = kpi_cache.peek(('kpi', hotel_id))
+    if cached is not None:
+        return cached
+    return await sync_to_async(get_kpis)(hotel_id)
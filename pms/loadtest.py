@@ -0,0 +1,283 @@
+"""
+Bộ sinh tải đầu-cuối: mô phỏng N thiết bị lễ tân gọi vào một server đang chạy
+(runserver, gunicorn hoặc uvicorn) qua HTTP thật.
+
+Mỗi thiết bị đăng nhập (phiên web + token API) rồi lặp: chọn một kịch bản theo
+trọng số, chạy, nghỉ một khoảng "suy nghĩ" ngẫu nhiên. Kịch bản:
+
+- poll:        /api/dashboard/ + /ajax/new-requests-count/ (màn hình chính)
+- walk_in:     chọn phòng Trống/Chờ dọn trên dashboard -> WalkInCheckinAPIView
+- add_service: phòng đang có khách -> chi tiết phòng -> /api/add-service/
+- checkout:    phòng đang có khách -> xem hóa đơn (GET) -> xác nhận (POST)
+- booking:     đặt trước một phòng ngẫu nhiên qua /api/bookings/
+
+Nên chạy trên dữ liệu của seed_hotel. Độ trễ được ghi theo từng endpoint
+(nhãn cố định, không chứa ID) để tính p50/p95/p99.
+"""
+import asyncio
+import json
+import random
+import time
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import timedelta
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode, urlsplit
+
+from django.utils import timezone
+
+DEFAULT_WEIGHTS = {'poll': 80, 'walk_in': 5, 'add_service': 7, 'checkout': 4, 'booking': 4}
+
+
+class LoadTestError(Exception):
+    pass
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+@dataclass
+class EndpointStats:
+    latencies: list = field(default_factory=list)
+    client_errors: int = 0  # 4xx: lỗi nghiệp vụ (phòng vừa bị người khác nhận...)
+    errors: int = 0  # 5xx, timeout, mất kết nối
+
+    def summary(self, elapsed):
+        return {
+            'requests': len(self.latencies) + self.errors,
+            'rps': round(len(self.latencies) / elapsed, 2) if elapsed else 0,
+            'p50_ms': round(percentile(self.latencies, 0.50), 1),
+            'p95_ms': round(percentile(self.latencies, 0.95), 1),
+            'p99_ms': round(percentile(self.latencies, 0.99), 1),
+            'client_errors': self.client_errors,
+            'errors': self.errors,
+        }
+
+
+class Recorder:
+    def __init__(self):
+        self.endpoints = defaultdict(EndpointStats)
+        self.started = time.monotonic()
+
+    def record(self, label, status, elapsed_ms):
+        stats = self.endpoints[label]
+        if status is None or status >= 500:
+            stats.errors += 1
+            return
+        stats.latencies.append(elapsed_ms)
+        if status >= 400:
+            stats.client_errors += 1
+
+    def report(self):
+        elapsed = time.monotonic() - self.started
+        endpoints = {label: stats.summary(elapsed) for label, stats in sorted(self.endpoints.items())}
+        everything = [ms for stats in self.endpoints.values() for ms in stats.latencies]
+        errors = sum(stats.errors for stats in self.endpoints.values())
+        total = len(everything) + errors
+        return {
+            'elapsed_s': round(elapsed, 1),
+            'rps': round(len(everything) / elapsed, 2) if elapsed else 0,
+            'p50_ms': round(percentile(everything, 0.50), 1),
+            'p95_ms': round(percentile(everything, 0.95), 1),
+            'p99_ms': round(percentile(everything, 0.99), 1),
+            'error_rate': round(errors / total, 4) if total else 0,
+            'endpoints': endpoints,
+        }
+
+
+def _dechunk(body):
+    out, rest = bytearray(), body
+    while rest:
+        size_line, _, rest = rest.partition(b'\r\n')
+        size = int(size_line.split(b';')[0], 16)
+        if size == 0:
+            break
+        out += rest[:size]
+        rest = rest[size + 2:]
+    return bytes(out)
+
+
+class HttpClient:
+    """Client HTTP/1.1 tối giản (Connection: close) có giữ cookie, đủ cho thử tải."""
+
+    def __init__(self, base_url, recorder, timeout=30):
+        parts = urlsplit(base_url)
+        if parts.scheme != 'http' or not parts.hostname:
+            raise LoadTestError("Chỉ hỗ trợ URL http://host[:port]")
+        self.host, self.port, self.netloc = parts.hostname, parts.port or 80, parts.netloc
+        self.recorder = recorder
+        self.timeout = timeout
+        self.cookies = {}
+        self.token = None
+
+    async def request(self, method, path, label, data=None, form=None):
+        headers = {'Host': self.netloc, 'Connection': 'close', 'Accept': 'application/json'}
+        body = b''
+        if data is not None:
+            body = json.dumps(data).encode()
+            headers['Content-Type'] = 'application/json'
+        elif form is not None:
+            body = urlencode(form).encode()
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        if body or method == 'POST':
+            headers['Content-Length'] = str(len(body))
+        if self.token and path.startswith('/api/'):
+            headers['Authorization'] = f'Token {self.token}'
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f'{k}={v}' for k, v in self.cookies.items())
+        if 'csrftoken' in self.cookies and method == 'POST':
+            headers['X-CSRFToken'] = self.cookies['csrftoken']
+        head = f"{method} {path} HTTP/1.1\r\n" + ''.join(f"{k}: {v}\r\n" for k, v in headers.items()) + "\r\n"
+
+        started = time.perf_counter()
+        try:
+            status, response_headers, payload = await asyncio.wait_for(self._exchange(head.encode() + body), self.timeout)
+        except (OSError, asyncio.TimeoutError, ValueError, IndexError):
+            self.recorder.record(label, None, (time.perf_counter() - started) * 1000)
+            return None, None
+        self.recorder.record(label, status, (time.perf_counter() - started) * 1000)
+        for value in response_headers.get('set-cookie', []):
+            for name, morsel in SimpleCookie(value).items():
+                self.cookies[name] = morsel.value
+        if 'application/json' in response_headers.get('content-type', [''])[0]:
+            try:
+                return status, json.loads(payload)
+            except ValueError:
+                return status, None
+        return status, payload
+
+    async def _exchange(self, raw):
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            writer.write(raw)
+            await writer.drain()
+            response = await reader.read()
+        finally:
+            writer.close()
+        head, _, payload = response.partition(b'\r\n\r\n')
+        lines = head.decode('latin-1').split('\r\n')
+        status = int(lines[0].split()[1])
+        headers = defaultdict(list)
+        for line in lines[1:]:
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()].append(value.strip())
+        if 'chunked' in headers.get('transfer-encoding', [''])[0]:
+            payload = _dechunk(payload)
+        return status, headers, payload
+
+
+class FrontDesk:
+    """Một thiết bị lễ tân ảo."""
+
+    def __init__(self, client, rng, service_ids):
+        self.client = client
+        self.rng = rng
+        self.service_ids = service_ids
+        self.rooms = []
+
+    async def login(self, username, password):
+        await self.client.request('GET', '/login/', 'login')
+        await self.client.request('POST', '/login/', 'login', form={
+            'username': username, 'password': password, 'csrfmiddlewaretoken': self.client.cookies.get('csrftoken', ''),
+        })
+        status, data = await self.client.request('POST', '/api/login/', 'api_login', data={'username': username, 'password': password})
+        if status != 200 or not isinstance(data, dict):
+            raise LoadTestError(f"Đăng nhập API thất bại (HTTP {status})")
+        self.client.token = data['token']
+
+    async def poll(self):
+        status, data = await self.client.request('GET', '/api/dashboard/', 'GET /api/dashboard/')
+        if status == 200 and isinstance(data, list):
+            self.rooms = data
+        await self.client.request('GET', '/ajax/new-requests-count/', 'GET /ajax/new-requests-count/')
+
+    def _pick_room(self, statuses):
+        candidates = [room for room in self.rooms if room['status'] in statuses]
+        return self.rng.choice(candidates) if candidates else None
+
+    async def walk_in(self):
+        room = self._pick_room({'Vacant', 'Dirty'})
+        if room is None:
+            return await self.poll()
+        await self.client.request('POST', f"/api/room/{room['room_id']}/walk-in/", 'POST /api/room/:id/walk-in/', data={
+            'full_name': 'Khách Thử Tải', 'id_number': f"LT{uuid.uuid4().hex[:12]}", 'phone': '0900000000',
+        })
+        room['status'] = 'Occupied'
+
+    async def add_service(self):
+        room = self._pick_room({'Occupied'})
+        if room is None or not self.service_ids:
+            return await self.poll()
+        status, detail = await self.client.request('GET', f"/api/room/{room['room_id']}/", 'GET /api/room/:id/')
+        reservation = (detail or {}).get('current_reservation') if status == 200 else None
+        if reservation:
+            await self.client.request('POST', '/api/add-service/', 'POST /api/add-service/', data={
+                'reservation_id': reservation['id'], 'item_id': self.rng.choice(self.service_ids), 'quantity': self.rng.randint(1, 3),
+            })
+
+    async def checkout(self):
+        room = self._pick_room({'Occupied'})
+        if room is None or not room.get('reservation_id'):
+            return await self.poll()
+        path = f"/api/reservation/{room['reservation_id']}/checkout/"
+        status, bill = await self.client.request('GET', path, 'GET /api/reservation/:id/checkout/')
+        if status == 200:
+            await self.client.request('POST', path, 'POST /api/reservation/:id/checkout/', data={'final_bill': bill.get('final_bill', 0)})
+            room['status'] = 'Vacant'
+
+    async def booking(self):
+        if not self.rooms:
+            return await self.poll()
+        room = self.rng.choice(self.rooms)
+        check_in = timezone.now() + timedelta(days=self.rng.randint(30, 365))
+        await self.client.request('POST', '/api/bookings/', 'POST /api/bookings/', data={
+            'room_id': room['room_id'], 'guest_name': 'Khách Đặt Trước', 'guest_id_number': f"LT{uuid.uuid4().hex[:12]}",
+            'check_in_date': check_in.isoformat(), 'check_out_date': (check_in + timedelta(days=2)).isoformat(),
+        })
+
+
+async def _device(desk, options, deadline):
+    rng = desk.rng
+    await asyncio.sleep(rng.uniform(0, options['think_ms'] / 1000))  # lệch pha các thiết bị
+    scenarios, weights = zip(*options['weights'].items())
+    while time.monotonic() < deadline:
+        await getattr(desk, rng.choices(scenarios, weights)[0])()
+        await asyncio.sleep(rng.expovariate(1000 / options['think_ms']) if options['think_ms'] else 0)
+
+
+async def _login(desk, options):
+    await desk.login(options['username'], options['password'])
+    await desk.poll()
+    return desk
+
+
+async def run_load(base_url, devices, duration, options):
+    """Chạy `devices` thiết bị trong `duration` giây; trả về báo cáo (dict).
+    Đăng nhập (băm mật khẩu rất tốn CPU) làm trước và không tính vào kết quả."""
+    setup = Recorder()
+    desks = [
+        FrontDesk(HttpClient(base_url, setup, options['timeout']), random.Random(options['seed'] + i), [])
+        for i in range(devices)
+    ]
+    logged_in = await asyncio.gather(*(_login(desk, options) for desk in desks), return_exceptions=True)
+    desks = [desk for desk in logged_in if isinstance(desk, FrontDesk)]
+    if not desks:
+        raise LoadTestError(f"Không thiết bị nào đăng nhập được: {logged_in[0]}")
+    status, services = await desks[0].client.request('GET', '/api/services/', 'setup')
+    service_ids = [item['id'] for item in services] if status == 200 and isinstance(services, list) else []
+
+    recorder = Recorder()
+    for desk in desks:
+        desk.client.recorder = recorder
+        desk.service_ids = service_ids
+    deadline = time.monotonic() + duration
+    await asyncio.gather(*(_device(desk, options, deadline) for desk in desks))
+    report = recorder.report()
+    report['devices'] = devices
+    report['failed_devices'] = devices - len(desks)
+    return report
@@ -0,0 +1,109 @@
+"""
+Các cache nhỏ trong bộ nhớ tiến trình (mỗi worker một bản), an toàn luồng.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.utils.connection import ConnectionProxy
+
+_registry = []
+
+# Số phiên bản của các cache trong tiến trình, dùng chung giữa các worker (settings.CACHES['versions'])
+version_cache = ConnectionProxy(caches, 'versions')
+
+
+class CacheStats:
+    """Đếm hit/miss của một cache có tên (xuất ra /metrics). Không khóa: lệch vài
+    đơn vị khi nhiều luồng cùng tăng là chấp nhận được."""
+
+    def __init__(self, name):
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        if name:
+            _registry.append(self)
+
+
+def registered_stats():
+    return list(_registry)
+
+
+class LRUCache:
+    """LRU có hạn dùng, an toàn luồng, đủ nhỏ để giữ trong mỗi worker."""
+
+    def __init__(self, maxsize, ttl, name=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stats = CacheStats(name)
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.stats.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.stats.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.stats.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class MicroCache:
+    """Cache vài giây + single-flight: mỗi khóa chỉ một luồng tính lại."""
+
+    def __init__(self, ttl, name=None):
+        self.ttl = ttl
+        self.stats = CacheStats(name)
+        self._values = {}
+        self._locks = {}
+        self._guard = threading.Lock()
+
+    def peek(self, key, default=None):
+        """Giá trị còn hạn (không tính lại, không chờ khóa) - dùng cho view async."""
+        entry = self._values.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self.stats.hits += 1
+            return entry[1]
+        return default
+
+    def get_or_compute(self, key, compute):
+        entry = self._values.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self.stats.hits += 1
+            return entry[1]
+        with self._guard:
+            lock = self._locks.setdefault(key, threading.Lock())
+        with lock:
+            entry = self._values.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self.stats.hits += 1
+                return entry[1]
+            self.stats.misses += 1
+            value = compute()
+            self._values[key] = (time.monotonic() + self.ttl, value)
+            return value
+
+    def clear(self):
+        self._values.clear()
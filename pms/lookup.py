@@ -0,0 +1,65 @@
+"""
+Tra cứu nhanh khách cũ theo tiền tố CCCD / SĐT khi lễ tân đang gõ.
+
+Truy vấn dùng điều kiện khoảng (id_number >= 'q' AND id_number < 'q+1') nên
+đi thẳng vào B-tree index trên cả SQLite lẫn PostgreSQL (LIKE 'q%' thì không
+dùng được index với collation mặc định). Kết quả các tiền tố gần đây được giữ
+trong một LRU nhỏ trong tiến trình, tự hết hạn sau CACHE_TTL giây và bị xóa
+khi có thay đổi Guest/Reservation (xem signals.py).
+"""
+import re
+
+from django.db.models import OuterRef, Q, Subquery
+
+from .local_cache import LRUCache
+from .models import Guest, Reservation
+
+MIN_PREFIX_LENGTH = 3
+MAX_RESULTS = 8
+CACHE_SIZE = 256
+CACHE_TTL = 60  # giây
+
+PROFILE_FIELDS = ('id', 'full_name', 'dob', 'id_type', 'id_number', 'phone', 'address', 'license_plate')
+
+
+lookup_cache = LRUCache(CACHE_SIZE, CACHE_TTL, name='lookup')
+
+
+def normalize_query(raw):
+    """Bỏ khoảng trắng/dấu chấm/gạch, đổi +84 thành 0, viết hoa (số hộ chiếu)."""
+    value = re.sub(r'[\s.\-()]', '', raw or '').upper()
+    if value.startswith('+84'):
+        value = '0' + value[3:]
+    return value
+
+
+def _prefix_filter(field, prefix):
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return Q(**{f'{field}__gte': prefix, f'{field}__lt': upper, f'{field}__startswith': prefix})
+
+
+def lookup_guests(raw_query):
+    """Trả về danh sách hồ sơ rút gọn (kèm lần ở gần nhất) khớp tiền tố."""
+    prefix = normalize_query(raw_query)
+    if len(prefix) < MIN_PREFIX_LENGTH:
+        return []
+
+    results = lookup_cache.get(prefix)
+    if results is not None:
+        return results
+
+    last_stay = Reservation.objects.filter(
+        Q(guest=OuterRef('pk')) | Q(occupants=OuterRef('pk'))
+    ).exclude(status='Cancelled').order_by('-check_in_date')
+
+    results = list(
+        Guest.objects.filter(_prefix_filter('id_number', prefix) | _prefix_filter('phone', prefix))
+        .annotate(
+            last_check_in=Subquery(last_stay.values('check_in_date')[:1]),
+            last_room=Subquery(last_stay.values('room__room_number')[:1]),
+        )
+        .order_by('id_number')
+        .values(*PROFILE_FIELDS, 'last_check_in', 'last_room')[:MAX_RESULTS]
+    )
+    lookup_cache.set(prefix, results)
+    return results
@@ -0,0 +1,34 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from pms.archive import archivable, archive_reservations
+
+
+class Command(BaseCommand):
+    help = (
+        "Chuyển booking đã đóng (Completed/Cancelled) quá hạn sang bảng lưu trữ, kèm phụ phí, "
+        "khách ở và yêu cầu của khách. Chạy lại an toàn: mỗi lô một transaction."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.ARCHIVE['AFTER_DAYS'], help="Lưu trữ booking kết thúc quá số ngày này")
+        parser.add_argument('--batch-size', type=int, default=settings.ARCHIVE['BATCH_SIZE'], help="Số booking mỗi transaction")
+        parser.add_argument('--dry-run', action='store_true', help="Chỉ đếm, không chuyển")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        if options['dry_run']:
+            self.stdout.write(f"{archivable(cutoff).count()} booking kết thúc trước {cutoff:%d/%m/%Y} sẽ được lưu trữ.")
+            return
+        started = time.perf_counter()
+        moved = archive_reservations(
+            cutoff, options['batch_size'],
+            progress=lambda total: self.stdout.write(f"  đã chuyển {total} booking..."),
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Đã lưu trữ {moved} booking kết thúc trước {cutoff:%d/%m/%Y} trong {time.perf_counter() - started:.1f}s."
+        ))
@@ -0,0 +1,45 @@
+import gzip
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from pms.renderers import ColumnarJSONRenderer, FastJSONRenderer
+
+DEFAULT_ENDPOINTS = ['/api/dashboard/', '/api/bookings/?page_size=200', '/api/guests/?page_size=200']
+
+
+class Command(BaseCommand):
+    help = "So sánh kích thước (thô/gzip) và thời gian render của các định dạng JSON trên dữ liệu hiện có."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help="Tên đăng nhập dùng để gọi API (mặc định: superuser đầu tiên)")
+        parser.add_argument('--repeat', type=int, default=50, help="Số lần render để đo thời gian")
+        parser.add_argument('endpoints', nargs='*', default=DEFAULT_ENDPOINTS)
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(username=options['user']).first() if options['user'] else \
+            User.objects.filter(is_superuser=True).first()
+        if user is None:
+            raise CommandError("Không tìm thấy người dùng để gọi API.")
+        client = APIClient()
+        client.force_authenticate(user)
+
+        renderers = [('drf-json', JSONRenderer()), ('orjson', FastJSONRenderer()), ('columnar', ColumnarJSONRenderer())]
+        self.stdout.write(f"{'endpoint':<34}{'format':<10}{'bytes':>10}{'gzip':>10}{'ms/render':>11}")
+        for url in options['endpoints']:
+            response = client.get(url)
+            if response.status_code != 200:
+                self.stdout.write(self.style.WARNING(f"{url}: HTTP {response.status_code}"))
+                continue
+            for name, renderer in renderers:
+                body = renderer.render(response.data)
+                started = time.perf_counter()
+                for _ in range(options['repeat']):
+                    renderer.render(response.data)
+                elapsed_ms = (time.perf_counter() - started) * 1000 / options['repeat']
+                self.stdout.write(
+                    f"{url[:33]:<34}{name:<10}{len(body):>10}{len(gzip.compress(body)):>10}{elapsed_ms:>11.3f}"
+                )
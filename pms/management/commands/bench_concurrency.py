@@ -0,0 +1,105 @@
+import asyncio
+import random
+import statistics
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def fetch(host, port, request_head, slow):
+    """Một request HTTP/1.1 (Connection: close); `slow` giây giữa hai nửa header
+    mô phỏng client mạng chậm (điện thoại 3G) giữ kết nối."""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        half = len(request_head) // 2
+        writer.write(request_head[:half])
+        if slow:
+            await writer.drain()
+            await asyncio.sleep(slow)
+        writer.write(request_head[half:])
+        await writer.drain()
+        status_line = await reader.readline()
+        await reader.read()
+        return int(status_line.split()[1])
+    finally:
+        writer.close()
+
+
+async def run_level(host, port, request_head, connections, duration, slow, timeout):
+    latencies, statuses, errors = [], {}, 0
+    deadline = time.monotonic() + duration
+
+    async def client():
+        nonlocal errors
+        # Lệch pha để các client chậm không cùng gửi xong một lúc
+        await asyncio.sleep(random.uniform(0, slow))
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                status = await asyncio.wait_for(fetch(host, port, request_head, slow), timeout)
+            except (OSError, asyncio.TimeoutError, IndexError, ValueError):
+                errors += 1
+                continue
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.monotonic()
+    await asyncio.gather(*(client() for _ in range(connections)))
+    return latencies, statuses, errors, time.monotonic() - started
+
+
+class Command(BaseCommand):
+    help = (
+        "Đo số kết nối đồng thời một server (đang chạy) chịu được: mở N kết nối song song "
+        "gọi liên tục một URL và báo req/s, độ trễ p50/p95/p99, lỗi/timeout. Chạy lần lượt với "
+        "gunicorn sync (core.wsgi) và uvicorn (core.asgi) cùng số worker để so sánh."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('url', help="VD: http://127.0.0.1:8001/api/live/dashboard/")
+        parser.add_argument('--connections', default='1,10,50,200', help="Các mức kết nối đồng thời, phân tách bằng dấu phẩy")
+        parser.add_argument('--duration', type=float, default=10, help="Số giây chạy mỗi mức")
+        parser.add_argument('--slow-ms', type=int, default=0, help="Client chậm: giữ kết nối bấy nhiêu ms giữa hai nửa request")
+        parser.add_argument('--timeout', type=float, default=10, help="Quá thời gian này (giây) tính là lỗi")
+        parser.add_argument('--token', help="Token API (header Authorization: Token ...)")
+        parser.add_argument('--cookie', help="Header Cookie, cho các URL web cần đăng nhập (sessionid=...)")
+
+    def handle(self, *args, **options):
+        parts = urlsplit(options['url'])
+        if parts.scheme != 'http' or not parts.hostname:
+            raise CommandError("Chỉ hỗ trợ URL http://host[:port]/path")
+        try:
+            levels = [int(level) for level in options['connections'].split(',')]
+        except ValueError:
+            raise CommandError("--connections phải là danh sách số nguyên, VD 1,10,50")
+
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+        headers = [f"GET {path} HTTP/1.1", f"Host: {parts.netloc}", "Connection: close", "Accept: application/json"]
+        if options['token']:
+            headers.append(f"Authorization: Token {options['token']}")
+        if options['cookie']:
+            headers.append(f"Cookie: {options['cookie']}")
+        request_head = ('\r\n'.join(headers) + '\r\n\r\n').encode('latin-1')
+
+        self.stdout.write(f"{'conns':>6}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}  status")
+        for connections in levels:
+            latencies, statuses, errors, elapsed = asyncio.run(run_level(
+                parts.hostname, parts.port or 80, request_head, connections,
+                options['duration'], options['slow_ms'] / 1000, options['timeout'],
+            ))
+            self.stdout.write(
+                f"{connections:>6}{len(latencies) / elapsed:>10.1f}"
+                f"{(statistics.median(latencies) if latencies else 0):>10.1f}"
+                f"{percentile(latencies, 0.95):>10.1f}{percentile(latencies, 0.99):>10.1f}{errors:>8}  "
+                + ' '.join(f"{code}x{count}" for code, count in sorted(statuses.items()))
+            )
@@ -0,0 +1,106 @@
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections, transaction
+
+from pms.models import GuestRequest, Hotel, Room
+
+# Cấu hình cũ (trước profile SQLite): rollback journal, DEFERRED, chờ khóa 5s
+LEGACY_OPTIONS = {'init_command': 'PRAGMA journal_mode=DELETE', 'timeout': 5}
+
+
+def write_worker(path, options, room_ids, duration, results):
+    """Mỗi tiến trình là một worker gunicorn: lặp transaction kiểu check-out
+    (đọc phòng, ghi yêu cầu, cập nhật phòng) trong `duration` giây."""
+    connection.settings_dict['NAME'] = path
+    connection.settings_dict['OPTIONS'] = options
+    latencies, errors = [], 0
+    deadline = time.monotonic() + duration
+    index = os.getpid()
+    while time.monotonic() < deadline:
+        room_id = room_ids[index % len(room_ids)]
+        index += 1
+        started = time.perf_counter()
+        try:
+            with transaction.atomic():
+                room = Room.objects.get(id=room_id)
+                GuestRequest.objects.create(room_id=room_id, content='bench', status='Completed')
+                Room.objects.filter(id=room_id).update(status=room.status)
+        except OperationalError:
+            errors += 1
+            continue
+        latencies.append((time.perf_counter() - started) * 1000)
+    connection.close()
+    results.put((latencies, errors))
+
+
+class Command(BaseCommand):
+    help = (
+        "Đo số transaction ghi/giây trên một bản sao của DB SQLite khi nhiều worker cùng ghi. "
+        "So sánh với cấu hình cũ bằng --legacy."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', default='1,2,4,8', help="Các mức số tiến trình ghi, phân tách bằng dấu phẩy")
+        parser.add_argument('--duration', type=float, default=5, help="Số giây chạy mỗi mức")
+        parser.add_argument('--legacy', action='store_true', help="Dùng cấu hình cũ (rollback journal, DEFERRED, timeout 5s)")
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError("Chỉ dùng cho SQLite.")
+        try:
+            levels = [int(level) for level in options['workers'].split(',')]
+        except ValueError:
+            raise CommandError("--workers phải là danh sách số nguyên, VD 1,2,4")
+
+        workdir = tempfile.mkdtemp(prefix='pms-bench-')
+        path = os.path.join(workdir, 'bench.sqlite3')
+        try:
+            # Sao chép DB bằng backup API (an toàn cả khi DB đang chạy ở chế độ WAL)
+            source = sqlite3.connect(connection.settings_dict['NAME'])
+            with sqlite3.connect(path) as target:
+                source.backup(target)
+            source.close()
+
+            db_options = LEGACY_OPTIONS if options['legacy'] else connection.settings_dict['OPTIONS']
+            connections.close_all()
+            connection.settings_dict['NAME'] = path
+            connection.settings_dict['OPTIONS'] = db_options
+            room_ids = list(Room.objects.values_list('id', flat=True)[:20])
+            if not room_ids:
+                hotel = Hotel.objects.create(name='Bench', code='BENCH')
+                room_ids = [Room.objects.create(hotel=hotel, room_number=f'B{i}', room_type='Bench').id for i in range(20)]
+            connections.close_all()
+
+            mode = 'legacy' if options['legacy'] else 'profile'
+            self.stdout.write(f"Cấu hình: {mode}, DB tạm: {path}")
+            self.stdout.write(f"{'workers':>8}{'writes/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'locked':>8}")
+            context = multiprocessing.get_context('fork')
+            for workers in levels:
+                results = context.Queue()
+                processes = [
+                    context.Process(target=write_worker, args=(path, db_options, room_ids, options['duration'], results))
+                    for _ in range(workers)
+                ]
+                started = time.monotonic()
+                for process in processes:
+                    process.start()
+                collected = [results.get() for _ in processes]
+                for process in processes:
+                    process.join()
+                elapsed = time.monotonic() - started
+                latencies = sorted(ms for batch, _ in collected for ms in batch)
+                errors = sum(count for _, count in collected)
+                p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] if latencies else 0
+                self.stdout.write(
+                    f"{workers:>8}{len(latencies) / elapsed:>10.1f}"
+                    f"{(statistics.median(latencies) if latencies else 0):>10.2f}{p99:>10.2f}{errors:>8}"
+                )
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
@@ -0,0 +1,180 @@
+import json
+import os
+import platform
+import shutil
+import statistics
+import tempfile
+import time
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from pms.authentication import auth_cache
+from pms.kpi import kpi_cache
+from pms.lookup import lookup_cache
+from pms.models import Reservation, Room
+from pms.portal import portal_cache
+from pms.seeding import SeedOptions, seed_hotel
+
+# Quy mô dữ liệu: (số khách sạn, số phòng mỗi khách sạn, số năm lịch sử)
+SCALES = {
+    'small': SeedOptions(hotels=1, rooms_per_hotel=20, years=0.5),
+    'medium': SeedOptions(hotels=3, rooms_per_hotel=50, years=2),
+    'large': SeedOptions(hotels=5, rooms_per_hotel=100, years=3),
+    # Lưới 300 phòng, ít lịch sử: đo chi phí render dashboard/lịch đặt phòng
+    'grid300': SeedOptions(hotels=3, rooms_per_hotel=100, years=0.1, future_days=30),
+}
+
+
+def endpoints():
+    """(tên, url, là API?) - tên giữ cố định để so sánh các báo cáo với nhau."""
+    occupied = Reservation.objects.filter(status='Occupied').values_list('id', 'room_id').first()
+    reservation_id, room_id = occupied or (0, Room.objects.values_list('id', flat=True).first() or 0)
+    return [
+        ('dashboard', reverse('dashboard'), False),
+        ('booking_management', reverse('booking-management'), False),
+        ('billing_details', reverse('billing-details', args=[reservation_id]), False),
+        ('export_temporary_registry', reverse('export-registry'), False),
+        ('management_dashboard', reverse('management-dashboard'), False),
+        ('manage_guests', reverse('manage-guests'), False),
+        ('api_dashboard', reverse('api-dashboard'), True),
+        ('api_live_dashboard', reverse('api-live-dashboard'), True),
+        ('api_room_detail', reverse('api-room-detail', args=[room_id]), True),
+        ('api_bookings', reverse('reservation-list'), True),
+        ('api_guests', reverse('guest-list'), True),
+        ('api_guest_requests', reverse('guestrequest-list'), True),
+        ('api_management_stats', reverse('api-management-stats'), True),
+        ('api_bootstrap', reverse('api-bootstrap'), True),
+    ]
+
+
+def clear_local_caches():
+    cache.clear()
+    for local in (auth_cache, kpi_cache, lookup_cache, portal_cache):
+        local.clear()
+
+
+class QueryCounter:
+    # Không dùng connection.queries: request_started gọi reset_queries() giữa chừng
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def time_endpoint(client, url, headers, repeat):
+    clear_local_caches()
+    queries = QueryCounter()
+    with connection.execute_wrapper(queries):
+        started = time.perf_counter()
+        response = client.get(url, headers=headers)
+        cold_ms = (time.perf_counter() - started) * 1000
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        client.get(url, headers=headers)
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return {
+        'status': response.status_code,
+        'bytes': len(response.content),
+        'queries': queries.count,
+        'cold_ms': round(cold_ms, 2),
+        'median_ms': round(statistics.median(samples), 2),
+        'p95_ms': round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 2),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Đo thời gian các view/API nóng ở nhiều quy mô dữ liệu (mỗi quy mô một DB SQLite tạm, "
+        "sinh bằng seed_hotel) và xuất báo cáo JSON để so sánh giữa các phiên bản."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scales', default='small,medium', help=f"Các quy mô: {', '.join(SCALES)}")
+        parser.add_argument('--repeat', type=int, default=20, help="Số lần gọi mỗi endpoint (sau lần đầu)")
+        parser.add_argument('--only', help="Chỉ đo các endpoint này (tên, phân tách bằng dấu phẩy)")
+        parser.add_argument('--output', help="Ghi báo cáo JSON ra file")
+        parser.add_argument('--baseline', help="Báo cáo JSON cũ để in tỉ lệ thay đổi median")
+
+    def handle(self, *args, **options):
+        scales = options['scales'].split(',')
+        unknown = [scale for scale in scales if scale not in SCALES]
+        if unknown:
+            raise CommandError(f"Quy mô không hợp lệ: {', '.join(unknown)}")
+        only = set(options['only'].split(',')) if options['only'] else None
+        baseline = {}
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as fh:
+                baseline = json.load(fh).get('scales', {})
+
+        report = {
+            'generated_at': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'repeat': options['repeat'],
+            'scales': {},
+        }
+        original = dict(connection.settings_dict)
+        workdir = tempfile.mkdtemp(prefix='pms-bench-')
+        try:
+            for scale in scales:
+                report['scales'][scale] = self.run_scale(scale, os.path.join(workdir, f'{scale}.sqlite3'), options, only)
+                self.print_scale(scale, report['scales'][scale], baseline.get(scale, {}))
+        finally:
+            connections.close_all()
+            connection.settings_dict.clear()
+            connection.settings_dict.update(original)
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as fh:
+                json.dump(report, fh, ensure_ascii=False, indent=2, sort_keys=True)
+            self.stdout.write(self.style.SUCCESS(f"Đã ghi báo cáo: {options['output']}"))
+
+    def run_scale(self, scale, path, options, only):
+        # DB SQLite tạm riêng cho từng quy mô, không đụng tới dữ liệu thật
+        connections.close_all()
+        connection.settings_dict.update({'ENGINE': 'django.db.backends.sqlite3', 'NAME': path, 'OPTIONS': settings.SQLITE_OPTIONS})
+        call_command('migrate', verbosity=0, interactive=False)
+        started = time.perf_counter()
+        seeded = seed_hotel(SCALES[scale])
+        seed_seconds = time.perf_counter() - started
+
+        user = User.objects.create_superuser('bench', 'bench@example.com', 'bench')
+        token = Token.objects.create(user=user)
+        client = Client()
+        client.force_login(user)
+        api_headers = {'Authorization': f'Token {token.key}'}
+
+        results = {}
+        for name, url, is_api in endpoints():
+            if only and name not in only:
+                continue
+            results[name] = time_endpoint(client, url, api_headers if is_api else {}, options['repeat'])
+        return {'dataset': seeded.counts, 'seed_seconds': round(seed_seconds, 1), 'endpoints': results}
+
+    def print_scale(self, scale, data, baseline):
+        dataset = ', '.join(f"{count} {name}" for name, count in data['dataset'].items())
+        self.stdout.write(self.style.MIGRATE_HEADING(f"[{scale}] {dataset}"))
+        self.stdout.write(f"{'endpoint':<28}{'status':>7}{'queries':>8}{'cold ms':>10}{'median ms':>11}{'p95 ms':>9}{'KB':>8}  vs baseline")
+        for name, row in data['endpoints'].items():
+            previous = baseline.get('endpoints', {}).get(name)
+            delta = f"x{row['median_ms'] / previous['median_ms']:.2f}" if previous and previous['median_ms'] else ''
+            self.stdout.write(
+                f"{name:<28}{row['status']:>7}{row['queries']:>8}{row['cold_ms']:>10.1f}"
+                f"{row['median_ms']:>11.2f}{row['p95_ms']:>9.2f}{row['bytes'] / 1024:>8.1f}  {delta}"
+            )
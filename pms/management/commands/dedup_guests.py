@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from pms.dedup import DEFAULT_THRESHOLD, MAX_BLOCK_SIZE, cluster_candidates, find_duplicates, merge_guests
+from pms.models import Guest
+
+
+class Command(BaseCommand):
+    help = "Tìm (và tùy chọn gộp) các hồ sơ khách bị trùng theo tên + ngày sinh / SĐT."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help="Điểm tối thiểu để coi là trùng (0..1)")
+        parser.add_argument('--max-block-size', type=int, default=MAX_BLOCK_SIZE, help="Bỏ qua khối chặn lớn hơn ngưỡng này")
+        parser.add_argument('--merge', action='store_true', help="Gộp luôn các nhóm trùng vào hồ sơ cũ nhất")
+        parser.add_argument('--limit', type=int, default=50, help="Số cặp tối đa in ra màn hình")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        candidates = find_duplicates(threshold=options['threshold'], max_block_size=options['max_block_size'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f"Tìm thấy {len(candidates)} cặp nghi trùng trong {elapsed:.1f}s.")
+
+        names = dict(
+            Guest.objects.filter(pk__in={pk for c in candidates[:options['limit']] for pk in (c.first, c.second)})
+            .values_list('pk', 'full_name')
+        )
+        for c in candidates[:options['limit']]:
+            self.stdout.write(f"  {c.score:.3f}  #{c.first} {names.get(c.first, '')}  <->  #{c.second} {names.get(c.second, '')}")
+
+        if not options['merge']:
+            return
+
+        merged = 0
+        for primary_id, duplicate_ids in cluster_candidates(candidates).items():
+            merged += merge_guests(primary_id, duplicate_ids)
+        self.stdout.write(self.style.SUCCESS(f"Đã gộp {merged} hồ sơ trùng."))
@@ -0,0 +1,95 @@
+import asyncio
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from pms.loadtest import DEFAULT_WEIGHTS, LoadTestError, run_load
+
+
+class Command(BaseCommand):
+    help = (
+        "Thử tải đầu-cuối: N thiết bị lễ tân ảo (dashboard, số yêu cầu, walk-in, thêm dịch vụ, "
+        "check-out, đặt phòng) gọi vào server đang chạy; báo req/s và p50/p95/p99 từng endpoint. "
+        "--saturate tăng dần số thiết bị để tìm điểm bão hòa."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('url', help="Địa chỉ server, VD http://127.0.0.1:8000")
+        parser.add_argument('--username', required=True)
+        parser.add_argument('--password', required=True)
+        parser.add_argument('--devices', type=int, default=10, help="Số thiết bị đồng thời")
+        parser.add_argument('--duration', type=float, default=30, help="Số giây chạy (mỗi mức nếu --saturate)")
+        parser.add_argument('--think-ms', type=int, default=1000, help="Thời gian nghỉ trung bình giữa hai thao tác")
+        parser.add_argument('--weights', help="Trọng số kịch bản, VD poll=80,walk_in=5,add_service=7,checkout=4,booking=4")
+        parser.add_argument('--timeout', type=float, default=30)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--saturate', action='store_true', help="Nhân đôi số thiết bị cho đến khi vượt SLO")
+        parser.add_argument('--max-devices', type=int, default=512)
+        parser.add_argument('--slo-p95-ms', type=float, default=1000, help="Ngưỡng p95 coi là bão hòa")
+        parser.add_argument('--max-error-rate', type=float, default=0.01, help="Tỉ lệ lỗi 5xx/timeout coi là bão hòa")
+        parser.add_argument('--output', help="Ghi báo cáo JSON ra file")
+
+    def handle(self, *args, **options):
+        options['weights'] = self.parse_weights(options['weights'])
+        try:
+            if options['saturate']:
+                report = self.saturate(options)
+            else:
+                report = asyncio.run(run_load(options['url'], options['devices'], options['duration'], options))
+                self.print_report(report)
+        except LoadTestError as exc:
+            raise CommandError(str(exc))
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as fh:
+                json.dump(report, fh, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Đã ghi báo cáo: {options['output']}"))
+
+    def parse_weights(self, raw):
+        if not raw:
+            return dict(DEFAULT_WEIGHTS)
+        weights = {}
+        for part in raw.split(','):
+            name, _, value = part.partition('=')
+            if name not in DEFAULT_WEIGHTS or not value.isdigit():
+                raise CommandError(f"Trọng số không hợp lệ: {part!r} (kịch bản: {', '.join(DEFAULT_WEIGHTS)})")
+            weights[name] = int(value)
+        if not any(weights.values()):
+            raise CommandError("Cần ít nhất một kịch bản có trọng số > 0")
+        return weights
+
+    def saturate(self, options):
+        levels, devices, best = [], max(1, options['devices']), None
+        while devices <= options['max_devices']:
+            report = asyncio.run(run_load(options['url'], devices, options['duration'], options))
+            levels.append(report)
+            self.stdout.write(
+                f"{devices:>5} thiết bị: {report['rps']:>8.1f} req/s  p95 {report['p95_ms']:>8.1f} ms  "
+                f"p99 {report['p99_ms']:>8.1f} ms  lỗi {report['error_rate']:.2%}"
+            )
+            within_slo = report['p95_ms'] <= options['slo_p95_ms'] and report['error_rate'] <= options['max_error_rate']
+            # Thêm thiết bị mà thông lượng gần như không tăng cũng là dấu hiệu bão hòa
+            flat = best is not None and report['rps'] < best['rps'] * 1.05
+            if not within_slo or flat:
+                break
+            best = report
+            devices *= 2
+        if best is None:
+            self.stdout.write(self.style.WARNING("Ngay mức thấp nhất đã vượt SLO."))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"Điểm bão hòa: khoảng {best['devices']} thiết bị, {best['rps']:.1f} req/s (p95 {best['p95_ms']:.0f} ms)"
+            ))
+            self.print_report(best)
+        return {'levels': levels, 'saturation': best['devices'] if best else 0}
+
+    def print_report(self, report):
+        self.stdout.write(f"{'endpoint':<38}{'req':>7}{'req/s':>8}{'p50':>8}{'p95':>8}{'p99':>8}{'4xx':>6}{'err':>6}")
+        for label, row in report['endpoints'].items():
+            self.stdout.write(
+                f"{label:<38}{row['requests']:>7}{row['rps']:>8.1f}{row['p50_ms']:>8.1f}"
+                f"{row['p95_ms']:>8.1f}{row['p99_ms']:>8.1f}{row['client_errors']:>6}{row['errors']:>6}"
+            )
+        self.stdout.write(
+            f"Tổng: {report['rps']:.1f} req/s, p50 {report['p50_ms']} ms, p95 {report['p95_ms']} ms, "
+            f"p99 {report['p99_ms']} ms, lỗi {report['error_rate']:.2%}, {report['devices']} thiết bị"
+        )
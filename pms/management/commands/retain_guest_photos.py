@@ -0,0 +1,36 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from pms.photo_retention import eligible_guests, retain_photos
+
+
+class Command(BaseCommand):
+    help = (
+        "Chuyển ảnh giấy tờ của khách đã trả phòng quá hạn từ media/guest_ids sang kho lạnh "
+        "(PHOTO_RETENTION). Chạy lại được bất cứ lúc nào: tiếp tục từ checkpoint."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.PHOTO_RETENTION['AFTER_DAYS'], help="Số ngày giữ ảnh sau lần trả phòng cuối")
+        parser.add_argument('--batch-size', type=int, default=settings.PHOTO_RETENTION['BATCH_SIZE'], help="Số khách mỗi lô")
+        parser.add_argument('--limit', type=int, help="Số khách tối đa cho lần chạy này (lần sau làm tiếp)")
+        parser.add_argument('--dry-run', action='store_true', help="Chỉ đếm số khách đủ điều kiện")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        if options['dry_run']:
+            self.stdout.write(f"{eligible_guests(cutoff).count()} khách có ảnh đủ điều kiện chuyển sang kho lạnh.")
+            return
+        started = time.perf_counter()
+        stats = retain_photos(
+            cutoff, options['batch_size'], options['limit'],
+            progress=lambda s: self.stdout.write(f"  {s['guests']} khách, {s['photos']} ảnh..."),
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Đã chuyển {stats['photos']} ảnh ({stats['bytes'] / 1024 / 1024:.1f} MB) của {stats['guests']} khách "
+            f"trong {time.perf_counter() - started:.1f}s; {stats['missing']} ảnh không còn file."
+        ))
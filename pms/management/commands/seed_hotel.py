@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from pms import catalog
+from pms.seeding import SeedOptions, clear_seed_data, seed_hotel
+
+
+class Command(BaseCommand):
+    help = "Sinh dữ liệu giả lập (khách sạn, phòng, nhiều năm booking, khách, dịch vụ, yêu cầu, lịch trực) bằng bulk_create."
+
+    def add_arguments(self, parser):
+        defaults = SeedOptions()
+        parser.add_argument('--hotels', type=int, default=defaults.hotels)
+        parser.add_argument('--rooms-per-hotel', type=int, default=defaults.rooms_per_hotel)
+        parser.add_argument('--years', type=float, default=defaults.years, help="Số năm lịch sử booking")
+        parser.add_argument('--future-days', type=int, default=defaults.future_days, help="Số ngày booking tương lai")
+        parser.add_argument('--occupancy', type=float, default=defaults.occupancy, help="Công suất phòng trung bình (0..1)")
+        parser.add_argument('--batch-size', type=int, default=defaults.batch_size)
+        parser.add_argument('--seed', type=int, default=defaults.seed, help="Hạt giống ngẫu nhiên (cùng seed = cùng dữ liệu)")
+        parser.add_argument('--reset', action='store_true', help="Xóa dữ liệu giả lập cũ trước khi sinh")
+
+    def handle(self, *args, **options):
+        if options['reset']:
+            clear_seed_data()
+            self.stdout.write("Đã xóa dữ liệu giả lập cũ.")
+        seed_options = SeedOptions(
+            hotels=options['hotels'], rooms_per_hotel=options['rooms_per_hotel'], years=options['years'],
+            future_days=options['future_days'], occupancy=options['occupancy'],
+            batch_size=options['batch_size'], seed=options['seed'],
+        )
+        started = time.perf_counter()
+        result = seed_hotel(seed_options, log=self.stdout.write)
+        for name in ('rooms', 'services'):
+            catalog.invalidate(name)
+        summary = ', '.join(f"{count} {name}" for name, count in result.counts.items())
+        self.stdout.write(self.style.SUCCESS(f"Đã tạo {summary} trong {time.perf_counter() - started:.1f}s."))
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+MODES = ('PASSIVE', 'FULL', 'RESTART', 'TRUNCATE')
+
+
+class Command(BaseCommand):
+    help = (
+        "Checkpoint file WAL của SQLite vào DB chính (và PRAGMA optimize). Chạy bằng cron, "
+        "hoặc với --every để chạy nền định kỳ cạnh gunicorn."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+        parser.add_argument('--mode', default='TRUNCATE', choices=MODES, help="TRUNCATE thu file -wal về 0 byte")
+        parser.add_argument('--every', type=int, default=0, help="Lặp lại sau mỗi bấy nhiêu giây (0 = chạy một lần)")
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if connection.vendor != 'sqlite':
+            raise CommandError("Chỉ dùng cho SQLite.")
+        while True:
+            started = time.perf_counter()
+            with connection.cursor() as cursor:
+                cursor.execute(f"PRAGMA wal_checkpoint({options['mode']})")
+                busy, wal_pages, checkpointed = cursor.fetchone()
+                cursor.execute("PRAGMA optimize")
+            message = f"WAL: {checkpointed}/{wal_pages} trang đã ghi vào DB ({(time.perf_counter() - started) * 1000:.0f} ms)"
+            self.stdout.write(self.style.WARNING(message + ", còn transaction đang đọc") if busy else message)
+            if not options['every']:
+                return
+            connection.close()
+            time.sleep(options['every'])
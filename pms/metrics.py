@@ -0,0 +1,344 @@
+"""
+Số liệu vận hành cho Prometheus (GET /metrics, định dạng text 0.0.4).
+
+Nhiều worker gunicorn cùng ghi vào một file SQLite cục bộ (settings.METRICS['STORE']):
+
+- Counter/histogram (độ trễ theo view, số truy vấn, hit/miss cache, thời gian
+  xuất file, nén ảnh) được cộng dồn trong bộ nhớ của từng worker rồi đẩy vào
+  store dạng "value = value + delta" mỗi FLUSH_SECONDS giây, nên scrape ở worker
+  nào cũng thấy tổng của cả máy.
+- Gauge nghiệp vụ (số phòng theo trạng thái, yêu cầu khách đang chờ của từng
+  khách sạn) được ghi lại khi dữ liệu đổi (signals.py, sau commit), chỉ tính cho
+  khách sạn bị ảnh hưởng; scrape không truy vấn DB nghiệp vụ. Toàn bộ gauge được
+  tính lại khi store còn trống và mỗi GAUGE_REBUILD_SECONDS để bù các thay đổi
+  không qua signal (queryset.update, sửa tay trong DB).
+"""
+import atexit
+import functools
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from .local_cache import registered_stats
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+EXPORT_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+IMAGE_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+
+ROOM_STATUSES = ('Vacant', 'Occupied', 'Dirty', 'Booked')
+
+# Tên -> (kiểu, mô tả); cũng là thứ tự in ra
+FAMILIES = {
+    'pms_http_request_duration_seconds': ('histogram', 'Thời gian xử lý request theo tên URL.'),
+    'pms_http_responses_total': ('counter', 'Số phản hồi theo tên URL và nhóm mã trạng thái.'),
+    'pms_db_queries_per_request': ('histogram', 'Số truy vấn SQL mỗi request theo tên URL.'),
+    'pms_local_cache_requests_total': ('counter', 'Số lần đọc cache trong tiến trình, theo kết quả hit/miss.'),
+    'pms_local_cache_hit_ratio': ('gauge', 'Tỉ lệ hit của cache trong tiến trình (tính từ counter).'),
+    'pms_export_duration_seconds': ('histogram', 'Thời gian tạo file xuất (Excel...).'),
+    'pms_image_processing_in_progress': ('gauge', 'Số ảnh giấy tờ đang được nén (hàng đợi xử lý ảnh).'),
+    'pms_image_processing_duration_seconds': ('histogram', 'Thời gian nén một ảnh giấy tờ.'),
+    'pms_rooms': ('gauge', 'Số phòng theo khách sạn và trạng thái.'),
+    'pms_guest_requests_pending': ('gauge', 'Số yêu cầu của khách đang chờ xử lý (New) theo khách sạn.'),
+}
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(**labels):
+    return ','.join(f'{key}="{_escape(value)}"' for key, value in sorted(labels.items()))
+
+
+class MetricsStore:
+    """Bảng metric(family, name, labels, le, value) trong một file SQLite dùng chung."""
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._local = threading.local()
+
+    @property
+    def db(self):
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS metric (family TEXT NOT NULL, name TEXT NOT NULL, labels TEXT NOT NULL,"
+                " le TEXT NOT NULL DEFAULT '', value REAL NOT NULL, PRIMARY KEY (name, labels, le))"
+            )
+            db.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value REAL NOT NULL)')
+            self._local.db = db
+        return db
+
+    @contextmanager
+    def transaction(self):
+        db = self.db
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            yield db
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        db.execute('COMMIT')
+
+    def add(self, deltas):
+        """deltas: {(family, name, labels, le): số cần cộng thêm}."""
+        with self.transaction() as db:
+            db.executemany(
+                'INSERT INTO metric (family, name, labels, le, value) VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT (name, labels, le) DO UPDATE SET value = value + excluded.value',
+                [(*key, value) for key, value in deltas.items()],
+            )
+
+    def replace(self, family, rows, labels_prefix=None):
+        """Ghi đè gauge: xóa các dòng cũ của family (chỉ các dòng có labels bắt đầu
+        bằng labels_prefix nếu có) rồi ghi rows [(labels, value)]."""
+        with self.transaction() as db:
+            if labels_prefix is None:
+                db.execute('DELETE FROM metric WHERE family = ?', (family,))
+            else:
+                db.execute('DELETE FROM metric WHERE family = ? AND substr(labels, 1, ?) = ?', (family, len(labels_prefix), labels_prefix))
+            db.executemany(
+                "INSERT INTO metric (family, name, labels, le, value) VALUES (?, ?, ?, '', ?)",
+                [(family, family, labels, value) for labels, value in rows],
+            )
+
+    def get_meta(self, key):
+        row = self.db.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key, value):
+        self.db.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (key, value))
+
+    def rows(self):
+        return self.db.execute('SELECT family, name, labels, le, value FROM metric').fetchall()
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store():
+    path = str(settings.METRICS['STORE'])
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = MetricsStore(path)
+        return _stores[path]
+
+
+def enabled():
+    return settings.METRICS['ENABLED']
+
+
+class _Buffer:
+    """Delta của worker này, chưa đẩy vào store."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.deltas = defaultdict(float)
+        self.cache_seen = {}
+        self.last_flush = time.monotonic()
+
+    def inc(self, family, labels, amount=1):
+        with self.lock:
+            self.deltas[(family, family, labels, '')] += amount
+
+    def observe(self, family, labels, value, buckets):
+        with self.lock:
+            for bound in buckets:
+                if value <= bound:
+                    self.deltas[(family, f'{family}_bucket', labels, repr(float(bound)))] += 1
+            self.deltas[(family, f'{family}_bucket', labels, '+Inf')] += 1
+            self.deltas[(family, f'{family}_sum', labels, '')] += value
+            self.deltas[(family, f'{family}_count', labels, '')] += 1
+
+    def take(self):
+        with self.lock:
+            for stats in registered_stats():
+                seen_hits, seen_misses = self.cache_seen.get(stats.name, (0, 0))
+                hits, misses = stats.hits, stats.misses
+                self.cache_seen[stats.name] = (hits, misses)
+                family = 'pms_local_cache_requests_total'
+                if hits - seen_hits:
+                    self.deltas[(family, family, _labels(cache=stats.name, result='hit'), '')] += hits - seen_hits
+                if misses - seen_misses:
+                    self.deltas[(family, family, _labels(cache=stats.name, result='miss'), '')] += misses - seen_misses
+            deltas, self.deltas = self.deltas, defaultdict(float)
+            self.last_flush = time.monotonic()
+        return deltas
+
+
+_buffer = _Buffer()
+
+
+def flush(force=True):
+    """Đẩy delta của worker vào store (force=False: chỉ khi đã quá FLUSH_SECONDS)."""
+    if not force and time.monotonic() - _buffer.last_flush < settings.METRICS['FLUSH_SECONDS']:
+        return
+    deltas = _buffer.take()
+    if not deltas:
+        return
+    try:
+        get_store().add(deltas)
+    except sqlite3.Error:
+        # Store bận/hỏng: trả delta lại để lần sau đẩy tiếp, không làm hỏng request
+        with _buffer.lock:
+            for key, value in deltas.items():
+                _buffer.deltas[key] += value
+
+
+atexit.register(lambda: enabled() and flush())
+
+
+def observe_request(view, method, status, seconds, queries):
+    labels = _labels(view=view, method=method)
+    _buffer.observe('pms_http_request_duration_seconds', labels, seconds, LATENCY_BUCKETS)
+    _buffer.observe('pms_db_queries_per_request', _labels(view=view), queries, QUERY_BUCKETS)
+    _buffer.inc('pms_http_responses_total', _labels(view=view, code=f'{status // 100}xx'))
+    flush(force=False)
+
+
+def timed_export(name):
+    """Decorator cho view xuất file: ghi thời gian vào pms_export_duration_seconds."""
+    def decorator(view_func):
+        @functools.wraps(view_func)
+        def wrapper(*args, **kwargs):
+            if not enabled():
+                return view_func(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return view_func(*args, **kwargs)
+            finally:
+                _buffer.observe('pms_export_duration_seconds', _labels(export=name), time.perf_counter() - started, EXPORT_BUCKETS)
+        return wrapper
+    return decorator
+
+
+def _add_now(family, amount):
+    try:
+        get_store().add({(family, family, '', ''): amount})
+    except sqlite3.Error:
+        _buffer.inc(family, '', amount)
+
+
+@contextmanager
+def image_processing():
+    """Bao quanh việc nén một ảnh: tăng/giảm số ảnh đang xử lý và ghi thời gian."""
+    if not enabled():
+        yield
+        return
+    # Ghi thẳng vào store (không qua buffer) để scrape thấy ngay ảnh đang xử lý
+    _add_now('pms_image_processing_in_progress', 1)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _add_now('pms_image_processing_in_progress', -1)
+        _buffer.observe('pms_image_processing_duration_seconds', '', time.perf_counter() - started, IMAGE_BUCKETS)
+
+
+def _hotel_gauges(hotel_ids=None):
+    """{mã khách sạn: (số phòng theo trạng thái, số yêu cầu chờ)} - 2 truy vấn GROUP BY."""
+    from django.db.models import Count
+    from .models import GuestRequest, Hotel, Room
+
+    hotels = Hotel.objects.all() if hotel_ids is None else Hotel.objects.filter(pk__in=hotel_ids)
+    codes = dict(hotels.values_list('id', 'code'))
+    gauges = {code: ({status: 0 for status in ROOM_STATUSES}, 0) for code in codes.values()}
+    for hotel_id, status, count in (
+        Room.objects.filter(hotel_id__in=codes).values_list('hotel_id', 'status').annotate(n=Count('id')).order_by()
+    ):
+        gauges[codes[hotel_id]][0][status] = count
+    for hotel_id, count in (
+        GuestRequest.objects.filter(room__hotel_id__in=codes, status='New')
+        .values_list('room__hotel_id').annotate(n=Count('id')).order_by()
+    ):
+        gauges[codes[hotel_id]] = (gauges[codes[hotel_id]][0], count)
+    return gauges
+
+
+def _gauge_rows(gauges):
+    rooms, pending = [], []
+    for code, (statuses, requests) in gauges.items():
+        rooms.extend((_labels(hotel=code, status=status), count) for status, count in statuses.items())
+        pending.append((_labels(hotel=code), requests))
+    return rooms, pending
+
+
+def refresh_hotel_gauges(hotel_id):
+    """Tính lại gauge của một khách sạn (gọi sau commit khi phòng/yêu cầu thay đổi)."""
+    gauges = _hotel_gauges([hotel_id])
+    if not gauges:
+        return  # khách sạn vừa bị xóa, xem forget_hotel()
+    store = get_store()
+    rooms, pending = _gauge_rows(gauges)
+    # Nhãn được sắp theo tên nên dòng của một khách sạn luôn bắt đầu bằng hotel="<mã>"
+    prefix = _labels(hotel=next(iter(gauges)))
+    store.replace('pms_rooms', rooms, labels_prefix=prefix + ',')
+    store.replace('pms_guest_requests_pending', pending, labels_prefix=prefix)
+
+
+def forget_hotel(code):
+    store = get_store()
+    prefix = _labels(hotel=code)
+    store.replace('pms_rooms', [], labels_prefix=prefix + ',')
+    store.replace('pms_guest_requests_pending', [], labels_prefix=prefix)
+
+
+def rebuild_business_gauges():
+    store = get_store()
+    rooms, pending = _gauge_rows(_hotel_gauges())
+    store.replace('pms_rooms', rooms)
+    store.replace('pms_guest_requests_pending', pending)
+    store.set_meta('gauges_rebuilt_at', time.time())
+
+
+def _format_value(value):
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+def render():
+    """Nội dung /metrics (đẩy delta của worker hiện tại trước khi đọc)."""
+    flush()
+    store = get_store()
+    rebuilt_at = store.get_meta('gauges_rebuilt_at')
+    if rebuilt_at is None or time.time() - rebuilt_at > settings.METRICS['GAUGE_REBUILD_SECONDS']:
+        rebuild_business_gauges()
+
+    by_family = defaultdict(list)
+    cache_totals = defaultdict(lambda: [0.0, 0.0])
+    for family, name, labels, le, value in store.rows():
+        by_family[family].append((name, labels, le, value))
+        if family == 'pms_local_cache_requests_total':
+            cache = labels.split('"')[1]
+            cache_totals[cache][0 if 'result="hit"' in labels else 1] += value
+    for cache, (hits, misses) in cache_totals.items():
+        by_family['pms_local_cache_hit_ratio'].append(
+            ('pms_local_cache_hit_ratio', _labels(cache=cache), '', hits / (hits + misses) if hits + misses else 0.0)
+        )
+
+    suffix_order = {'_bucket': 0, '_sum': 1, '_count': 2}
+    lines = []
+    for family, (kind, help_text) in FAMILIES.items():
+        samples = by_family.get(family)
+        if not samples:
+            continue
+        lines.append(f'# HELP {family} {help_text}')
+        lines.append(f'# TYPE {family} {kind}')
+        samples.sort(key=lambda s: (
+            s[1], suffix_order.get(s[0][len(family):], 0), float('inf') if s[2] == '+Inf' else float(s[2] or 0),
+        ))
+        for name, labels, le, value in samples:
+            if le:
+                labels = f'{labels},le="{le}"' if labels else f'le="{le}"'
+            lines.append(f'{name}{{{labels}}} {_format_value(value)}' if labels else f'{name} {_format_value(value)}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,198 @@
+import json
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.middleware.gzip import GZipMiddleware
+
+from . import instrumentation, metrics, profiling
+
+performance_logger = logging.getLogger('pms.performance')
+
+
+class ApiGZipMiddleware(GZipMiddleware):
+    """
+    Nén gzip cho phản hồi API lớn (App Android trên mạng di động).
+    Chỉ áp dụng cho /api/ để không nén các trang HTML có CSRF token (BREACH).
+    """
+    path_prefix = '/api/'
+    min_length = 1024
+
+    def process_response(self, request, response):
+        if not request.path.startswith(self.path_prefix):
+            return response
+        if not response.streaming and len(response.content) < self.min_length:
+            return response
+        return super().process_response(request, response)
+
+
+class RequestTimingMiddleware:
+    """
+    Đo từng request: số truy vấn, thời gian DB, truy vấn lặp lại (N+1), thời gian
+    render template, tổng thời gian. Kết quả gắn vào header Server-Timing (xem
+    được ở tab Network của trình duyệt) và ghi một dòng log JSON vào logger
+    'pms.performance' khi vượt ngưỡng trong settings.REQUEST_TIMING.
+
+    Khi tắt (mặc định), middleware tự gỡ khỏi chuỗi lúc khởi động nên không tốn gì.
+    Đặt ngay sau SecurityMiddleware để tính cả thời gian của các middleware khác.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        config = settings.REQUEST_TIMING
+        if not config['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.server_timing = config['SERVER_TIMING_HEADER']
+        self.slow_ms = config['SLOW_REQUEST_MS']
+        self.slow_queries = config['SLOW_QUERY_COUNT']
+        self.duplicate_threshold = config['DUPLICATE_QUERY_THRESHOLD']
+        instrumentation.instrument_templates()
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with instrumentation.measure() as stats:
+            response = self.get_response(request)
+        return self.finish(request, response, stats)
+
+    async def __acall__(self, request):
+        with instrumentation.measure() as stats:
+            response = await self.get_response(request)
+        return self.finish(request, response, stats)
+
+    def finish(self, request, response, stats):
+        total_ms = stats.total_ms
+        if self.server_timing:
+            response['Server-Timing'] = ', '.join([
+                f'db;dur={stats.db_ms:.1f};desc="{stats.queries} queries"',
+                f'dup;desc="{stats.duplicate_queries} duplicate queries"',
+                f'tpl;dur={stats.template_ms:.1f}',
+                f'total;dur={total_ms:.1f}',
+            ])
+        repeated = stats.top_duplicates()
+        if (
+            total_ms >= self.slow_ms
+            or stats.queries >= self.slow_queries
+            or (repeated and repeated[0][1] >= self.duplicate_threshold)
+        ):
+            match = request.resolver_match
+            performance_logger.warning('slow_request %s', json.dumps({
+                'method': request.method,
+                'path': request.path,
+                'view': match.view_name if match else None,
+                'status': response.status_code,
+                'total_ms': round(total_ms, 1),
+                'db_ms': round(stats.db_ms, 1),
+                'queries': stats.queries,
+                'duplicate_queries': stats.duplicate_queries,
+                'template_ms': round(stats.template_ms, 1),
+                'top_duplicates': [{'sql': sql[:300], 'count': count} for sql, count in repeated],
+            }, ensure_ascii=False))
+        return response
+
+
+class ProfilingMiddleware:
+    """
+    Chạy request dưới profiler khi superuser xin (header X-Profile hoặc ?_profile=),
+    xem pms/profiling.py. Phản hồi có header X-Profile-Id (hoặc X-Profile:
+    rate-limited khi đã hết lượt trong giờ). Đặt sau AuthenticationMiddleware.
+    Khi PROFILING tắt, middleware tự gỡ khỏi chuỗi.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.PROFILING['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        mode = profiling.requested_mode(request)
+        user = profiling.profiling_user(request) if mode else None
+        if user is None:
+            return self.get_response(request)
+        if not profiling.acquire_slot():
+            response = self.get_response(request)
+            response['X-Profile'] = 'rate-limited'
+            return response
+        profiler = profiling.make_profiler(mode)
+        started = time.perf_counter()
+        profiler.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.stop()
+        return self.finish(profiler, mode, request, response, started, user)
+
+    async def __acall__(self, request):
+        mode = profiling.requested_mode(request)
+        user = await profiling.aprofiling_user(request) if mode else None
+        if user is None:
+            return await self.get_response(request)
+        if not profiling.acquire_slot():
+            response = await self.get_response(request)
+            response['X-Profile'] = 'rate-limited'
+            return response
+        profiler = profiling.make_profiler(mode)
+        started = time.perf_counter()
+        profiler.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            profiler.stop()
+        return self.finish(profiler, mode, request, response, started, user)
+
+    def finish(self, profiler, mode, request, response, started, user):
+        duration_ms = (time.perf_counter() - started) * 1000
+        response['X-Profile-Id'] = profiling.save_profile(profiler, mode, request, response, duration_ms, user)
+        return response
+
+
+class MetricsMiddleware:
+    """
+    Ghi độ trễ và số truy vấn của mỗi request theo tên URL cho /metrics (pms/metrics.py).
+    Request không khớp URL nào được gộp vào view="unmatched" để không sinh nhãn
+    theo từng đường dẫn lạ. Khi METRICS tắt, middleware tự gỡ khỏi chuỗi.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICS['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        with instrumentation.measure() as stats:
+            response = self.get_response(request)
+        self.record(request, response, started, stats)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        with instrumentation.measure() as stats:
+            response = await self.get_response(request)
+        self.record(request, response, started, stats)
+        return response
+
+    def record(self, request, response, started, stats):
+        match = request.resolver_match
+        metrics.observe_request(
+            match.view_name if match else 'unmatched', request.method, response.status_code,
+            time.perf_counter() - started, stats.queries,
+        )
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.8 on 2026-10-19 14:21
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pms', '0008_reservation_deposit_alter_room_status'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='guest',
+            index=models.Index(fields=['created_at', 'id'], name='guest_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='guestrequest',
+            index=models.Index(fields=['created_at', 'id'], name='guestrequest_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['created_at', 'id'], name='reservation_created_id_idx'),
+        ),
+    ]
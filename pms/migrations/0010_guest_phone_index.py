@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 14:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pms', '0009_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='guest',
+            name='phone',
+            field=models.CharField(blank=True, db_index=True, max_length=20, null=True, verbose_name='Số điện thoại'),
+        ),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 5.2.8 on 2026-10-19 15:15
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pms', '0010_guest_phone_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedReservation',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('check_in_date', models.DateTimeField(verbose_name='Thời gian Check-in')),
+                ('check_out_date', models.DateTimeField(blank=True, null=True, verbose_name='Thời gian Check-out')),
+                ('deposit', models.DecimalField(decimal_places=0, default=0, max_digits=10, verbose_name='Tiền đặt cọc')),
+                ('status', models.CharField(choices=[('Confirmed', 'Đã xác nhận'), ('Occupied', 'Đang cư trú'), ('Completed', 'Đã hoàn tất'), ('Cancelled', 'Đã hủy')], max_length=20, verbose_name='Trạng thái đặt phòng')),
+                ('note', models.TextField(blank=True, verbose_name='Ghi chú')),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('guest', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_bookings', to='pms.guest', verbose_name='Người đặt chính')),
+                ('occupants', models.ManyToManyField(blank=True, related_name='archived_stays', to='pms.guest', verbose_name='Danh sách khách ở')),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_reservations', to='pms.room', verbose_name='Phòng')),
+            ],
+            options={
+                'verbose_name': '9. Đặt phòng (lưu trữ)',
+                'verbose_name_plural': '9. Đặt phòng đã lưu trữ',
+                'ordering': ['check_in_date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedGuestRequest',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('content', models.TextField(verbose_name='Nội dung yêu cầu')),
+                ('status', models.CharField(choices=[('New', 'Mới'), ('Processing', 'Đang xử lý'), ('Completed', 'Hoàn thành')], max_length=20, verbose_name='Trạng thái')),
+                ('created_at', models.DateTimeField()),
+                ('assigned_staff', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Giao cho nhân viên')),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_requests', to='pms.room', verbose_name='Phòng yêu cầu')),
+                ('reservation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='requests', to='pms.archivedreservation', verbose_name='Booking liên quan')),
+            ],
+            options={
+                'verbose_name': 'Yêu cầu Khách (lưu trữ)',
+                'verbose_name_plural': 'Yêu cầu Khách đã lưu trữ',
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedServiceCharge',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('item_name', models.CharField(max_length=100, verbose_name='Tên Dịch vụ')),
+                ('quantity', models.IntegerField(default=1, verbose_name='Số lượng')),
+                ('price', models.DecimalField(decimal_places=0, max_digits=10, verbose_name='Đơn giá')),
+                ('created_at', models.DateTimeField()),
+                ('reservation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='service_charges', to='pms.archivedreservation', verbose_name='Đặt phòng')),
+            ],
+            options={
+                'verbose_name': 'Dịch vụ (lưu trữ)',
+                'verbose_name_plural': 'Dịch vụ đã lưu trữ',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='archivedreservation',
+            index=models.Index(fields=['check_in_date'], name='archived_res_check_in_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedreservation',
+            index=models.Index(fields=['check_out_date'], name='archived_res_check_out_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.8 on 2026-10-19 15:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pms', '0011_reservation_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RateRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('room_type', models.CharField(db_index=True, max_length=50, verbose_name='Loại Phòng')),
+                ('name', models.CharField(max_length=100, verbose_name='Tên (vd. Tết, Cuối tuần, Mùa hè)')),
+                ('date_from', models.DateField(verbose_name='Từ ngày')),
+                ('date_to', models.DateField(verbose_name='Đến ngày (tính cả ngày này)')),
+                ('weekdays', models.CharField(blank=True, help_text='Các chữ số 0-6 (0 = Thứ 2, 6 = Chủ nhật), để trống = mọi ngày', max_length=7, verbose_name='Thứ áp dụng')),
+                ('kind', models.CharField(choices=[('fixed', 'Giá cố định (VND/đêm)'), ('percent', '% giá gốc của phòng')], default='percent', max_length=10, verbose_name='Cách tính')),
+                ('value', models.DecimalField(decimal_places=0, help_text='VND/đêm hoặc phần trăm (120 = tăng 20%)', max_digits=10, verbose_name='Giá trị')),
+                ('priority', models.IntegerField(default=0, verbose_name='Độ ưu tiên')),
+            ],
+            options={
+                'verbose_name': '10. Giá theo ngày',
+                'verbose_name_plural': '10. Lịch giá phòng',
+                'ordering': ['room_type', 'priority', 'date_from'],
+            },
+        ),
+    ]
@@ -5,6 +5,8 @@ from io import BytesIO
 from django.core.files.base import ContentFile
 import os
 
+from . import metrics
+
 class Hotel(models.Model):
     name = models.CharField(max_length=255, verbose_name="Tên Khách sạn")
     code = models.CharField(max_length=50, unique=True, verbose_name="Mã Khách sạn") 
@@ -29,7 +31,7 @@ class Guest(models.Model):
     id_number = models.CharField(max_length=50, unique=True, verbose_name="Mã số giấy tờ")
     license_plate = models.CharField(max_length=20, null=True, blank=True, verbose_name="Biển số xe")
     address = models.CharField(max_length=500, verbose_name="Địa chỉ thường trú")
-    phone = models.CharField(max_length=20, null=True, blank=True, verbose_name="Số điện thoại")
+    phone = models.CharField(max_length=20, null=True, blank=True, db_index=True, verbose_name="Số điện thoại")
     
     photo_front = models.ImageField(upload_to='guest_ids/', null=True, blank=True, verbose_name="Ảnh mặt trước")
     photo_back = models.ImageField(upload_to='guest_ids/', null=True, blank=True, verbose_name="Ảnh mặt sau")
@@ -37,28 +39,32 @@ class Guest(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self): return self.full_name
-    class Meta: verbose_name = "3. Khách hàng"; verbose_name_plural = "3. Quản lý Khách hàng"
+    class Meta:
+        verbose_name = "3. Khách hàng"; verbose_name_plural = "3. Quản lý Khách hàng"
+        indexes = [models.Index(fields=['created_at', 'id'], name='guest_created_id_idx')]
 
     def _compress_image(self, image_field):
         if image_field and image_field.size > 100 * 1024:
-            try:
-                img = Image.open(image_field)
-                if img.mode != 'RGB': img = img.convert('RGB')
-                if img.width > 800:
-                    output_size = (800, int((800 / img.width) * img.height))
-                    img.thumbnail(output_size)
-                
-                im_io = BytesIO()
-                img.save(im_io, format='JPEG', quality=60)
-                new_image = ContentFile(im_io.getvalue())
-                new_name = os.path.splitext(image_field.name)[0] + '.jpg'
-                image_field.save(new_name, new_image, save=False)
-            except Exception as e:
-                print(f"Lỗi nén ảnh: {e}")
+            with metrics.image_processing():
+                try:
+                    img = Image.open(image_field)
+                    if img.mode != 'RGB': img = img.convert('RGB')
+                    if img.width > 800:
+                        output_size = (800, int((800 / img.width) * img.height))
+                        img.thumbnail(output_size)
+                    
+                    im_io = BytesIO()
+                    img.save(im_io, format='JPEG', quality=60)
+                    new_image = ContentFile(im_io.getvalue())
+                    new_name = os.path.splitext(image_field.name)[0] + '.jpg'
+                    image_field.save(new_name, new_image, save=False)
+                except Exception as e:
+                    print(f"Lỗi nén ảnh: {e}")
 
     def save(self, *args, **kwargs):
-        if self.photo_front: self._compress_image(self.photo_front)
-        if self.photo_back: self._compress_image(self.photo_back)
+        # Ảnh đã chuyển sang kho lạnh ("cold/...", xem photo_retention.py) không còn trong media
+        if self.photo_front and not self.photo_front.name.startswith('cold/'): self._compress_image(self.photo_front)
+        if self.photo_back and not self.photo_back.name.startswith('cold/'): self._compress_image(self.photo_back)
         super().save(*args, **kwargs)
 
 class Reservation(models.Model):
@@ -79,7 +85,9 @@ class Reservation(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     
     def __str__(self): return f"{self.guest.full_name} - {self.room.room_number}"
-    class Meta: verbose_name = "4. Đặt phòng"; verbose_name_plural = "4. Quản lý Đặt phòng"; ordering = ['check_in_date']
+    class Meta:
+        verbose_name = "4. Đặt phòng"; verbose_name_plural = "4. Quản lý Đặt phòng"; ordering = ['check_in_date']
+        indexes = [models.Index(fields=['created_at', 'id'], name='reservation_created_id_idx')]
 
 class ServiceCharge(models.Model):
     reservation = models.ForeignKey(Reservation, on_delete=models.CASCADE, verbose_name="Đặt phòng")
@@ -101,7 +109,9 @@ class GuestRequest(models.Model):
     assigned_staff = models.ForeignKey('auth.User', on_delete=models.SET_NULL, null=True, blank=True, verbose_name="Giao cho nhân viên")
     created_at = models.DateTimeField(auto_now_add=True)
     def __str__(self): return f"Yêu cầu từ P.{self.room.room_number}"
-    class Meta: verbose_name = "6. Yêu cầu Khách"; verbose_name_plural = "6. Quản lý Yêu cầu Khách"
+    class Meta:
+        verbose_name = "6. Yêu cầu Khách"; verbose_name_plural = "6. Quản lý Yêu cầu Khách"
+        indexes = [models.Index(fields=['created_at', 'id'], name='guestrequest_created_id_idx')]
 
 class ServiceItem(models.Model):
     item_name = models.CharField(max_length=100, unique=True, verbose_name="Tên Dịch vụ")
@@ -118,4 +128,65 @@ class StaffSchedule(models.Model):
     shift = models.CharField(max_length=20, choices=SHIFT_CHOICES, verbose_name="Ca làm việc")
     note = models.TextField(blank=True, null=True, verbose_name="Ghi chú")
     def __str__(self): return f"{self.staff_name} ({self.date})"
-    class Meta: verbose_name = "8. Lịch làm việc"; verbose_name_plural = "8. Quản lý Lịch làm việc"; ordering = ['-date', 'shift']
\ No newline at end of file
+    class Meta: verbose_name = "8. Lịch làm việc"; verbose_name_plural = "8. Quản lý Lịch làm việc"; ordering = ['-date', 'shift']
+
+class RateRule(models.Model):
+    """Giá theo ngày cho một loại phòng (xem pms/rates.py). Ưu tiên cao hơn đè lên thấp hơn."""
+    KIND_CHOICES = [('fixed', 'Giá cố định (VND/đêm)'), ('percent', '% giá gốc của phòng')]
+    room_type = models.CharField(max_length=50, db_index=True, verbose_name="Loại Phòng")
+    name = models.CharField(max_length=100, verbose_name="Tên (vd. Tết, Cuối tuần, Mùa hè)")
+    date_from = models.DateField(verbose_name="Từ ngày")
+    date_to = models.DateField(verbose_name="Đến ngày (tính cả ngày này)")
+    weekdays = models.CharField(max_length=7, blank=True, verbose_name="Thứ áp dụng", help_text="Các chữ số 0-6 (0 = Thứ 2, 6 = Chủ nhật), để trống = mọi ngày")
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, default='percent', verbose_name="Cách tính")
+    value = models.DecimalField(max_digits=10, decimal_places=0, verbose_name="Giá trị", help_text="VND/đêm hoặc phần trăm (120 = tăng 20%)")
+    priority = models.IntegerField(default=0, verbose_name="Độ ưu tiên")
+    def __str__(self): return f"{self.room_type}: {self.name}"
+    class Meta: verbose_name = "10. Giá theo ngày"; verbose_name_plural = "10. Lịch giá phòng"; ordering = ['room_type', 'priority', 'date_from']
+
+# --- LƯU TRỮ (xem pms/archive.py) ---
+# Booking đã đóng (Completed/Cancelled) quá hạn được chuyển sang các bảng dưới đây,
+# giữ nguyên id, để bảng nghiệp vụ chỉ còn dữ liệu "nóng".
+
+class ArchivedReservation(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    room = models.ForeignKey(Room, on_delete=models.CASCADE, related_name='archived_reservations', verbose_name="Phòng")
+    guest = models.ForeignKey(Guest, on_delete=models.CASCADE, related_name='archived_bookings', verbose_name="Người đặt chính")
+    occupants = models.ManyToManyField(Guest, related_name='archived_stays', blank=True, verbose_name="Danh sách khách ở")
+    check_in_date = models.DateTimeField(verbose_name="Thời gian Check-in")
+    check_out_date = models.DateTimeField(null=True, blank=True, verbose_name="Thời gian Check-out")
+    deposit = models.DecimalField(max_digits=10, decimal_places=0, default=0, verbose_name="Tiền đặt cọc")
+    status = models.CharField(max_length=20, choices=Reservation.STATUS_CHOICES, verbose_name="Trạng thái đặt phòng")
+    note = models.TextField(blank=True, verbose_name="Ghi chú")
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+    def __str__(self): return f"[Lưu trữ] {self.guest.full_name} - {self.room.room_number}"
+    class Meta:
+        verbose_name = "9. Đặt phòng (lưu trữ)"; verbose_name_plural = "9. Đặt phòng đã lưu trữ"; ordering = ['check_in_date']
+        indexes = [
+            models.Index(fields=['check_in_date'], name='archived_res_check_in_idx'),
+            models.Index(fields=['check_out_date'], name='archived_res_check_out_idx'),
+        ]
+
+class ArchivedServiceCharge(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    reservation = models.ForeignKey(ArchivedReservation, on_delete=models.CASCADE, related_name='service_charges', verbose_name="Đặt phòng")
+    item_name = models.CharField(max_length=100, verbose_name="Tên Dịch vụ")
+    quantity = models.IntegerField(default=1, verbose_name="Số lượng")
+    price = models.DecimalField(max_digits=10, decimal_places=0, verbose_name="Đơn giá")
+    created_at = models.DateTimeField()
+    def __str__(self): return f"{self.item_name} x {self.quantity}"
+    @property
+    def total_price(self): return self.quantity * self.price
+    class Meta: verbose_name = "Dịch vụ (lưu trữ)"; verbose_name_plural = "Dịch vụ đã lưu trữ"
+
+class ArchivedGuestRequest(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    room = models.ForeignKey(Room, on_delete=models.CASCADE, related_name='archived_requests', verbose_name="Phòng yêu cầu")
+    reservation = models.ForeignKey(ArchivedReservation, on_delete=models.CASCADE, related_name='requests', verbose_name="Booking liên quan")
+    content = models.TextField(verbose_name="Nội dung yêu cầu")
+    status = models.CharField(max_length=20, choices=GuestRequest.STATUS_CHOICES, verbose_name="Trạng thái")
+    assigned_staff = models.ForeignKey('auth.User', on_delete=models.SET_NULL, null=True, blank=True, related_name='+', verbose_name="Giao cho nhân viên")
+    created_at = models.DateTimeField()
+    def __str__(self): return f"[Lưu trữ] Yêu cầu từ P.{self.room.room_number}"
+    class Meta: verbose_name = "Yêu cầu Khách (lưu trữ)"; verbose_name_plural = "Yêu cầu Khách đã lưu trữ"
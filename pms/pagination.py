@@ -0,0 +1,132 @@
+"""
+Phân trang kiểu keyset (cursor) theo cặp khóa (created_at, id).
+
+Không dùng OFFSET và không chạy COUNT(*) cho mỗi trang: mỗi trang chỉ là một
+truy vấn "WHERE (created_at, id) < (cursor) ORDER BY created_at DESC, id DESC
+LIMIT n+1", nên tốc độ không phụ thuộc vào độ sâu trang hay tổng số dòng.
+Con trỏ mã hóa cả created_at lẫn id nên vẫn ổn định khi có dòng mới chèn vào
+hoặc nhiều dòng trùng created_at.
+"""
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+KEY_FIELDS = ('created_at', 'id')
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(obj, reverse=False):
+    """Mã hóa vị trí của một dòng thành chuỗi an toàn cho URL."""
+    raw = f"{'p' if reverse else 'n'}|{obj.created_at.isoformat()}|{obj.pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(value):
+    """Trả về (created_at, pk, reverse) hoặc None nếu không có con trỏ."""
+    if not value:
+        return None
+    try:
+        padded = value + '=' * (-len(value) % 4)
+        direction, created_at, pk = base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+        if direction not in ('n', 'p'):
+            raise ValueError(direction)
+        return datetime.fromisoformat(created_at), int(pk), direction == 'p'
+    except (ValueError, UnicodeDecodeError) as e:
+        raise InvalidCursor(value) from e
+
+
+def keyset_page(queryset, cursor, page_size):
+    """
+    Lấy một trang từ queryset theo thứ tự mới nhất trước.
+    Trả về (rows, next_cursor, previous_cursor).
+    """
+    position = decode_cursor(cursor)
+
+    if position is None or not position[2]:
+        qs = queryset.order_by('-created_at', '-id')
+        if position is not None:
+            created_at, pk, _ = position
+            qs = qs.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+        rows = list(qs[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        next_cursor = encode_cursor(rows[-1]) if has_more else None
+        previous_cursor = encode_cursor(rows[0], reverse=True) if position is not None and rows else None
+    else:
+        # Lùi trang: duyệt ngược chiều rồi đảo lại để giữ thứ tự hiển thị
+        created_at, pk, _ = position
+        qs = queryset.order_by('created_at', 'id').filter(
+            Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk)
+        )
+        rows = list(qs[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        rows.reverse()
+        previous_cursor = encode_cursor(rows[0], reverse=True) if has_more else None
+        next_cursor = encode_cursor(rows[-1]) if rows else None
+
+    return rows, next_cursor, previous_cursor
+
+
+def get_page_size(raw, default=DEFAULT_PAGE_SIZE):
+    try:
+        size = int(raw)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+class KeysetPagination(BasePagination):
+    """Phân trang mặc định cho các ViewSet của API (?cursor=...&page_size=...)."""
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.base_url = request.build_absolute_uri()
+        page_size = get_page_size(request.query_params.get(self.page_size_query_param))
+        try:
+            rows, self.next_cursor, self.previous_cursor = keyset_page(
+                queryset, request.query_params.get(self.cursor_query_param), page_size
+            )
+        except InvalidCursor:
+            raise NotFound("Con trỏ phân trang không hợp lệ.")
+        return rows
+
+    def _link(self, cursor):
+        if cursor is None:
+            return None
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def get_next_link(self):
+        return self._link(self.next_cursor)
+
+    def get_previous_link(self):
+        return self._link(self.previous_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
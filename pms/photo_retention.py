@@ -0,0 +1,260 @@
+"""
+Chuyển ảnh giấy tờ tùy thân (media/guest_ids/) sang kho lạnh sau thời hạn lưu.
+
+Khách không còn booking đang mở và đã trả phòng quá AFTER_DAYS ngày thì ảnh
+mặt trước/sau được chép sang PHOTO_RETENTION['DIR'] rồi xóa khỏi media:
+
+- FORMAT 'dir':    mỗi ảnh một file  DIR/<yyyy-mm>/<guest_id>-<mặt>.jpg
+- FORMAT 'tar.gz': mỗi lô một tarball nén cho từng tháng  DIR/<yyyy-mm>/<lô>.tar.gz
+
+(tháng = tháng tạo hồ sơ khách). Trường ảnh trong DB được đổi thành tham chiếu
+"cold/<đường dẫn>[#<member>]", mở lại bằng open_photo() (view guest-photo).
+
+File được chép theo luồng (không đọc cả ảnh vào bộ nhớ), ghi ra file tạm rồi
+đổi tên nên kho lạnh không có file dở dang. Mỗi lô: chép -> ghi checkpoint (danh
+sách file nóng chờ xóa) -> đổi tham chiếu trong một transaction -> xóa file nóng
+không còn được tham chiếu. Dừng ở bất kỳ bước nào, lần chạy sau đọc checkpoint
+và làm tiếp; vị trí quét (guest id) cũng nằm trong checkpoint nên chạy với
+--limit sẽ đi dần qua toàn bộ khách.
+"""
+import io
+import json
+import os
+import shutil
+import tarfile
+import time
+import uuid
+from collections import Counter
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from .models import ArchivedReservation, Guest, Reservation
+
+COLD_PREFIX = 'cold/'
+PHOTO_FIELDS = {'front': 'photo_front', 'back': 'photo_back'}
+CHECKPOINT_FILE = 'checkpoint.json'
+
+
+def cold_dir():
+    return Path(settings.PHOTO_RETENTION['DIR'])
+
+
+def is_cold(name):
+    return bool(name) and name.startswith(COLD_PREFIX)
+
+
+def default_cutoff():
+    return timezone.now() - timedelta(days=settings.PHOTO_RETENTION['AFTER_DAYS'])
+
+
+def _has_hot_photo(field):
+    return ~Q(**{f'{field}__isnull': True}) & ~Q(**{field: ''}) & ~Q(**{f'{field}__startswith': COLD_PREFIX})
+
+
+def eligible_guests(cutoff):
+    """Khách còn ảnh ở media, không có booking (chính hoặc ở cùng) đang mở hay kết thúc sau mốc cắt."""
+    recent = Q(status__in=['Confirmed', 'Occupied']) | Q(check_out_date__gte=cutoff) | Q(check_in_date__gte=cutoff)
+    stays = Reservation.objects.filter(Q(guest=OuterRef('pk')) | Q(occupants=OuterRef('pk'))).filter(recent)
+    archived = ArchivedReservation.objects.filter(
+        Q(guest=OuterRef('pk')) | Q(occupants=OuterRef('pk'))
+    ).filter(Q(check_out_date__gte=cutoff) | Q(check_in_date__gte=cutoff))
+    return (
+        Guest.objects.filter(created_at__lt=cutoff)
+        .filter(_has_hot_photo('photo_front') | _has_hot_photo('photo_back'))
+        .exclude(Exists(stays)).exclude(Exists(archived))
+    )
+
+
+class Checkpoint:
+    """Vị trí quét và các file nóng chờ xóa, lưu JSON trong thư mục kho lạnh."""
+
+    def __init__(self, path):
+        self.path = path
+        try:
+            with open(path, encoding='utf-8') as fh:
+                data = json.load(fh)
+        except FileNotFoundError:
+            data = {}
+        self.last_id = data.get('last_id', 0)
+        self.pending_delete = data.get('pending_delete', [])
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix('.tmp')
+        with open(tmp, 'w', encoding='utf-8') as fh:
+            json.dump({'last_id': self.last_id, 'pending_delete': self.pending_delete, 'saved_at': timezone.now().isoformat()}, fh)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, self.path)
+
+
+def _finalize(tmp, path):
+    with open(tmp, 'rb+') as fh:
+        os.fsync(fh.fileno())
+    os.replace(tmp, path)
+
+
+class DirectoryWriter:
+    def __init__(self, root):
+        self.root = root
+        self._written = []
+
+    def add(self, month, member, source, size):
+        path = self.root / month / member
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + '.part')
+        with open(tmp, 'wb') as out:
+            shutil.copyfileobj(source, out)
+        self._written.append((tmp, path))
+        return f"{COLD_PREFIX}{month}/{member}"
+
+    def close(self):
+        for tmp, path in self._written:
+            _finalize(tmp, path)
+
+    def abort(self):
+        for tmp, _ in self._written:
+            tmp.unlink(missing_ok=True)
+
+
+class TarballWriter:
+    def __init__(self, root):
+        self.root = root
+        self.batch = f"{timezone.now():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:6]}"
+        self._archives = {}  # tháng -> (tarfile, file tạm, file đích)
+
+    def add(self, month, member, source, size):
+        if month not in self._archives:
+            path = self.root / month / f"{self.batch}.tar.gz"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(path.name + '.part')
+            self._archives[month] = (tarfile.open(tmp, 'w:gz'), tmp, path)
+        info = tarfile.TarInfo(member)
+        info.size = size
+        info.mtime = int(time.time())
+        self._archives[month][0].addfile(info, source)
+        return f"{COLD_PREFIX}{month}/{self.batch}.tar.gz#{member}"
+
+    def close(self):
+        for archive, tmp, path in self._archives.values():
+            archive.close()
+            _finalize(tmp, path)
+
+    def abort(self):
+        for archive, tmp, _ in self._archives.values():
+            archive.close()
+            tmp.unlink(missing_ok=True)
+
+
+WRITERS = {'dir': DirectoryWriter, 'tar.gz': TarballWriter}
+
+
+def _delete_unreferenced(checkpoint):
+    """Xóa các file nóng đã có bản lạnh, trừ file vẫn còn được hồ sơ nào đó tham chiếu."""
+    names = checkpoint.pending_delete
+    if not names:
+        return 0
+    referenced = set()
+    for front, back in Guest.objects.filter(Q(photo_front__in=names) | Q(photo_back__in=names)).values_list('photo_front', 'photo_back'):
+        referenced.update((front, back))
+    deleted = 0
+    for name in names:
+        if name not in referenced:
+            default_storage.delete(name)
+            deleted += 1
+    checkpoint.pending_delete = []
+    return deleted
+
+
+def _move_batch(guests, checkpoint, writer_class, stats):
+    writer = writer_class(cold_dir())
+    moved = []  # (guest_id, trường, tham chiếu cũ, tham chiếu mới)
+    try:
+        for guest in guests:
+            month = f"{timezone.localtime(guest['created_at']):%Y-%m}"
+            for side, field in PHOTO_FIELDS.items():
+                old = guest[field]
+                if not old or is_cold(old):
+                    continue
+                member = f"{guest['pk']}-{side}{Path(old).suffix.lower() or '.jpg'}"
+                try:
+                    size = default_storage.size(old)
+                    with default_storage.open(old, 'rb') as source:
+                        new = writer.add(month, member, source, size)
+                except FileNotFoundError:
+                    stats['missing'] += 1
+                    continue
+                moved.append((guest['pk'], field, old, new))
+                stats['bytes'] += size
+    except BaseException:
+        writer.abort()
+        raise
+    writer.close()
+
+    # Ghi danh sách chờ xóa trước khi đổi tham chiếu: dừng sau commit thì lần sau vẫn dọn được
+    checkpoint.pending_delete = [old for _, _, old, _ in moved]
+    checkpoint.save()
+    with transaction.atomic():
+        for guest_id, field, old, new in moved:
+            # Hồ sơ vừa được tải ảnh mới thì giữ ảnh mới (bản lạnh của ảnh cũ bị bỏ)
+            stats['photos'] += Guest.objects.filter(pk=guest_id, **{field: old}).update(**{field: new})
+    _delete_unreferenced(checkpoint)
+    checkpoint.last_id = guests[-1]['pk']
+    checkpoint.save()
+    stats['guests'] += len(guests)
+
+
+def retain_photos(cutoff=None, batch_size=None, limit=None, progress=None):
+    """Chuyển ảnh của các khách đủ điều kiện sang kho lạnh. Trả về Counter
+    (guests, photos, bytes, missing). limit: số khách tối đa cho lần chạy này."""
+    config = settings.PHOTO_RETENTION
+    cutoff = cutoff or default_cutoff()
+    batch_size = batch_size or config['BATCH_SIZE']
+    writer_class = WRITERS[config['FORMAT']]
+    checkpoint = Checkpoint(cold_dir() / CHECKPOINT_FILE)
+    if checkpoint.pending_delete:  # lần chạy trước dừng giữa lô
+        _delete_unreferenced(checkpoint)
+        checkpoint.save()
+
+    stats = Counter()
+    while limit is None or stats['guests'] < limit:
+        size = batch_size if limit is None else min(batch_size, limit - stats['guests'])
+        guests = list(
+            eligible_guests(cutoff).filter(pk__gt=checkpoint.last_id).order_by('pk')
+            .values('pk', 'created_at', 'photo_front', 'photo_back')[:size]
+        )
+        if not guests:
+            # Đã quét hết: lần chạy sau bắt đầu lại từ đầu (khách mới đủ điều kiện)
+            checkpoint.last_id = 0
+            checkpoint.save()
+            break
+        _move_batch(guests, checkpoint, writer_class, stats)
+        if progress:
+            progress(stats)
+    return stats
+
+
+def open_photo(name):
+    """Mở ảnh theo tham chiếu trong DB (ở media hoặc kho lạnh). FileNotFoundError nếu không còn."""
+    if not is_cold(name):
+        return default_storage.open(name, 'rb')
+    relative, _, member = name[len(COLD_PREFIX):].partition('#')
+    root = cold_dir().resolve()
+    path = (root / relative).resolve()
+    if root not in path.parents:
+        raise FileNotFoundError(name)
+    if not member:
+        return open(path, 'rb')
+    # Đọc một member từ tar.gz (phải giải nén tuần tự): ảnh đã nén nhỏ, giữ trong bộ nhớ
+    with tarfile.open(path, 'r:gz') as archive:
+        try:
+            extracted = archive.extractfile(member)
+        except KeyError:
+            raise FileNotFoundError(name) from None
+        return io.BytesIO(extracted.read())
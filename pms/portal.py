@@ -0,0 +1,158 @@
+"""
+Hỗ trợ cho cổng yêu cầu công khai (quét QR trong phòng, không cần đăng nhập).
+
+- Phòng -> lượt ở hiện tại được cache trong tiến trình (kể cả phòng không tồn
+  tại, để bot dò ID không chạm DB). Mỗi mục gắn với thế hệ lưu trong
+  local_cache.version_cache; Room/Reservation thay đổi thì thế hệ tăng nên mọi
+  worker bỏ lượt ở cũ ngay (khách đã trả phòng không gửi yêu cầu được nữa).
+- Giới hạn tần suất kiểu token bucket trong bộ nhớ theo (phòng, IP) và theo phòng.
+- Yêu cầu trùng nội dung của cùng phòng trong COALESCE_WINDOW được gộp làm một.
+"""
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .local_cache import LRUCache, version_cache
+from .models import GuestRequest, Reservation, Room
+
+PORTAL_CACHE_TTL = 30  # giây
+GENERATION_KEY = 'pms:portal-generation'
+COALESCE_WINDOW = timedelta(minutes=2)
+
+PortalStay = namedtuple('PortalStay', 'room reservation_id guest_name')
+
+_MISSING = object()
+portal_cache = LRUCache(1024, PORTAL_CACHE_TTL, name='portal')
+
+
+def _current_stay_queryset(room):
+    return Reservation.objects.filter(room=room, status='Occupied').select_related('guest').only('id', 'guest__full_name')
+
+
+def _make_stay(room, current_res):
+    return PortalStay(room, current_res.id if current_res else None, current_res.guest.full_name if current_res else '')
+
+
+def get_generation():
+    generation = version_cache.get(GENERATION_KEY)
+    if generation is None:
+        generation = time.time_ns()
+        if not version_cache.add(GENERATION_KEY, generation, timeout=None):
+            generation = version_cache.get(GENERATION_KEY, generation)
+    return generation
+
+
+def invalidate_portal_cache():
+    version_cache.set(GENERATION_KEY, time.time_ns(), timeout=None)
+    portal_cache.clear()
+
+
+def _cached_stay(room_id, generation):
+    entry = portal_cache.get(room_id)
+    if entry is None or entry[0] != generation:
+        return _MISSING
+    return entry[1]
+
+
+def get_portal_stay(room_id):
+    """Trả về PortalStay, hoặc None nếu phòng không tồn tại."""
+    generation = get_generation()
+    stay = _cached_stay(room_id, generation)
+    if stay is not _MISSING:
+        return stay
+    room = Room.objects.filter(id=room_id).first()
+    stay = _make_stay(room, _current_stay_queryset(room).first()) if room is not None else None
+    portal_cache.set(room_id, (generation, stay))
+    return stay
+
+
+async def aget_portal_stay(room_id):
+    """Như get_portal_stay nhưng dùng ORM async (cho view chạy dưới ASGI)."""
+    generation = get_generation()
+    stay = _cached_stay(room_id, generation)
+    if stay is not _MISSING:
+        return stay
+    room = await Room.objects.filter(id=room_id).afirst()
+    stay = _make_stay(room, await _current_stay_queryset(room).afirst()) if room is not None else None
+    portal_cache.set(room_id, (generation, stay))
+    return stay
+
+
+class TokenBucketLimiter:
+    """Mỗi khóa có tối đa `capacity` lượt, hồi `refill_rate` lượt/giây."""
+
+    def __init__(self, capacity, refill_rate, max_keys=10000):
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def allow(self, key):
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - updated) * self.refill_rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return allowed
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+# 5 yêu cầu liền, sau đó 1 yêu cầu/phút cho mỗi IP trong một phòng;
+# cả phòng tối đa 20 yêu cầu liền, sau đó 2 yêu cầu/phút.
+client_limiter = TokenBucketLimiter(capacity=5, refill_rate=1 / 60)
+room_limiter = TokenBucketLimiter(capacity=20, refill_rate=1 / 30)
+
+
+def client_ip(request):
+    """IP của khách. Chỉ đọc X-Forwarded-For khi có proxy tin cậy (settings.TRUSTED_PROXY_COUNT):
+    mỗi proxy nối thêm một địa chỉ vào cuối, nên địa chỉ thứ N từ phải sang là do proxy
+    ngoài cùng ghi; phần còn lại khách có thể giả mạo để lách giới hạn tần suất."""
+    remote_addr = request.META.get('REMOTE_ADDR', '')
+    proxies = settings.TRUSTED_PROXY_COUNT
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+    if proxies <= 0 or not forwarded:
+        return remote_addr
+    addresses = [address.strip() for address in forwarded.split(',') if address.strip()]
+    if len(addresses) < proxies:
+        return remote_addr
+    return addresses[-proxies]
+
+
+def allow_submission(room_id, ip):
+    return client_limiter.allow((room_id, ip)) and room_limiter.allow(room_id)
+
+
+def _recent_duplicates(stay, content):
+    return GuestRequest.objects.filter(
+        room_id=stay.room.id, content=content, status='New',
+        created_at__gte=timezone.now() - COALESCE_WINDOW,
+    )
+
+
+def submit_request(stay, content):
+    """Tạo GuestRequest, trừ khi phòng vừa gửi đúng nội dung này và chưa được xử lý."""
+    content = ' '.join(content.split())
+    if _recent_duplicates(stay, content).exists():
+        return None
+    return GuestRequest.objects.create(room_id=stay.room.id, reservation_id=stay.reservation_id, content=content, status='New')
+
+
+async def asubmit_request(stay, content):
+    content = ' '.join(content.split())
+    if await _recent_duplicates(stay, content).aexists():
+        return None
+    return await GuestRequest.objects.acreate(room_id=stay.room.id, reservation_id=stay.reservation_id, content=content, status='New')
@@ -0,0 +1,216 @@
+"""
+Profile hiệu năng theo yêu cầu cho superuser, chạy ngay trên server thật.
+
+Kích hoạt bằng header `X-Profile: 1` hoặc tham số `?_profile=1` (giá trị
+`cprofile` để dùng profiler tất định thay cho lấy mẫu):
+
+- sample:   một luồng nền đọc stack của luồng đang xử lý request mỗi
+            INTERVAL_MS ms, ghi file .folded ("a;b;c 12" mỗi dòng) - mở thẳng
+            bằng speedscope, flamegraph.pl hoặc inferno. Gần như không làm chậm request.
+- cprofile: cProfile, ghi file .prof (pstats) - xem bằng snakeviz/flameprof.
+            Đo mọi lời gọi hàm nên bản thân request chậm đi nhiều lần.
+
+Mỗi profile kèm một file .json metadata (URL, view, người dùng, mã trạng thái,
+thời gian, số truy vấn nếu REQUEST_TIMING bật). Số profile mỗi giờ bị giới hạn
+(đếm theo file nên đúng cho cả nhiều worker) và chỉ giữ KEEP profile mới nhất.
+Danh sách xem ở /admin/profiles/.
+
+Với view async, luồng được lấy mẫu là luồng event loop nên có thể lẫn stack của
+request khác đang chạy song song.
+"""
+import cProfile
+import json
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework.exceptions import AuthenticationFailed
+
+from .authentication import CachedTokenAuthentication
+from .instrumentation import current_stats
+
+PROFILE_PARAM = '_profile'
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+PROFILE_ID_RE = re.compile(r'^\d{8}T\d{6}-[0-9a-f]{8}$')
+
+
+def requested_mode(request):
+    """'sample', 'cprofile' hoặc None nếu request không xin profile."""
+    raw = request.GET.get(PROFILE_PARAM) or request.META.get(PROFILE_HEADER)
+    if not raw or raw in ('0', 'false'):
+        return None
+    return 'cprofile' if raw == 'cprofile' else 'sample'
+
+
+def _superuser(user):
+    return user if user is not None and user.is_active and user.is_superuser else None
+
+
+def profiling_user(request):
+    """Superuser đang gọi request (None nếu không phải)."""
+    if _superuser(request.user):
+        return request.user
+    # Request API chưa qua DRF nên request.user còn ẩn danh: tự xác thực token
+    try:
+        result = CachedTokenAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return None
+    return _superuser(result[0] if result else None)
+
+
+async def aprofiling_user(request):
+    user = await request.auser()
+    if _superuser(user):
+        return user
+    try:
+        result = await CachedTokenAuthentication().aauthenticate(request)
+    except AuthenticationFailed:
+        return None
+    return _superuser(result[0] if result else None)
+
+
+class SamplingProfiler:
+    extension = 'folded'
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._target = threading.get_ident()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='pms-profiler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            if frame is not None:
+                self.stacks[_fold(frame)] += 1
+                self.samples += 1
+
+    def write(self, path):
+        with open(path, 'w', encoding='utf-8') as fh:
+            for stack, count in self.stacks.most_common():
+                fh.write(f"{stack} {count}\n")
+
+
+def _fold(frame):
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class DeterministicProfiler:
+    extension = 'prof'
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+        self.samples = None
+
+    def start(self):
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+
+    def write(self, path):
+        self.profile.dump_stats(path)
+
+
+def make_profiler(mode):
+    if mode == 'cprofile':
+        return DeterministicProfiler()
+    return SamplingProfiler(settings.PROFILING['INTERVAL_MS'] / 1000)
+
+
+def profile_dir():
+    return Path(settings.PROFILING['DIR'])
+
+
+def _metadata_files():
+    directory = profile_dir()
+    return sorted(directory.glob('*.json'), reverse=True) if directory.is_dir() else []
+
+
+def acquire_slot():
+    """Còn được profile trong giờ này không (MAX_PER_HOUR, tính theo file đã ghi)."""
+    cutoff = time.time() - 3600
+    recent = 0
+    for path in _metadata_files():
+        try:
+            recent += path.stat().st_mtime >= cutoff
+        except OSError:
+            continue  # vừa bị _prune của worker khác xóa
+    return recent < settings.PROFILING['MAX_PER_HOUR']
+
+
+def save_profile(profiler, mode, request, response, duration_ms, user):
+    directory = profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    profile_id = f"{timezone.now():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+    filename = f"{profile_id}.{profiler.extension}"
+    profiler.write(directory / filename)
+
+    match = request.resolver_match
+    stats = current_stats()
+    metadata = {
+        'id': profile_id,
+        'mode': mode,
+        'file': filename,
+        'created_at': timezone.now().isoformat(),
+        'method': request.method,
+        'path': request.get_full_path(),
+        'view': match.view_name if match else None,
+        'user': user.get_username(),
+        'status': response.status_code,
+        'duration_ms': round(duration_ms, 1),
+        'samples': profiler.samples,
+        'queries': stats.queries if stats else None,
+    }
+    # Ghi .json sau cùng: có metadata nghĩa là file profile đã đầy đủ
+    with open(directory / f"{profile_id}.json", 'w', encoding='utf-8') as fh:
+        json.dump(metadata, fh, ensure_ascii=False, indent=2)
+    _prune(settings.PROFILING['KEEP'])
+    return profile_id
+
+
+def _prune(keep):
+    for path in _metadata_files()[keep:]:
+        for stale in path.parent.glob(f"{path.stem}.*"):
+            stale.unlink(missing_ok=True)
+
+
+def list_profiles():
+    profiles = []
+    for path in _metadata_files():
+        try:
+            with open(path, encoding='utf-8') as fh:
+                profiles.append(json.load(fh))
+        except (OSError, ValueError):
+            continue  # worker khác đang ghi/xóa
+    return profiles
+
+
+def profile_path(profile_id):
+    """Đường dẫn file profile theo id (None nếu id sai dạng hoặc không còn)."""
+    if not PROFILE_ID_RE.match(profile_id):
+        return None
+    for path in profile_dir().glob(f"{profile_id}.*"):
+        if path.suffix != '.json':
+            return path
+    return None
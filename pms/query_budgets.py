@@ -0,0 +1,162 @@
+"""
+Ngân sách số truy vấn SQL cho mọi URL trong pms/urls.py.
+
+Mỗi dòng của BUDGETS là một request mẫu kèm số truy vấn tối đa. QueryBudgetTests
+(tests.py) chạy bảng này trên bộ dữ liệu nhỏ và lớn (seed_hotel) với cùng một
+trần, nên view nào có truy vấn theo từng phòng/booking (N+1) sẽ vượt ngân sách
+ở bộ lớn. Mọi URL phải có ít nhất một dòng.
+
+Đo ở trạng thái nguội (đã xóa cache trong tiến trình), tính cả truy vấn của
+session, xác thực và savepoint của transaction.atomic. Sửa view làm đổi số
+truy vấn thì sửa bảng trong cùng commit để người review thấy.
+
+Tham số URL và giá trị "{khóa}" trong data lấy từ các đối tượng mẫu:
+room (phòng trống), occupied (booking đang ở), occupied_room, confirmed (booking
+chờ nhận phòng), guest, request (yêu cầu khách mới), service, staff (nhân viên
+khác), catalog, side (mặt ảnh giấy tờ).
+"""
+import traceback
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from django.conf import settings
+
+
+@dataclass(frozen=True)
+class Budget:
+    name: str  # tên URL
+    queries: int
+    method: str = 'GET'
+    args: tuple = ()
+    auth: str = 'session'  # session | token | anonymous
+    data: dict = field(default_factory=dict)
+    status: int = 200
+
+
+BOOKING_FORM = {
+    'main-full_name': 'Khách Ngân Sách', 'main-id_type': 'CCCD', 'main-id_number': '088000000001', 'main-address': 'HCM',
+    'res-check_in_date': '10/01/2031 14:00', 'res-check_out_date': '12/01/2031 12:00', 'res-deposit': '0',
+    'res-status': 'Confirmed', 'others-TOTAL_FORMS': '0', 'others-INITIAL_FORMS': '0',
+}
+
+BUDGETS = [
+    # Đăng nhập / trang chính
+    Budget('login', 0, auth='anonymous'),
+    Budget('logout', 4, status=302),
+    Budget('dashboard', 4),
+    # Khách
+    Budget('manage-guests', 3),
+    Budget('edit-guest', 3, args=('guest',)),
+    Budget('guest-photo', 3, args=('guest', 'side'), status=404),  # khách seed không có ảnh
+    Budget('delete-guest', 6, 'POST', args=('guest',), status=302),
+    # Phòng
+    Budget('manage-rooms', 3),
+    Budget('room-create', 3),
+    Budget('room-edit', 3, args=('room',)),
+    Budget('delete-room', 14, 'POST', args=('room',), status=302),
+    Budget('room-qr-code', 3, args=('room',)),
+    # Nghiệp vụ lễ tân
+    Budget('create-booking', 3, args=('room',)),
+    Budget('create-booking', 14, 'POST', args=('room',), data=BOOKING_FORM, status=302),
+    Budget('perform-check-in', 8, args=('confirmed',), status=302),
+    Budget('billing-details', 7, args=('occupied',)),
+    Budget('perform-check-out', 10, 'POST', args=('occupied',), status=302),
+    Budget('cancel-booking', 9, 'POST', args=('confirmed',), status=302),
+    Budget('booking-management', 4),
+    Budget('reservation-calendar', 3),
+    Budget('manage-room-services', 7, args=('occupied',)),
+    Budget('add-service-charge', 5, 'POST', args=('occupied',),
+           data={'item_name': 'Nước suối', 'quantity': '1', 'price': '10000'}, status=302),
+    # Xuất file, yêu cầu khách
+    Budget('export-registry', 5),
+    Budget('metrics', 0, auth='anonymous', status=404),  # METRICS tắt khi test; scrape xem MetricsTests
+    Budget('guest-request-portal', 2, args=('occupied_room',), auth='anonymous'),
+    Budget('guest-request-portal', 4, 'POST', args=('occupied_room',), auth='anonymous', data={'content': 'Thêm khăn'}),
+    Budget('manage-requests', 3),
+    Budget('complete-request', 7, 'POST', args=('request',), status=302),
+    Budget('ajax-new-requests-count', 3),
+    Budget('ajax-guest-lookup', 3, data={'q': '099'}),
+    # Dịch vụ
+    Budget('service-summary', 4),
+    Budget('manage-service-inventory', 3),
+    Budget('service-item-create', 2),
+    Budget('service-item-edit', 3, args=('service',)),
+    Budget('service-item-delete', 6, 'POST', args=('service',), status=302),
+    # Quản lý
+    Budget('management-dashboard', 12),
+    Budget('add-staff-schedule', 5),
+    Budget('manage-staff', 3),
+    Budget('delete-staff', 10, args=('staff',), status=302),
+    # API (token)
+    Budget('api-root', 1, auth='token'),
+    Budget('serviceitem-list', 2, auth='token'),
+    Budget('serviceitem-detail', 2, args=('service',), auth='token'),
+    Budget('guestrequest-list', 2, auth='token'),
+    Budget('guestrequest-detail', 2, args=('request',), auth='token'),
+    Budget('guest-list', 2, auth='token'),
+    Budget('guest-lookup', 2, auth='token', data={'q': '099'}),
+    Budget('guest-detail', 2, args=('guest',), auth='token'),
+    Budget('reservation-list', 2, auth='token'),
+    Budget('reservation-list', 9, 'POST', auth='token', status=201, data={
+        'room_id': '{room}', 'guest_name': 'Khách API', 'guest_id_number': '088000000002',
+        'check_in_date': '2031-02-10T14:00:00+07:00', 'check_out_date': '2031-02-12T12:00:00+07:00',
+    }),
+    Budget('reservation-detail', 2, args=('occupied',), auth='token'),
+    Budget('api_token_auth', 4, 'POST', auth='anonymous', data={'username': 'ngansach', 'password': 'ngansach'}),
+    Budget('api-logout', 3, 'POST', auth='token'),
+    Budget('api-dashboard', 3, auth='token'),
+    Budget('api-room-detail', 3, args=('occupied_room',), auth='token'),
+    Budget('api-add-service', 4, 'POST', auth='token', status=201,
+           data={'reservation_id': '{occupied}', 'item_id': '{service}', 'quantity': 2}),
+    Budget('api-checkout', 6, args=('occupied',), auth='token'),
+    Budget('api-checkout', 5, 'POST', args=('occupied',), auth='token', data={'final_bill': 0}),
+    Budget('api-checkin', 5, 'POST', args=('confirmed',), auth='token'),
+    Budget('api-walk-in', 10, 'POST', args=('room',), auth='token',
+           data={'full_name': 'Khách Vãng Lai', 'id_number': '088000000003', 'phone': '0900000000'}),
+    Budget('api-staff-schedule', 2, auth='token'),
+    Budget('api-management-stats', 5, auth='token'),
+    Budget('api-catalog-version', 1, auth='token'),
+    Budget('api-catalog', 2, args=('catalog',), auth='token'),
+    Budget('api-bootstrap', 10, auth='token'),
+    Budget('api-live-dashboard', 3, auth='token'),
+    Budget('api-live-management-stats', 5, auth='token'),
+    Budget('api-live-availability', 2, auth='token', data={'check_in': '2031-03-01'}),
+    Budget('api-quote', 4, 'POST', auth='token', data={'lines': [
+        {'room_type': room_type, 'check_in': f'2031-03-{day:02d}', 'check_out': f'2031-03-{day + 2:02d}'}
+        for room_type in ('Đơn', 'Đôi', 'Gia đình', 'VIP') for day in range(1, 26)
+    ]}),
+    Budget('api-forecast', 5, auth='token'),
+]
+
+
+class QueryRecorder:
+    """execute_wrapper ghi lại mọi câu SQL kèm nơi gọi (dòng code dự án sâu nhất)."""
+
+    def __init__(self):
+        self.queries = []
+        self._root = Path(settings.BASE_DIR)
+        self._code_dirs = tuple(str(self._root / package) + '/' for package in ('pms', 'core'))
+        self._skip = (__file__, str(Path(__file__).with_name('tests.py')))
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append((self.call_site(), sql))
+        return execute(sql, params, many, context)
+
+    def call_site(self):
+        for frame in reversed(traceback.extract_stack()[:-2]):
+            if frame.filename.startswith(self._code_dirs) and frame.filename not in self._skip:
+                return f"{Path(frame.filename).relative_to(self._root)}:{frame.lineno} ({frame.name})"
+        return '(middleware/Django: session, transaction...)'
+
+    def report(self):
+        """Các câu SQL nhóm theo nơi gọi, nơi gọi nhiều truy vấn nhất lên trước."""
+        by_site = defaultdict(Counter)
+        for site, sql in self.queries:
+            by_site[site][sql] += 1
+        lines = []
+        for site, statements in sorted(by_site.items(), key=lambda item: -sum(item[1].values())):
+            lines.append(f"  {site}: {sum(statements.values())} truy vấn")
+            for sql, count in statements.most_common():
+                lines.append(f"    x{count}  {sql[:300]}")
+        return '\n'.join(lines)
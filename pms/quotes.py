@@ -0,0 +1,159 @@
+"""
+Báo giá hàng loạt: nhiều dòng (phòng hoặc loại phòng, nhận phòng, trả phòng) trong một lần gọi.
+
+Cả yêu cầu dùng một số truy vấn cố định bất kể số dòng: một truy vấn phòng ứng
+viên, một truy vấn booking bận trong khoảng bao mọi dòng (cùng điều kiện với
+availability.busy_reservations) và lịch giá đã tính sẵn (rates.py). Phần còn lại
+là phép toán NumPy trên mảng:
+
+- ma trận dòng x booking bận -> ma trận dòng x phòng bị chiếm;
+- xếp phòng lần lượt theo thứ tự dòng: dòng theo loại phòng nhận phòng trống đầu
+  tiên (theo số phòng) chưa bị dòng trước giữ trùng thời gian, nên báo giá đoàn
+  "5 phòng Đôi cùng ngày" ra 5 phòng khác nhau;
+- tiền phòng của mọi dòng bằng một lần RateCalendar.stay_totals.
+
+Dòng không hợp lệ chỉ báo lỗi ở dòng đó. Dòng hết phòng vẫn có giá (của phòng
+được hỏi, hoặc phòng đầu tiên của loại) để nhân viên báo cho khách.
+"""
+from dataclasses import dataclass
+from decimal import Decimal
+
+import numpy as np
+from django.db.models import Q
+from django.utils import timezone
+
+from . import rates
+from .availability import InvalidStay, ROOM_FIELDS, busy_reservations, parse_stay
+from .models import Room
+
+MAX_LINES = 200
+
+
+class InvalidQuote(ValueError):
+    pass
+
+
+@dataclass
+class QuoteLine:
+    room_id: int = None
+    room_type: str = None
+    hotel_id: int = None
+    check_in: object = None
+    check_out: object = None
+    error: str = None
+
+
+def _optional_int(value, label):
+    if value in (None, ''):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise InvalidStay(f"{label} không hợp lệ: {value!r}") from None
+
+
+def parse_lines(raw_lines):
+    """Đọc danh sách dòng từ JSON. Lỗi của từng dòng được ghi vào QuoteLine.error."""
+    if not isinstance(raw_lines, list) or not raw_lines:
+        raise InvalidQuote("Cần danh sách 'lines' không rỗng.")
+    if len(raw_lines) > MAX_LINES:
+        raise InvalidQuote(f"Tối đa {MAX_LINES} dòng mỗi lần báo giá.")
+    tz = timezone.get_current_timezone()
+    lines = []
+    for raw in raw_lines:
+        line = QuoteLine()
+        try:
+            if not isinstance(raw, dict):
+                raise InvalidStay("Mỗi dòng phải là một object.")
+            line.room_id = _optional_int(raw.get('room_id'), "Mã phòng")
+            line.hotel_id = _optional_int(raw.get('hotel_id'), "Mã khách sạn")
+            line.room_type = (raw.get('room_type') or '').strip() or None
+            if line.room_id is None and line.room_type is None:
+                raise InvalidStay("Cần room_id hoặc room_type.")
+            line.check_in, line.check_out = parse_stay(raw.get('check_in'), raw.get('check_out'), tz)
+        except InvalidStay as exc:
+            line.error = str(exc)
+        lines.append(line)
+    return lines
+
+
+def _seconds(moments):
+    return np.array([moment.timestamp() for moment in moments], dtype=np.float64)
+
+
+def quote(lines):
+    """Trả về danh sách kết quả (dict) theo thứ tự dòng."""
+    valid = [index for index, line in enumerate(lines) if line.error is None]
+    results = [{'line': index, 'error': line.error} for index, line in enumerate(lines)]
+    if not valid:
+        return results
+    todo = [lines[index] for index in valid]
+
+    room_ids = {line.room_id for line in todo if line.room_id is not None}
+    room_types = {line.room_type for line in todo if line.room_id is None}
+    rooms = list(Room.objects.filter(Q(id__in=room_ids) | Q(room_type__in=room_types)).order_by('room_number').values(*ROOM_FIELDS))
+    position = {room['id']: index for index, room in enumerate(rooms)}
+    room_type_of = np.array([room['room_type'] for room in rooms], dtype=object)
+    hotel_of = np.array([room['hotel_id'] for room in rooms], dtype=np.int64)
+
+    starts = _seconds(line.check_in for line in todo)
+    ends = _seconds(line.check_out for line in todo)
+    span_start, span_end = min(line.check_in for line in todo), max(line.check_out for line in todo)
+    busy = list(busy_reservations(span_start, span_end).filter(room_id__in=position).values_list('room_id', 'check_in_date', 'check_out_date'))
+    busy_room = np.array([position[room_id] for room_id, _, _ in busy], dtype=np.int64)
+    busy_start = _seconds(check_in for _, check_in, _ in busy)
+    busy_end = np.array([check_out.timestamp() if check_out else np.inf for _, _, check_out in busy], dtype=np.float64)
+
+    # taken[i, r]: phòng r đã có booking giao với dòng i
+    overlap = (busy_start[None, :] < ends[:, None]) & (busy_end[None, :] > starts[:, None])
+    taken = np.zeros((len(todo), len(rooms)), dtype=bool)
+    line_index, busy_index = np.nonzero(overlap)
+    taken[line_index, busy_room[busy_index]] = True
+
+    assigned = np.full(len(todo), -1, dtype=np.int64)
+    priced = np.full(len(todo), -1, dtype=np.int64)
+    for i, line in enumerate(todo):
+        if line.room_id is not None:
+            candidates = np.zeros(len(rooms), dtype=bool)
+            if line.room_id in position:
+                candidates[position[line.room_id]] = True
+        else:
+            candidates = room_type_of == line.room_type
+            if line.hotel_id is not None:
+                candidates &= hotel_of == line.hotel_id
+        if not candidates.any():
+            continue
+        priced[i] = np.argmax(candidates)
+        free = candidates & ~taken[i]
+        if free.any():
+            room = assigned[i] = priced[i] = np.argmax(free)
+            # Giữ phòng cho dòng này: các dòng sau trùng thời gian không được xếp vào
+            taken[(starts < ends[i]) & (ends > starts[i]), room] = True
+
+    # Như rates.booking_nights/first_night nhưng cho cả mảng (đổi múi giờ một lần cho mọi dòng)
+    tz = timezone.get_current_timezone()
+    first_nights = np.array([line.check_in.astimezone(tz).date() for line in todo], dtype='datetime64[D]')
+    last_days = np.array([line.check_out.astimezone(tz).date() for line in todo], dtype='datetime64[D]')
+    nights = np.maximum((last_days - first_nights).astype(np.int64), 1)
+    has_room = priced >= 0
+    totals = np.zeros(len(todo))
+    if has_room.any():
+        picked = [rooms[index] for index in priced[has_room]]
+        totals[has_room] = rates.get_calendar().stay_totals(
+            [room['room_type'] for room in picked],
+            [room['price_per_night'] for room in picked],
+            first_nights[has_room],
+            nights[has_room],
+        )
+
+    for i, line in enumerate(todo):
+        result = results[valid[i]]
+        result.update(check_in=line.check_in, check_out=line.check_out, nights=int(nights[i]), available=bool(assigned[i] >= 0))
+        if priced[i] < 0:
+            result.update(error="Không tìm thấy phòng phù hợp.", room_type=line.room_type, room_id=line.room_id)
+            continue
+        room = rooms[priced[i]]
+        total = Decimal(int(totals[i]))
+        result.update(room_id=room['id'], room_number=room['room_number'], room_type=room['room_type'],
+                      hotel_id=room['hotel_id'], total=total, average_rate=(total / int(nights[i])).quantize(Decimal('1')))
+    return results
@@ -0,0 +1,180 @@
+"""
+Lịch giá phòng theo ngày.
+
+RateRule (models.py) đặt giá cho một loại phòng trong một khoảng ngày, có thể
+chỉ cho vài thứ trong tuần: giá cố định (VND/đêm) hoặc phần trăm của giá gốc
+của phòng (Room.price_per_night). Quy tắc ưu tiên cao hơn đè lên quy tắc thấp
+hơn, ngày không có quy tắc tính theo giá gốc. Ví dụ: "Mùa hè" 110% cả tháng 6-8,
+"Cuối tuần" 120% cho thứ 6, 7 (weekdays "45"), "Tết" 1.500.000 VND ưu tiên cao nhất.
+
+Mỗi loại phòng được "vẽ" một lần thành mảng NumPy theo ngày trên cửa sổ
+RATES['DAYS_BEFORE'] .. RATES['DAYS_AFTER'] quanh hôm nay và lưu dạng tổng tích lũy:
+
+    fixed_cum[i]  = tổng giá cố định của các ngày trước ngày i
+    factor_cum[i] = tổng hệ số (phần trăm / 100) của các ngày trước ngày i không có giá cố định
+
+nên tiền phòng của các đêm [a, b) là
+    (fixed_cum[b] - fixed_cum[a]) + giá gốc * (factor_cum[b] - factor_cum[a])
+— hai phép trừ, không phụ thuộc số đêm, và tính được cho cả mảng kỳ ở cùng lúc
+(stay_totals). Đêm nằm ngoài cửa sổ tính theo giá gốc.
+
+Giống catalog.py, lịch được giữ trong bộ nhớ của worker kèm số phiên bản trong
+cache dùng chung giữa các worker (local_cache.version_cache); phiên bản đổi khi
+RateRule thay đổi (signals.py) nên mọi worker tính giá mới ngay từ request kế
+tiếp. Lịch cũng được vẽ lại khi sang ngày mới để cửa sổ trượt theo hôm nay.
+"""
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+from .local_cache import CacheStats, version_cache
+from .models import RateRule
+
+VERSION_KEY = 'pms:rates-version'
+
+_local = {}
+_lock = threading.Lock()
+_stats = CacheStats('rates')
+
+
+def _weekdays(origin, days):
+    """Thứ (0 = Thứ 2) của từng ngày trong cửa sổ. 01/01/1970 là Thứ 5."""
+    epoch_days = np.datetime64(origin, 'D').astype(np.int64) + np.arange(days)
+    return (epoch_days + 3) % 7
+
+
+class RateCalendar:
+    def __init__(self, version, origin, days, tables):
+        self.version = version
+        self.origin = origin
+        self.days = days
+        self._tables = tables  # loại phòng -> (fixed_cum, factor_cum)
+        # Loại phòng không có quy tắc: mọi ngày hệ số 1
+        self._default = (np.zeros(days + 1), np.arange(days + 1, dtype=np.float64))
+
+    def table(self, room_type):
+        return self._tables.get(room_type, self._default)
+
+    def _bounds(self, first_night, nights):
+        start = (first_night - self.origin).days
+        return start, start + nights
+
+    def stay_total(self, room_type, base_price, first_night, nights):
+        """Tiền phòng (Decimal, làm tròn đồng) cho `nights` đêm bắt đầu từ ngày first_night."""
+        fixed_cum, factor_cum = self.table(room_type)
+        start, end = self._bounds(first_night, nights)
+        a, b = min(max(start, 0), self.days), min(max(end, 0), self.days)
+        outside = nights - (b - a)
+        total = (fixed_cum[b] - fixed_cum[a]) + float(base_price) * (factor_cum[b] - factor_cum[a] + outside)
+        return Decimal(round(total))
+
+    def stay_totals(self, room_types, base_prices, first_nights, nights):
+        """stay_total cho nhiều kỳ ở cùng lúc. first_nights: mảng datetime64[D]; trả về mảng float."""
+        base_prices = np.asarray(base_prices, dtype=np.float64)
+        nights = np.asarray(nights, dtype=np.int64)
+        start = (np.asarray(first_nights, dtype='datetime64[D]') - np.datetime64(self.origin, 'D')).astype(np.int64)
+        a = np.clip(start, 0, self.days)
+        b = np.clip(start + nights, 0, self.days)
+        outside = nights - (b - a)
+        totals = np.empty(len(nights))
+        room_types = np.asarray(room_types, dtype=object)
+        for room_type in set(room_types.tolist()):
+            fixed_cum, factor_cum = self.table(room_type)
+            rows = room_types == room_type
+            ra, rb = a[rows], b[rows]
+            totals[rows] = (fixed_cum[rb] - fixed_cum[ra]) + base_prices[rows] * (factor_cum[rb] - factor_cum[ra] + outside[rows])
+        return np.round(totals)
+
+    def nightly_rates(self, room_type, base_price, first_night, nights):
+        """Giá từng đêm (Decimal) — cho hóa đơn chi tiết."""
+        fixed_cum, factor_cum = self.table(room_type)
+        start, _ = self._bounds(first_night, nights)
+        index = np.arange(start, start + nights)
+        inside = (index >= 0) & (index < self.days)
+        clipped = np.clip(index, 0, self.days - 1)
+        rates = np.diff(fixed_cum)[clipped] + float(base_price) * np.diff(factor_cum)[clipped]
+        rates = np.where(inside, rates, float(base_price))
+        return [Decimal(round(rate)) for rate in rates]
+
+
+def build_calendar(version, today):
+    config = settings.RATES
+    origin = today - timedelta(days=config['DAYS_BEFORE'])
+    days = config['DAYS_BEFORE'] + config['DAYS_AFTER']
+    weekdays = _weekdays(origin, days)
+    last_day = origin + timedelta(days=days - 1)
+
+    rules = {}
+    for rule in RateRule.objects.filter(date_to__gte=origin, date_from__lte=last_day).order_by('priority', 'id'):
+        rules.setdefault(rule.room_type, []).append(rule)
+
+    tables = {}
+    for room_type, room_rules in rules.items():
+        fixed = np.full(days, np.nan)
+        factor = np.ones(days)
+        for rule in room_rules:
+            mask = np.zeros(days, dtype=bool)
+            mask[max((rule.date_from - origin).days, 0):(rule.date_to - origin).days + 1] = True
+            if rule.weekdays:
+                mask &= np.isin(weekdays, [int(digit) for digit in rule.weekdays])
+            if rule.kind == 'fixed':
+                fixed[mask] = float(rule.value)
+            else:
+                fixed[mask] = np.nan
+                factor[mask] = float(rule.value) / 100
+        has_fixed = ~np.isnan(fixed)
+        tables[room_type] = (
+            np.concatenate(([0.0], np.cumsum(np.where(has_fixed, fixed, 0.0)))),
+            np.concatenate(([0.0], np.cumsum(np.where(has_fixed, 0.0, factor)))),
+        )
+    return RateCalendar(version, origin, days, tables)
+
+
+def get_version():
+    version = version_cache.get(VERSION_KEY)
+    if version is None:
+        version = f"rates-{time.time_ns()}"
+        if not version_cache.add(VERSION_KEY, version, timeout=None):
+            version = version_cache.get(VERSION_KEY, version)
+    return version
+
+
+def invalidate():
+    version_cache.set(VERSION_KEY, f"rates-{time.time_ns()}", timeout=None)
+    with _lock:
+        _local.clear()
+
+
+def get_calendar():
+    version = get_version()
+    today = timezone.localdate()
+    calendar = _local.get('calendar')
+    if calendar is not None and calendar.version == version and calendar.origin == today - timedelta(days=settings.RATES['DAYS_BEFORE']):
+        _stats.hits += 1
+        return calendar
+    _stats.misses += 1
+    calendar = build_calendar(version, today)
+    with _lock:
+        _local['calendar'] = calendar
+    return calendar
+
+
+def first_night(check_in):
+    """Đêm đầu tiên của kỳ ở là ngày (giờ địa phương) nhận phòng."""
+    return timezone.localtime(check_in).date()
+
+
+def booking_nights(check_in, check_out):
+    """Số đêm của một booking theo ngày nhận/trả phòng (tối thiểu 1)."""
+    return max((timezone.localtime(check_out).date() - timezone.localtime(check_in).date()).days, 1)
+
+
+def quote_room(room, check_in, nights):
+    """(tổng tiền phòng, giá trung bình/đêm) cho `nights` đêm từ lần nhận phòng check_in."""
+    total = get_calendar().stay_total(room.room_type, room.price_per_night, first_night(check_in), nights)
+    return total, (total / nights).quantize(Decimal('1'))
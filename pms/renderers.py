@@ -0,0 +1,68 @@
+"""
+Renderer gọn và nhanh cho App Android.
+
+- FastJSONRenderer: cùng định dạng với JSONRenderer của DRF nhưng dùng orjson
+  (nếu đã cài) để mã hóa nhanh hơn nhiều; không có orjson thì quay về DRF.
+- ColumnarJSONRenderer: chọn bằng ?format=columnar hoặc
+  Accept: application/vnd.pms.columnar+json. Danh sách dạng
+  [{"a": 1, "b": 2}, ...] được gửi thành {"columns": ["a", "b"], "rows": [[1, 2], ...]}
+  nên tên khóa (status_display, guest_name, ...) chỉ xuất hiện một lần.
+"""
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # orjson là tùy chọn
+    orjson = None
+
+
+_drf_encoder = JSONEncoder()
+LINE_SEPARATOR = '\u2028'.encode()
+PARAGRAPH_SEPARATOR = '\u2029'.encode()
+
+
+def _default(obj):
+    return _drf_encoder.default(obj)
+
+
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if orjson is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        # Để DRF tự định dạng datetime/Decimal như JSONRenderer gốc ("...Z", float)
+        ret = orjson.dumps(
+            data,
+            default=_default,
+            option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+        )
+        # Như DRF: thoát U+2028/U+2029 (hợp lệ trong JSON nhưng ngắt dòng trong JavaScript)
+        return ret.replace(LINE_SEPARATOR, b'\\u2028').replace(PARAGRAPH_SEPARATOR, b'\\u2029')
+
+
+def to_columnar(data):
+    """Chuyển list[dict] (hoặc trang {'results': [...]}) sang dạng cột."""
+    if isinstance(data, dict) and isinstance(data.get('results'), list):
+        compact = {key: value for key, value in data.items() if key != 'results'}
+        compact.update(to_columnar(data['results']))
+        return compact
+    if isinstance(data, list) and data and all(isinstance(row, dict) for row in data):
+        columns = list(data[0].keys())
+        for row in data[1:]:
+            for key in row:
+                if key not in columns:
+                    columns.append(key)
+        return {'columns': columns, 'rows': [[row.get(key) for key in columns] for row in data]}
+    if isinstance(data, list) and not data:
+        return {'columns': [], 'rows': []}
+    return data
+
+
+class ColumnarJSONRenderer(FastJSONRenderer):
+    media_type = 'application/vnd.pms.columnar+json'
+    format = 'columnar'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return super().render(to_columnar(data), accepted_media_type, renderer_context)
@@ -0,0 +1,224 @@
+"""
+Sinh dữ liệu giả lập cho một chuỗi khách sạn (dùng cho benchmark/thử tải).
+
+Mỗi phòng được "chạy" theo dòng thời gian: khoảng trống ngẫu nhiên rồi một lượt
+ở 1-14 đêm (đa số 1-3), từ `years` năm trước đến `future_days` ngày tới. Lượt ở đã qua là
+Completed (một ít Cancelled), lượt đang diễn ra là Occupied, lượt tương lai là
+Confirmed. Mọi bản ghi được ghi bằng bulk_create theo lô nên vài trăm nghìn
+booking chỉ mất vài chục giây trên SQLite.
+
+Dữ liệu sinh ra được đánh dấu bằng mã khách sạn SEED_CODE_PREFIX và số giấy
+tờ SEED_ID_PREFIX để có thể xóa lại bằng clear_seed_data().
+"""
+import random
+from dataclasses import dataclass, field
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Length
+from django.utils import timezone
+
+from . import fragments
+from .models import Guest, GuestRequest, Hotel, Reservation, Room, ServiceCharge, ServiceItem, StaffSchedule
+
+SEED_CODE_PREFIX = 'SEED'
+SEED_ID_PREFIX = '099'  # CCCD giả: 099 + 9 chữ số
+
+SURNAMES = ['Nguyễn', 'Trần', 'Lê', 'Phạm', 'Hoàng', 'Huỳnh', 'Phan', 'Vũ', 'Võ', 'Đặng', 'Bùi', 'Đỗ', 'Hồ', 'Ngô', 'Dương']
+MIDDLE_NAMES = ['Văn', 'Thị', 'Hữu', 'Minh', 'Ngọc', 'Thanh', 'Quốc', 'Gia', 'Đức', 'Thu']
+GIVEN_NAMES = ['An', 'Bình', 'Châu', 'Dũng', 'Giang', 'Hà', 'Hải', 'Hạnh', 'Hùng', 'Khoa', 'Lan', 'Linh', 'Long',
+               'Mai', 'Nam', 'Nga', 'Phong', 'Phúc', 'Quân', 'Sơn', 'Tâm', 'Thảo', 'Trang', 'Tuấn', 'Vy', 'Yến']
+PROVINCES = ['TP. Hồ Chí Minh', 'Hà Nội', 'Đà Nẵng', 'Cần Thơ', 'Hải Phòng', 'Bình Dương', 'Đồng Nai', 'Khánh Hòa', 'Lâm Đồng']
+ROOM_TYPES = [('Đơn', Decimal(400000)), ('Đôi', Decimal(550000)), ('Gia đình', Decimal(800000)), ('VIP', Decimal(1200000))]
+DEFAULT_SERVICES = [('Nước suối', 10000), ('Bia', 25000), ('Nước ngọt', 15000), ('Giặt ủi', 50000), ('Ăn sáng', 60000)]
+REQUEST_TEXTS = ['Thêm khăn tắm', 'Dọn phòng', 'Mang thêm nước suối', 'Sửa điều hòa', 'Thêm gối', 'Gọi taxi']
+SHIFTS = [code for code, _ in StaffSchedule.SHIFT_CHOICES]
+STAFF_NAMES = ['Lan', 'Hùng', 'Mai', 'Tuấn', 'Vy', 'Sơn', 'Thảo', 'Long']
+
+
+@dataclass
+class SeedOptions:
+    hotels: int = 3
+    rooms_per_hotel: int = 50
+    years: float = 2
+    future_days: int = 60
+    occupancy: float = 0.7
+    repeat_guest_rate: float = 0.3
+    batch_size: int = 2000
+    seed: int = 42
+
+
+@dataclass
+class SeedResult:
+    counts: dict = field(default_factory=dict)
+
+    def add(self, name, count):
+        self.counts[name] = self.counts.get(name, 0) + count
+
+
+def clear_seed_data():
+    """Xóa dữ liệu do seed_hotel sinh ra (khách sạn SEED*, khách có CCCD 099*)."""
+    with transaction.atomic():
+        Hotel.objects.filter(code__startswith=SEED_CODE_PREFIX).delete()
+        Guest.objects.filter(id_number__startswith=SEED_ID_PREFIX).delete()
+        StaffSchedule.objects.filter(note='seed').delete()
+
+
+def _fake_guest(rng, number):
+    return Guest(
+        full_name=f"{rng.choice(SURNAMES)} {rng.choice(MIDDLE_NAMES)} {rng.choice(GIVEN_NAMES)}",
+        dob=datetime(1960, 1, 1).date() + timedelta(days=rng.randrange(365 * 45)),
+        id_type='CCCD',
+        id_number=f"{SEED_ID_PREFIX}{number:09d}",
+        phone=f"09{rng.randrange(10 ** 8):08d}",
+        address=rng.choice(PROVINCES),
+        license_plate=f"{rng.randrange(11, 99)}A-{rng.randrange(10000, 99999)}" if rng.random() < 0.3 else '',
+    )
+
+
+def _last_seed_number(queryset, field_name, prefix):
+    """Số lớn nhất đã dùng sau tiền tố (0 nếu chưa có). Không dùng count(): sau khi xóa/gộp
+    bản ghi, count() + 1 có thể trùng một mã còn tồn tại. Số dài hơn thì lớn hơn, cùng độ
+    dài thì so chuỗi."""
+    last = (queryset.filter(**{f'{field_name}__regex': rf'^{prefix}[0-9]+$'})
+            .annotate(seed_length=Length(field_name))
+            .order_by('-seed_length', f'-{field_name}')
+            .values_list(field_name, flat=True).first())
+    return int(last[len(prefix):]) if last else 0
+
+
+def _at(day, hour):
+    return timezone.make_aware(datetime.combine(day, time(hour)))
+
+
+def _stays_for_room(rng, options, first_day, last_day, today):
+    """Sinh (check_in_day, nights, status) cho một phòng theo dòng thời gian."""
+    mean_nights = 2.5
+    mean_gap = mean_nights * (1 - options.occupancy) / max(options.occupancy, 0.01)
+    day = first_day + timedelta(days=rng.randrange(3))
+    while day < last_day:
+        nights = min(1 + int(rng.expovariate(1 / (mean_nights - 1))), 14)
+        check_out_day = day + timedelta(days=nights)
+        if check_out_day <= today:
+            status = 'Cancelled' if rng.random() < 0.05 else 'Completed'
+        elif day < today or (day == today and rng.random() < 0.5):
+            status = 'Occupied'
+        else:
+            status = 'Cancelled' if rng.random() < 0.05 else 'Confirmed'
+        yield day, nights, status
+        day = check_out_day + timedelta(days=int(rng.expovariate(1 / mean_gap)) if mean_gap > 0 else 0)
+
+
+def seed_hotel(options=None, log=None):
+    """Sinh một chuỗi khách sạn; trả về SeedResult với số bản ghi đã tạo."""
+    options = options or SeedOptions()
+    log = log or (lambda message: None)
+    rng = random.Random(options.seed)
+    result = SeedResult()
+    today = timezone.localdate()
+    first_day = today - timedelta(days=int(365 * options.years))
+    last_day = today + timedelta(days=options.future_days)
+    batch = options.batch_size
+
+    services = list(ServiceItem.objects.values_list('item_name', 'price'))
+    if not services:
+        ServiceItem.objects.bulk_create([ServiceItem(item_name=name, price=price) for name, price in DEFAULT_SERVICES])
+        services = [(name, Decimal(price)) for name, price in DEFAULT_SERVICES]
+
+    existing_hotels = _last_seed_number(Hotel.objects, 'code', SEED_CODE_PREFIX)
+    next_guest_number = _last_seed_number(Guest.objects, 'id_number', SEED_ID_PREFIX) + 1
+    known_guests = []
+
+    for h in range(existing_hotels + 1, existing_hotels + options.hotels + 1):
+        with transaction.atomic():
+            hotel = Hotel.objects.create(name=f"Khách sạn Giả lập {h}", code=f"{SEED_CODE_PREFIX}{h:03d}")
+            rooms = []
+            for n in range(options.rooms_per_hotel):
+                room_type, price = ROOM_TYPES[n % len(ROOM_TYPES)]
+                rooms.append(Room(
+                    hotel=hotel, room_number=f"S{h}-{n // 20 + 1}{n % 20 + 1:02d}",
+                    room_type=room_type, price_per_night=price, status='Vacant',
+                ))
+            rooms = Room.objects.bulk_create(rooms, batch_size=batch)
+            result.add('rooms', len(rooms))
+
+            # Lượt ở: chọn khách mới hoặc khách quay lại
+            reservations, companions, new_guests = [], [], []
+            for room in rooms:
+                for day, nights, status in _stays_for_room(rng, options, first_day, last_day, today):
+                    if known_guests and rng.random() < options.repeat_guest_rate:
+                        guest = rng.choice(known_guests)
+                    else:
+                        guest = _fake_guest(rng, next_guest_number)
+                        next_guest_number += 1
+                        new_guests.append(guest)
+                        known_guests.append(guest)
+                    companion = None
+                    if rng.random() < 0.35:
+                        companion = _fake_guest(rng, next_guest_number)
+                        next_guest_number += 1
+                        new_guests.append(companion)
+                    reservations.append(Reservation(
+                        room=room, guest=guest, status=status,
+                        check_in_date=_at(day, 14), check_out_date=_at(day + timedelta(days=nights), 12),
+                        deposit=Decimal(rng.choice([0, 0, 100000, 200000])),
+                    ))
+                    companions.append(companion)
+                    if status == 'Occupied':
+                        room.status = 'Occupied'
+                    elif status == 'Confirmed' and day == today and room.status == 'Vacant':
+                        room.status = 'Booked'
+                if room.status == 'Vacant' and rng.random() < 0.1:
+                    room.status = 'Dirty'
+
+            # bulk_create điền khóa chính vào các đối tượng nên booking tham chiếu được ngay
+            Guest.objects.bulk_create(new_guests, batch_size=batch)
+            result.add('guests', len(new_guests))
+            Reservation.objects.bulk_create(reservations, batch_size=batch)
+            result.add('reservations', len(reservations))
+            Room.objects.bulk_update(rooms, ['status'], batch_size=batch)
+
+            Occupant = Reservation.occupants.through
+            occupants = []
+            for reservation, companion in zip(reservations, companions):
+                occupants.append(Occupant(reservation_id=reservation.pk, guest_id=reservation.guest_id))
+                if companion is not None:
+                    occupants.append(Occupant(reservation_id=reservation.pk, guest_id=companion.pk))
+            Occupant.objects.bulk_create(occupants, batch_size=batch, ignore_conflicts=True)
+            result.add('occupants', len(occupants))
+
+            charges, requests = [], []
+            for reservation in reservations:
+                if reservation.status not in ('Completed', 'Occupied'):
+                    continue
+                for _ in range(rng.choice([0, 0, 1, 1, 2, 3])):
+                    name, price = rng.choice(services)
+                    charges.append(ServiceCharge(reservation=reservation, item_name=name, quantity=rng.randint(1, 3), price=price))
+                if rng.random() < 0.3:
+                    requests.append(GuestRequest(
+                        room=reservation.room, reservation=reservation, content=rng.choice(REQUEST_TEXTS),
+                        status='Completed' if reservation.status == 'Completed' else rng.choice(['New', 'Processing', 'Completed']),
+                    ))
+            ServiceCharge.objects.bulk_create(charges, batch_size=batch)
+            GuestRequest.objects.bulk_create(requests, batch_size=batch)
+            result.add('service_charges', len(charges))
+            result.add('guest_requests', len(requests))
+
+            # created_at (auto_now_add) của booking: vài ngày trước ngày nhận phòng
+            Reservation.objects.filter(room__hotel=hotel).update(created_at=F('check_in_date') - timedelta(days=3))
+        log(f"  {hotel.code}: {len(rooms)} phòng, {len(reservations)} booking, {len(new_guests)} khách mới")
+
+    schedules = []
+    day = first_day
+    while day <= last_day:
+        for shift in SHIFTS:
+            for name in rng.sample(STAFF_NAMES, 2):
+                schedules.append(StaffSchedule(staff_name=name, role='Reception', date=day, shift=shift, note='seed'))
+        day += timedelta(days=1)
+    StaffSchedule.objects.bulk_create(schedules, batch_size=batch)
+    result.add('staff_schedules', len(schedules))
+    # bulk_create không phát signal: bỏ các fragment template đã cache
+    fragments.invalidate_all()
+    return result
@@ -1,6 +1,25 @@
 from rest_framework import serializers
+from django.contrib.auth.models import User
 from .models import Hotel, Room, Guest, Reservation, ServiceItem, ServiceCharge, GuestRequest, StaffSchedule
 
+class DynamicFieldsMixin:
+    """Cho phép App chỉ lấy một phần trường khi đọc danh sách: ?fields=id,full_name"""
+    fields_query_param = 'fields'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or request.method != 'GET':
+            return
+        requested = request.query_params.get(self.fields_query_param)
+        if not requested:
+            return
+        allowed = {name.strip() for name in requested.split(',') if name.strip()}
+        if not allowed & set(self.fields):
+            return
+        for name in set(self.fields) - allowed:
+            self.fields.pop(name)
+
 class HotelSerializer(serializers.ModelSerializer):
     class Meta:
         model = Hotel
@@ -14,12 +33,18 @@ class RoomSerializer(serializers.ModelSerializer):
         model = Room
         fields = ['id', 'room_number', 'room_type', 'price_per_night', 'status', 'status_display', 'hotel']
 
-class GuestSerializer(serializers.ModelSerializer):
+class RoomCatalogSerializer(serializers.ModelSerializer):
+    """Cấu hình phòng (không gồm trạng thái) cho danh mục được cache"""
+    class Meta:
+        model = Room
+        fields = ['id', 'room_number', 'room_type', 'price_per_night', 'hotel']
+
+class GuestSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Guest
         fields = '__all__'
 
-class ReservationSerializer(serializers.ModelSerializer):
+class ReservationSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     guest_name = serializers.CharField(source='guest.full_name', read_only=True)
     room_number = serializers.CharField(source='room.room_number', read_only=True)
     
@@ -32,7 +57,7 @@ class ServiceItemSerializer(serializers.ModelSerializer):
         model = ServiceItem
         fields = '__all__'
 
-class GuestRequestSerializer(serializers.ModelSerializer):
+class GuestRequestSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     room_number = serializers.CharField(source='room.room_number', read_only=True)
     
     class Meta:
@@ -50,6 +75,11 @@ class StaffScheduleSerializer(serializers.ModelSerializer):
         model = StaffSchedule
         fields = '__all__'
 
+class StaffSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = User
+        fields = ['id', 'username', 'first_name', 'last_name', 'is_superuser', 'date_joined']
+
 class CreateReservationSerializer(serializers.Serializer):
     """Serializer dùng để validate dữ liệu khi tạo đặt phòng trước"""
     room_id = serializers.IntegerField()
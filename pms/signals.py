@@ -0,0 +1,123 @@
+"""
+Các receiver làm mới cache trong tiến trình khi dữ liệu gốc thay đổi.
+Được đăng ký trong PmsConfig.ready().
+"""
+from django.contrib.auth.models import User
+from django.contrib.auth.signals import user_logged_out
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from rest_framework.authtoken.models import Token
+
+from . import catalog, fragments, metrics, rates
+from .authentication import invalidate_auth_cache
+from .lookup import lookup_cache
+from .portal import invalidate_portal_cache
+from .models import Guest, GuestRequest, Hotel, RateRule, Reservation, Room, ServiceItem
+
+
+@receiver([post_save, post_delete], sender=Guest)
+@receiver([post_save, post_delete], sender=Reservation)
+@receiver(m2m_changed, sender=Reservation.occupants.through)
+def invalidate_guest_lookup(sender, **kwargs):
+    lookup_cache.clear()
+
+
+def _only_fields(update_fields, fields):
+    return update_fields is not None and set(update_fields) <= fields
+
+
+# Làm mới danh mục sau khi transaction commit để worker khác không nạp lại dữ liệu cũ
+@receiver([post_save, post_delete], sender=ServiceItem)
+def invalidate_service_catalog(sender, **kwargs):
+    transaction.on_commit(lambda: catalog.invalidate('services'))
+
+
+@receiver([post_save, post_delete], sender=RateRule)
+def invalidate_rate_calendar(sender, **kwargs):
+    transaction.on_commit(rates.invalidate)
+
+
+@receiver([post_save, post_delete], sender=Room)
+def invalidate_room_catalog(sender, update_fields=None, **kwargs):
+    if _only_fields(update_fields, catalog.ROOM_LIVE_FIELDS):
+        return
+    transaction.on_commit(lambda: catalog.invalidate('rooms'))
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_staff_catalog(sender, update_fields=None, **kwargs):
+    if _only_fields(update_fields, {'last_login'}):
+        return
+    transaction.on_commit(lambda: catalog.invalidate('staff'))
+
+
+# Cache xác thực: đăng xuất, đổi/xóa token, đổi mật khẩu/quyền, xóa nhân viên
+@receiver([post_save, post_delete], sender=Token)
+def invalidate_token_cache(sender, **kwargs):
+    transaction.on_commit(invalidate_auth_cache)
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_user_auth_cache(sender, update_fields=None, **kwargs):
+    if _only_fields(update_fields, {'last_login'}):
+        return
+    transaction.on_commit(invalidate_auth_cache)
+
+
+@receiver(user_logged_out)
+def invalidate_auth_cache_on_logout(sender, **kwargs):
+    transaction.on_commit(invalidate_auth_cache)
+
+
+@receiver([post_save, post_delete], sender=Room)
+@receiver([post_save, post_delete], sender=Reservation)
+def invalidate_portal_cache_on_change(sender, **kwargs):
+    transaction.on_commit(invalidate_portal_cache)
+
+
+# Fragment template (thẻ phòng, hàng lịch): đổi phiên bản của phòng bị ảnh hưởng sau commit
+@receiver([post_save, post_delete], sender=Room)
+def invalidate_room_fragments(sender, instance, **kwargs):
+    room_id = instance.pk
+    transaction.on_commit(lambda: fragments.invalidate_rooms([room_id]))
+
+
+@receiver([post_save, post_delete], sender=Reservation)
+def invalidate_reservation_fragments(sender, instance, **kwargs):
+    room_id = instance.room_id
+    transaction.on_commit(lambda: fragments.invalidate_rooms([room_id]))
+
+
+@receiver(post_save, sender=Guest)
+def invalidate_guest_fragments(sender, instance, created, **kwargs):
+    # Khách mới chưa có booking; xóa khách thì booking bị xóa theo và tự phát signal
+    if created:
+        return
+    guest_id = instance.pk
+    transaction.on_commit(lambda: fragments.invalidate_rooms(
+        Reservation.objects.filter(guest_id=guest_id, status__in=['Confirmed', 'Occupied']).values_list('room_id', flat=True)
+    ))
+
+
+# Gauge nghiệp vụ của /metrics: tính lại cho đúng khách sạn bị ảnh hưởng sau commit
+@receiver([post_save, post_delete], sender=Room)
+def refresh_room_gauges(sender, instance, **kwargs):
+    if metrics.enabled():
+        transaction.on_commit(lambda: metrics.refresh_hotel_gauges(instance.hotel_id))
+
+
+@receiver([post_save, post_delete], sender=GuestRequest)
+def refresh_request_gauges(sender, instance, **kwargs):
+    if metrics.enabled():
+        room_id = instance.room_id
+        transaction.on_commit(lambda: metrics.refresh_hotel_gauges(
+            Room.objects.filter(pk=room_id).values_list('hotel_id', flat=True).first()
+        ))
+
+
+@receiver(post_delete, sender=Hotel)
+def forget_hotel_gauges(sender, instance, **kwargs):
+    if metrics.enabled():
+        transaction.on_commit(lambda: metrics.forget_hotel(instance.code))
@@ -1,3 +1,1176 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import json
+import tempfile
+from datetime import date, timedelta
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.http import HttpResponse
+from django.test import LiveServerTestCase, RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import URLResolver, get_resolver, reverse
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from .models import ArchivedReservation, Hotel, RateRule, Room, Guest, Reservation, GuestRequest, ServiceCharge, ServiceItem
+from . import archive
+from .archive import archive_reservations
+from .photo_retention import open_photo, retain_photos
+from . import forecast, fragments, rates
+from .views import calculate_bill_details
+from . import catalog
+from .lookup import lookup_cache, lookup_guests
+from .dedup import find_duplicates, merge_guests
+from .renderers import FastJSONRenderer
+from .kpi import compute_kpis, get_kpis, kpi_cache
+from .authentication import GENERATION_KEY, auth_cache
+from .portal import client_ip, client_limiter, portal_cache, room_limiter
+from .pagination import keyset_page
+from . import db_router
+from .db_router import ReplicaRouter, reporting_reads
+from .seeding import SeedOptions, clear_seed_data, seed_hotel
+from .loadtest import run_load
+from .profiling import list_profiles
+from . import metrics
+from .middleware import RequestTimingMiddleware
+from .query_budgets import BUDGETS, QueryRecorder
+from .checks import check_cached_template_loader, check_shared_version_cache
+from .local_cache import version_cache
+
+
+class PmsTestCase(TestCase):
+    """Xóa các cache trong tiến trình giữa các test (DB được rollback, cache thì không)."""
+
+    def setUp(self):
+        cache.clear()
+        version_cache.clear()
+        auth_cache.clear()
+        lookup_cache.clear()
+        kpi_cache.clear()
+        portal_cache.clear()
+
+
+def make_guests(count, created_at=None):
+    guests = Guest.objects.bulk_create([
+        Guest(full_name=f"Khách {i}", id_number=f"0790{i:08d}", address="HCM", phone=f"09{i:08d}")
+        for i in range(count)
+    ])
+    if created_at is not None:
+        # Ép trùng created_at để kiểm tra con trỏ vẫn ổn định theo id
+        Guest.objects.update(created_at=created_at)
+    return guests
+
+
+class KeysetPaginationTests(PmsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('letan', password='x')
+        self.api = APIClient()
+        self.api.credentials(HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=self.user).key}")
+
+    def test_pages_cover_all_rows_once_with_tied_timestamps(self):
+        make_guests(7, created_at=timezone.now())
+        seen, cursor = [], None
+        while True:
+            rows, cursor, _ = keyset_page(Guest.objects.all(), cursor, 3)
+            seen += [g.id for g in rows]
+            if cursor is None:
+                break
+        self.assertEqual(seen, sorted(Guest.objects.values_list('id', flat=True), reverse=True))
+
+    def test_previous_cursor_returns_same_page(self):
+        make_guests(7)
+        first, next_cursor, _ = keyset_page(Guest.objects.all(), None, 3)
+        second, _, prev_cursor = keyset_page(Guest.objects.all(), next_cursor, 3)
+        back, _, _ = keyset_page(Guest.objects.all(), prev_cursor, 3)
+        self.assertEqual(back, first)
+        self.assertNotEqual(second, first)
+
+    def test_api_list_is_paginated_without_count(self):
+        make_guests(5)
+        with self.assertNumQueries(2):  # token + 1 truy vấn trang
+            response = self.api.get('/api/guests/', {'page_size': 2, 'fields': 'id,full_name'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertEqual(set(response.data['results'][0]), {'id', 'full_name'})
+        self.assertIsNotNone(response.data['next'])
+        self.assertIsNone(response.data['previous'])
+
+    def test_invalid_cursor_is_404(self):
+        response = self.api.get('/api/bookings/', {'cursor': 'rac'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_manage_guests_web_pagination(self):
+        make_guests(60)
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('manage-guests'))
+        self.assertEqual(len(response.context['guests']), 50)
+        self.assertIsNotNone(response.context['next_cursor'])
+        response = self.client.get(reverse('manage-guests'), {'cursor': response.context['next_cursor']})
+        self.assertEqual(len(response.context['guests']), 10)
+        self.assertIsNone(response.context['next_cursor'])
+
+
+class GuestLookupTests(PmsTestCase):
+    def setUp(self):
+        super().setUp()
+        hotel = Hotel.objects.create(name="KS", code="KS1")
+        self.room = Room.objects.create(hotel=hotel, room_number="101", room_type="Đơn")
+        self.guest = Guest.objects.create(full_name="Nguyễn Văn A", id_number="079123456789", address="HCM", phone="0901234567")
+        Guest.objects.create(full_name="Trần B", id_number="080999888777", address="HN", phone="0912000111")
+        Reservation.objects.create(room=self.room, guest=self.guest, check_in_date=timezone.now(), status='Completed')
+        self.user = User.objects.create_user('letan', password='x')
+        self.client.force_login(self.user)
+
+    def test_matches_id_number_and_phone_prefix_with_last_stay(self):
+        by_id = lookup_guests('0791')
+        by_phone = lookup_guests('+84 901')
+        self.assertEqual([g['id'] for g in by_id], [self.guest.id])
+        self.assertEqual([g['id'] for g in by_phone], [self.guest.id])
+        self.assertEqual(by_id[0]['last_room'], "101")
+        self.assertEqual(lookup_guests('07'), [])
+
+    def test_cached_until_guest_changes(self):
+        lookup_guests('0791')
+        with self.assertNumQueries(0):
+            lookup_guests('0791')
+        Guest.objects.create(full_name="Lê C", id_number="079100000000", address="HCM")
+        self.assertEqual(len(lookup_guests('0791')), 2)
+
+    def test_ajax_endpoint(self):
+        response = self.client.get(reverse('ajax-guest-lookup'), {'q': '080'})
+        self.assertEqual(response.json()['results'][0]['full_name'], "Trần B")
+
+
+class GuestDedupTests(PmsTestCase):
+    def setUp(self):
+        super().setUp()
+        hotel = Hotel.objects.create(name="KS", code="KS1")
+        self.room = Room.objects.create(hotel=hotel, room_number="101", room_type="Đơn")
+        dob = date(1990, 5, 1)
+        self.original = Guest.objects.create(full_name="Nguyễn Văn Đức", dob=dob, id_number="079123456789", address="HCM")
+        self.typo = Guest.objects.create(full_name="Nguyen Van Duc", dob=dob, id_number="079123456780", address="HCM", phone="0901234567")
+        self.other = Guest.objects.create(full_name="Trần Thị B", dob=dob, id_number="080000000001", address="HN")
+
+    def test_finds_typo_duplicate_only(self):
+        candidates = find_duplicates()
+        self.assertEqual([(c.first, c.second) for c in candidates], [(self.original.id, self.typo.id)])
+
+    def test_merge_repoints_bookings_and_stays(self):
+        res = Reservation.objects.create(room=self.room, guest=self.typo, check_in_date=timezone.now())
+        res.occupants.add(self.typo, self.original)
+        merge_guests(self.original.id, [self.typo.id])
+        res.refresh_from_db()
+        self.assertEqual(res.guest_id, self.original.id)
+        self.assertEqual(list(res.occupants.values_list('id', flat=True)), [self.original.id])
+        self.assertFalse(Guest.objects.filter(id=self.typo.id).exists())
+        self.assertEqual(Guest.objects.get(id=self.original.id).phone, "0901234567")
+
+
+class EagerLoadingTests(PmsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('letan', password='x')
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+        self.hotel = Hotel.objects.create(name="KS", code="KS1")
+
+    def _seed(self, count):
+        for _ in range(count):
+            room = Room.objects.create(hotel=self.hotel, room_number=f"{Room.objects.count() + 100}", room_type="Đơn")
+            guest = Guest.objects.create(full_name=f"Khách {room.room_number}", id_number=f"ID{room.room_number}", address="HCM")
+            Reservation.objects.create(room=room, guest=guest, check_in_date=timezone.now())
+            GuestRequest.objects.create(room=room, content="Thêm khăn")
+
+    def test_list_endpoints_use_constant_queries(self):
+        for url in ['/api/bookings/', '/api/guest-requests/', '/api/guests/']:
+            self._seed(2)
+            with self.assertNumQueries(1):
+                first = self.api.get(url)
+            self._seed(5)
+            with self.assertNumQueries(1):
+                second = self.api.get(url)
+            self.assertEqual(first.status_code, 200)
+            self.assertEqual(second.status_code, 200)
+
+    def test_retrieve_booking_includes_related_names(self):
+        self._seed(1)
+        res = Reservation.objects.get()
+        with self.assertNumQueries(1):
+            response = self.api.get(f'/api/bookings/{res.id}/')
+        self.assertEqual(response.data['guest_name'], res.guest.full_name)
+        self.assertEqual(response.data['room_number'], res.room.room_number)
+
+
+class CompactRendererTests(PmsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('letan', password='x')
+        self.api = APIClient()
+        self.api.credentials(HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=self.user).key}")
+        hotel = Hotel.objects.create(name="KS", code="KS1")
+        Room.objects.bulk_create([Room(hotel=hotel, room_number=str(100 + i), room_type="Đơn") for i in range(30)])
+
+    def test_fast_renderer_matches_drf_output(self):
+        data = {'price': Decimal('500000'), 'at': timezone.now(), 'name': 'Phòng', 'note': 'dòng 1\u2028dòng 2\u2029'}
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_columnar_format(self):
+        response = self.api.get('/api/dashboard/', {'format': 'columnar'})
+        body = json.loads(response.content)
+        self.assertIn('status_display', body['columns'])
+        self.assertEqual(len(body['rows']), 30)
+
+    def test_large_api_response_is_gzipped(self):
+        response = self.api.get('/api/dashboard/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(len(json.loads(gzip.decompress(response.content))), 30)
+
+
+class CatalogCacheTests(PmsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('letan', password='x')
+        self.api = APIClient()
+        self.api.credentials(HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=self.user).key}")
+        ServiceItem.objects.create(item_name="Nước suối", price=10000)
+
+    def test_services_served_from_cache_with_etag(self):
+        first = self.api.get('/api/services/')
+        self.assertEqual(first.data[0]['item_name'], "Nước suối")
+        with self.assertNumQueries(0):  # token đã cache, danh mục đã cache
+            again = self.api.get('/api/services/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(again.status_code, 304)
+
+    def test_write_bumps_version(self):
+        before = self.api.get('/api/catalog-version/').data
+        with self.captureOnCommitCallbacks(execute=True):
+            ServiceItem.objects.create(item_name="Mì ly", price=15000)
+        after = self.api.get('/api/catalog-version/').data
+        self.assertNotEqual(before['services'], after['services'])
+        self.assertEqual(before['rooms'], after['rooms'])
+        self.assertEqual(len(self.api.get('/api/services/').data), 2)
+
+    def test_write_in_another_worker_refreshes_catalog(self):
+        stale = catalog.get_catalog('services')
+        with self.captureOnCommitCallbacks(execute=True):
+            ServiceItem.objects.create(item_name="Mì ly", price=15000)
+        # Worker khác: còn giữ danh mục cũ trong bộ nhớ, cache 'default' (LocMem) riêng vẫn là phiên bản cũ
+        catalog._local['services'] = stale
+        cache.set(catalog.VERSION_KEY.format('services'), stale.version, timeout=None)
+        self.assertEqual(len(catalog.get_catalog('services').objects), 2)
+        locmem = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+        self.assertEqual(check_shared_version_cache(None), [])
+        with override_settings(CACHES={**settings.CACHES, 'versions': locmem}):
+            self.assertEqual([warning.id for warning in check_shared_version_cache(None)], ['pms.W002'])
+
+    def test_room_status_change_keeps_room_catalog(self):
+        room = Room.objects.create(hotel=Hotel.objects.create(name="KS", code="KS1"), room_number="101", room_type="Đơn")
+        version = catalog.get_version('rooms')
+        room.status = 'Occupied'
+        with self.captureOnCommitCallbacks(execute=True):
+            room.save(update_fields=['status'])
+        self.assertEqual(catalog.get_version('rooms'), version)
+        self.assertEqual(self.api.get('/api/catalog/rooms/').data[0]['room_number'], "101")
+
+
+class BootstrapTests(PmsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('letan', password='x')
+        self.api = APIClient()
+        self.api.credentials(HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=self.user).key}")
+        hotel = Hotel.objects.create(name="KS", code="KS1")
+        room = Room.objects.create(hotel=hotel, room_number="101", room_type="Đơn", status='Occupied')
+        guest = Guest.objects.create(full_name="Khách A", id_number="0791", address="HCM")
+        Reservation.objects.create(room=room, guest=guest, check_in_date=timezone.now(), status='Occupied')
+        GuestRequest.objects.create(room=room, content="Thêm khăn")
+
+    def test_combines_startup_sections(self):
+        data = self.api.get('/api/bootstrap/').data
+        self.assertEqual(data['dashboard'], self.api.get('/api/dashboard/').data)
+        self.assertEqual(data['management_stats'], self.api.get('/api/management-stats/').data)
+        self.assertEqual(data['guest_requests']['results'], self.api.get('/api/guest-requests/').data['results'])
+        self.assertIn('services', data['catalog_versions'])
+
+    def test_sections_filter(self):
+        data = self.api.get('/api/bootstrap/', {'sections': 'services'}).data
+        self.assertEqual(set(data), {'catalog_versions', 'services'})
+
+
+class KpiEngineTests(PmsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.hotels = [Hotel.objects.create(name=f"KS {i}", code=f"KS{i}") for i in range(2)]
+        for i, status in enumerate(['Occupied', 'Vacant', 'Dirty', 'Occupied']):
+            room = Room.objects.create(hotel=self.hotels[i % 2], room_number=str(100 + i), room_type="Đơn", status=status)
+            if status == 'Occupied':
+                guest = Guest.objects.create(full_name=f"Khách {i}", id_number=f"ID{i}", address="HCM")
+                Reservation.objects.create(room=room, guest=guest, check_in_date=timezone.now(), status='Occupied')
+                GuestRequest.objects.create(room=room, content="Dọn phòng")
+
+    def test_one_query_per_table_and_per_hotel_breakdown(self):
+        with self.assertNumQueries(4):  # phòng, booking, booking lưu trữ, yêu cầu
+            kpis = compute_kpis()
+        self.assertEqual((kpis['total_rooms'], kpis['occupied_rooms'], kpis['dirty_rooms']), (4, 2, 1))
+        self.assertEqual(kpis['guests_in_house'], 2)
+        self.assertEqual(kpis['month_check_ins'], 2)
+        self.assertEqual([h['occupied_rooms'] for h in kpis['hotels']], [1, 1])
+        self.assertEqual(compute_kpis(self.hotels[1].id)['total_rooms'], 2)
+
+    def test_micro_cache(self):
+        get_kpis()
+        with self.assertNumQueries(0):
+            get_kpis()
+
+    def test_management_dashboard_kpis_not_from_replica(self):
+        # KPI nằm trong micro-cache dùng chung: phải tính ngoài reporting_reads()
+        self.client.force_login(User.objects.create_superuser('quanly', password='x'))
+        reporting = []
+        with mock.patch('pms.views.get_kpis', side_effect=lambda: reporting.append(db_router._reporting.get()) or get_kpis()):
+            self.assertEqual(self.client.get(reverse('management-dashboard')).status_code, 200)
+        self.assertEqual(reporting, [False])
+
+
+class CachedAuthenticationTests(PmsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('letan', password='matkhau-123')
+        self.token = Token.objects.create(user=self.user)
+        self.api = APIClient()
+        self.api.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+    def test_token_lookup_is_cached(self):
+        self.api.get('/api/catalog-version/')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.api.get('/api/catalog-version/').status_code, 200)
+
+    def test_logout_and_user_delete_invalidate(self):
+        self.api.get('/api/catalog-version/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.api.post('/api/logout/')
+        self.assertEqual(self.api.get('/api/catalog-version/').status_code, 401)
+
+        other = User.objects.create_user('buongphong', password='x')
+        self.api.credentials(HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=other).key}")
+        self.api.get('/api/catalog-version/')
+        with self.captureOnCommitCallbacks(execute=True):
+            other.delete()
+        self.assertEqual(self.api.get('/api/catalog-version/').status_code, 401)
+
+    def test_logout_in_another_worker_revokes_token(self):
+        self.api.get('/api/catalog-version/')
+        key = ('token', self.token.key)
+        stale = auth_cache.get(key)
+        with self.captureOnCommitCallbacks(execute=True):
+            APIClient(HTTP_AUTHORIZATION=f"Token {self.token.key}").post('/api/logout/')
+        # Worker này không nhận signal: LRU và thế hệ cũ trong cache riêng vẫn còn
+        auth_cache.set(key, stale)
+        cache.set(GENERATION_KEY, stale[0], timeout=None)
+        self.assertEqual(self.api.get('/api/catalog-version/').status_code, 401)
+
+    def test_expired_token_rejected_and_rotated_on_login(self):
+        Token.objects.filter(pk=self.token.pk).update(created=timezone.now() - settings.API_TOKEN_TTL)
+        self.assertEqual(self.api.get('/api/catalog-version/').status_code, 401)
+        response = self.client.post('/api/login/', {'username': 'letan', 'password': 'matkhau-123'})
+        self.assertNotEqual(response.json()['token'], self.token.key)
+
+    def test_session_user_cached(self):
+        self.client.force_login(self.user)
+        self.client.get(reverse('ajax-new-requests-count'))
+        with self.assertNumQueries(2):  # session + đếm yêu cầu, không còn truy vấn auth_user
+            self.client.get(reverse('ajax-new-requests-count'))
+
+    def test_existing_model_backend_session_kept(self):
+        # Phiên đăng nhập từ trước khi bật backend có cache vẫn hợp lệ
+        self.client.force_login(self.user, backend='django.contrib.auth.backends.ModelBackend')
+        self.assertEqual(self.client.get(reverse('ajax-new-requests-count')).status_code, 200)
+        self.assertEqual(self.client.get(reverse('ajax-new-requests-count')).wsgi_request.user, self.user)
+
+
+class GuestPortalTests(PmsTestCase):
+    def setUp(self):
+        super().setUp()
+        client_limiter.clear()
+        room_limiter.clear()
+        hotel = Hotel.objects.create(name="KS", code="KS1")
+        self.room = Room.objects.create(hotel=hotel, room_number="101", room_type="Đơn", status='Occupied')
+        guest = Guest.objects.create(full_name="Khách A", id_number="0791", address="HCM")
+        with self.captureOnCommitCallbacks(execute=True):
+            Reservation.objects.create(room=self.room, guest=guest, check_in_date=timezone.now(), status='Occupied')
+        self.url = reverse('guest-request-portal', args=[self.room.id])
+
+    def test_cached_stay_lookup(self):
+        self.assertContains(self.client.get(self.url), "Khách A")
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+        self.assertEqual(self.client.get(reverse('guest-request-portal', args=[9999])).status_code, 404)
+
+    def test_check_out_in_another_worker_closes_portal(self):
+        self.assertContains(self.client.get(self.url), "Khách A")
+        stale = portal_cache.get(self.room.id)
+        reservation = Reservation.objects.get(room=self.room)
+        reservation.status = 'Completed'
+        with self.captureOnCommitCallbacks(execute=True):
+            reservation.save()
+        # Worker này không nhận signal: mục cũ vẫn còn trong LRU của nó
+        portal_cache.set(self.room.id, stale)
+        self.assertNotContains(self.client.get(self.url), "Khách A")
+
+    def test_duplicate_requests_coalesced(self):
+        for _ in range(3):
+            self.client.post(self.url, {'content': 'Thêm  khăn tắm'})
+        self.client.post(self.url, {'content': 'Dọn phòng'})
+        self.assertEqual(sorted(GuestRequest.objects.values_list('content', flat=True)), ['Dọn phòng', 'Thêm khăn tắm'])
+
+    def test_throttled_per_client(self):
+        statuses = [self.client.post(self.url, {'content': f'Yêu cầu {i}'}).status_code for i in range(7)]
+        self.assertEqual(statuses, [200] * 5 + [429] * 2)
+        self.assertEqual(GuestRequest.objects.count(), 5)
+
+    def test_spoofed_forwarded_for_ignored(self):
+        statuses = [
+            self.client.post(self.url, {'content': f'Yêu cầu {i}'}, HTTP_X_FORWARDED_FOR=f'10.0.0.{i}').status_code
+            for i in range(7)
+        ]
+        self.assertEqual(statuses, [200] * 5 + [429] * 2)
+
+        with self.settings(TRUSTED_PROXY_COUNT=1):
+            request = RequestFactory().get('/', HTTP_X_FORWARDED_FOR='1.2.3.4, 203.0.113.7', REMOTE_ADDR='10.0.0.1')
+            self.assertEqual(client_ip(request), '203.0.113.7')
+            self.assertEqual(client_ip(RequestFactory().get('/', REMOTE_ADDR='10.0.0.1')), '10.0.0.1')
+
+
+class AsyncViewTests(PmsTestCase):
+    def setUp(self):
+        super().setUp()
+        hotel = Hotel.objects.create(name="KS", code="KS1")
+        self.free = Room.objects.create(hotel=hotel, room_number="101", room_type="Đơn")
+        self.busy = Room.objects.create(hotel=hotel, room_number="102", room_type="Đơn", status='Booked')
+        guest = Guest.objects.create(full_name="Khách A", id_number="0791", address="HCM")
+        Reservation.objects.create(
+            room=self.busy, guest=guest, status='Confirmed',
+            check_in_date=timezone.make_aware(timezone.datetime(2030, 1, 10, 14)),
+            check_out_date=timezone.make_aware(timezone.datetime(2030, 1, 12, 12)),
+        )
+        GuestRequest.objects.create(room=self.busy, content="Thêm nước", status='New')
+        self.user = User.objects.create_user('letan', password='x')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=self.user).key)
+
+    def test_requires_token(self):
+        response = APIClient().get(reverse('api-live-dashboard'))
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response['WWW-Authenticate'], 'Token')
+
+    def test_live_endpoints_match_sync_api(self):
+        for live, sync in [('api-live-dashboard', 'api-dashboard'), ('api-live-management-stats', 'api-management-stats')]:
+            live_data, sync_data = (json.loads(self.client.get(reverse(name)).content) for name in (live, sync))
+            if isinstance(live_data, dict):
+                live_data.pop('generated_at'), sync_data.pop('generated_at')
+            self.assertEqual(live_data, sync_data)
+
+    def test_availability(self):
+        url = reverse('api-live-availability')
+        rooms = lambda **params: [r['room_number'] for r in json.loads(self.client.get(url, params).content)['rooms']]
+        self.assertEqual(rooms(check_in='2030-01-11', check_out='2030-01-13'), ['101'])
+        self.assertEqual(rooms(check_in='2030-01-12', check_out='2030-01-13'), ['101', '102'])
+        self.assertEqual(rooms(check_in='2030-01-08'), ['101', '102'])
+        self.assertEqual(self.client.get(url, {'check_in': '2030-01-12', 'check_out': '2030-01-11'}).status_code, 400)
+        for bad in ('mai', '2030-13-01'):
+            self.assertEqual(self.client.get(url, {'check_in': bad}).status_code, 400)
+
+    def test_new_requests_count(self):
+        url = reverse('ajax-new-requests-count')
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.client.force_login(self.user)
+        self.assertEqual(json.loads(self.client.get(url).content), {'count': 1})
+
+
+class RequestTimingTests(PmsTestCase):
+    def setUp(self):
+        super().setUp()
+        hotel = Hotel.objects.create(name="KS", code="KS1")
+        for number in ('101', '102', '103', '104'):
+            Room.objects.create(hotel=hotel, room_number=number, room_type="Đơn")
+        self.user = User.objects.create_superuser('admin', 'a@example.com', 'x')
+
+    def timing_settings(self, **overrides):
+        config = dict(settings.REQUEST_TIMING, ENABLED=True, SERVER_TIMING_HEADER=True, **overrides)
+        return override_settings(REQUEST_TIMING=config)
+
+    def test_disabled_by_default(self):
+        self.client.force_login(self.user)
+        with override_settings(REQUEST_TIMING=dict(settings.REQUEST_TIMING, ENABLED=False)):
+            self.assertNotIn('Server-Timing', self.client.get(reverse('dashboard')))
+
+    def test_server_timing_header(self):
+        with self.timing_settings(SLOW_REQUEST_MS=60000, SLOW_QUERY_COUNT=1000, DUPLICATE_QUERY_THRESHOLD=1000):
+            self.client.force_login(self.user)
+            header = self.client.get(reverse('dashboard'))['Server-Timing']
+            self.assertRegex(header, r'db;dur=[\d.]+;desc="\d+ queries"')
+            self.assertIn('tpl;dur=', header)
+            self.assertIn('total;dur=', header)
+            # View async cũng được đo
+            api = APIClient()
+            api.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=self.user).key)
+            self.assertIn('db;dur=', api.get(reverse('api-live-dashboard'))['Server-Timing'])
+
+    def test_slow_request_log_reports_duplicates(self):
+        def n_plus_one_view(request):
+            for room in Room.objects.all():
+                Reservation.objects.filter(room=room).first()
+            return HttpResponse()
+
+        with self.timing_settings(SLOW_REQUEST_MS=60000, SLOW_QUERY_COUNT=1000, DUPLICATE_QUERY_THRESHOLD=3):
+            middleware = RequestTimingMiddleware(n_plus_one_view)
+            with self.assertLogs('pms.performance', 'WARNING') as logs:
+                middleware(RequestFactory().get('/phong/'))
+        record = json.loads(logs.output[0].split('slow_request ', 1)[1])
+        self.assertEqual(record['path'], '/phong/')
+        self.assertEqual(record['queries'], 5)
+        self.assertEqual(record['duplicate_queries'], 3)
+        self.assertEqual(record['top_duplicates'][0]['count'], 4)
+
+
+class ProfilingTests(PmsTestCase):
+    def setUp(self):
+        super().setUp()
+        hotel = Hotel.objects.create(name="KS", code="KS1")
+        Room.objects.create(hotel=hotel, room_number="101", room_type="Đơn")
+        self.admin = User.objects.create_superuser('admin', 'a@example.com', 'x')
+        self.staff = User.objects.create_user('letan', password='x', is_staff=True)
+        workdir = tempfile.TemporaryDirectory()
+        self.addCleanup(workdir.cleanup)
+        config = dict(settings.PROFILING, ENABLED=True, DIR=workdir.name, MAX_PER_HOUR=3, INTERVAL_MS=1)
+        self.enterContext(override_settings(PROFILING=config))
+
+    def test_superuser_only(self):
+        self.client.force_login(self.staff)
+        self.assertNotIn('X-Profile-Id', self.client.get(reverse('dashboard'), {'_profile': '1'}))
+        self.client.force_login(self.admin)
+        self.assertNotIn('X-Profile-Id', self.client.get(reverse('dashboard')))
+        self.assertEqual(list_profiles(), [])
+
+    def test_profiles_are_stored_listed_and_rate_capped(self):
+        self.client.force_login(self.admin)
+        sampled = self.client.get(reverse('dashboard'), {'_profile': '1'})['X-Profile-Id']
+        self.client.get(reverse('booking-management'), HTTP_X_PROFILE='cprofile')
+        # Token API: request.user chưa được DRF gán ở tầng middleware
+        api = APIClient()
+        api.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=self.admin).key)
+        self.assertIn('X-Profile-Id', api.get(reverse('api-dashboard'), HTTP_X_PROFILE='1'))
+        self.assertEqual(self.client.get(reverse('dashboard'), {'_profile': '1'})['X-Profile'], 'rate-limited')
+
+        profiles = {p['id']: p for p in list_profiles()}
+        self.assertEqual(len(profiles), 3)
+        self.assertEqual(profiles[sampled]['view'], 'dashboard')
+        self.assertEqual(profiles[sampled]['user'], 'admin')
+        self.assertEqual({p['mode'] for p in profiles.values()}, {'sample', 'cprofile'})
+
+        page = self.client.get(reverse('admin-profiles'))
+        self.assertContains(page, sampled)
+        download = self.client.get(reverse('admin-profile-download', args=[sampled]))
+        self.assertEqual(download.status_code, 200)
+        self.assertTrue(download.get('Content-Disposition', '').endswith('.folded"'))
+        self.assertEqual(self.client.get(reverse('admin-profile-download', args=['..%2Fx'])).status_code, 404)
+        self.client.force_login(self.staff)
+        self.assertEqual(self.client.get(reverse('admin-profiles')).status_code, 403)
+
+
+class MetricsTests(PmsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.hotel = Hotel.objects.create(name="KS", code="KS1")
+        self.rooms = [Room.objects.create(hotel=self.hotel, room_number=n, room_type="Đơn") for n in ('101', '102', '103')]
+        GuestRequest.objects.create(room=self.rooms[0], content="Thêm nước", status='New')
+        self.user = User.objects.create_superuser('admin', 'a@example.com', 'x')
+        workdir = tempfile.TemporaryDirectory()
+        self.addCleanup(workdir.cleanup)
+        config = dict(settings.METRICS, ENABLED=True, STORE=f'{workdir.name}/metrics.sqlite3', TOKEN='', FLUSH_SECONDS=0)
+        self.enterContext(override_settings(METRICS=config))
+        metrics.flush()  # bỏ delta còn sót từ test khác vào store tạm này
+
+    def scrape(self):
+        self.client.force_login(self.user)
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        return response.content.decode()
+
+    def test_request_histograms_and_cache_ratio(self):
+        self.client.force_login(self.user)
+        for _ in range(2):
+            self.client.get(reverse('dashboard'))
+        body = self.scrape()
+        self.assertIn('# TYPE pms_http_request_duration_seconds histogram', body)
+        self.assertIn('pms_http_request_duration_seconds_count{method="GET",view="dashboard"} 2', body)
+        self.assertIn('pms_http_request_duration_seconds_bucket{method="GET",view="dashboard",le="+Inf"} 2', body)
+        self.assertIn('pms_db_queries_per_request_count{view="dashboard"} 2', body)
+        self.assertIn('pms_http_responses_total{code="2xx",view="dashboard"} 2', body)
+        self.assertIn('pms_local_cache_hit_ratio{cache="auth"}', body)
+
+    def test_business_gauges_follow_writes(self):
+        body = self.scrape()
+        self.assertIn('pms_rooms{hotel="KS1",status="Vacant"} 3', body)
+        self.assertIn('pms_guest_requests_pending{hotel="KS1"} 1', body)
+        with self.captureOnCommitCallbacks(execute=True):
+            room = self.rooms[1]
+            room.status = 'Occupied'
+            room.save()
+            GuestRequest.objects.create(room=room, content="Dọn phòng", status='New')
+        # Scrape không tính lại từ DB: gauge đã được cập nhật khi ghi
+        with self.assertNumQueries(0):
+            body = metrics.render()
+        self.assertIn('pms_rooms{hotel="KS1",status="Occupied"} 1', body)
+        self.assertIn('pms_rooms{hotel="KS1",status="Vacant"} 2', body)
+        self.assertIn('pms_guest_requests_pending{hotel="KS1"} 2', body)
+
+    def test_counters_are_summed_across_workers(self):
+        labels = 'method="GET",view="dashboard"'
+        other_worker = metrics.MetricsStore(settings.METRICS['STORE'])
+        other_worker.add({('pms_http_request_duration_seconds', 'pms_http_request_duration_seconds_count', labels, ''): 5})
+        metrics.observe_request('dashboard', 'GET', 200, 0.01, 3)
+        self.assertIn(f'pms_http_request_duration_seconds_count{{{labels}}} 6', metrics.render())
+
+    def test_staff_only_without_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        self.client.force_login(User.objects.create_user('letan', password='x'))
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get('/metrics').status_code, 200)
+
+    def test_token_and_disabled(self):
+        with override_settings(METRICS=dict(settings.METRICS, TOKEN='bi-mat')):
+            self.assertEqual(self.client.get('/metrics').status_code, 401)
+            self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer bi-mat').status_code, 200)
+        with override_settings(METRICS=dict(settings.METRICS, ENABLED=False)):
+            self.assertEqual(self.client.get('/metrics').status_code, 404)
+
+
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+
+    def test_only_reporting_reads_use_replica(self):
+        with mock.patch('pms.db_router.replica_available', return_value=True):
+            self.assertIsNone(self.router.db_for_read(Reservation))
+            with reporting_reads():
+                self.assertEqual(self.router.db_for_read(Reservation), 'replica')
+                # Phiên/người dùng luôn đọc từ default
+                self.assertIsNone(self.router.db_for_read(User))
+            self.assertIsNone(self.router.db_for_read(Reservation))
+        self.assertEqual(self.router.db_for_write(Reservation), 'default')
+
+    def test_falls_back_without_replica(self):
+        with mock.patch('pms.db_router.replica_configured', return_value=False), reporting_reads():
+            self.assertIsNone(self.router.db_for_read(Reservation))
+        self.assertFalse(self.router.allow_migrate('replica', 'pms'))
+
+
+class SqliteProfileTests(PmsTestCase):
+    def test_connection_profile(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest("Chỉ áp dụng cho SQLite")
+        self.assertEqual(connection.transaction_mode, 'IMMEDIATE')
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA synchronous")
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+            cursor.execute("PRAGMA busy_timeout")
+            self.assertGreater(cursor.fetchone()[0], 0)
+
+    def test_booking_conflict_checked_in_write_transaction(self):
+        user = User.objects.create_user('letan', password='x')
+        self.client.force_login(user)
+        room = Room.objects.create(hotel=Hotel.objects.create(name="KS", code="KS1"), room_number="101", room_type="Đơn")
+        url = reverse('create-booking', args=[room.id])
+        form = {
+            'main-full_name': 'Khách A', 'main-id_type': 'CCCD', 'main-address': 'HCM',
+            'res-check_in_date': '2030-01-10 14:00', 'res-check_out_date': '2030-01-12 12:00',
+            'res-deposit': '0', 'res-status': 'Confirmed',
+            'others-TOTAL_FORMS': '0', 'others-INITIAL_FORMS': '0',
+        }
+        self.client.post(url, {**form, 'main-id_number': '0791'})
+        response = self.client.post(url, {**form, 'main-id_number': '0792', 'res-check_in_date': '2030-01-11 14:00'})
+        self.assertContains(response, "đã kẹt lịch của khách Khách A")
+        self.assertEqual(Reservation.objects.count(), 1)
+        self.assertFalse(Guest.objects.filter(id_number='0792').exists())
+
+
+class SeedHotelTests(PmsTestCase):
+    def test_seed_and_clear(self):
+        result = seed_hotel(SeedOptions(hotels=2, rooms_per_hotel=5, years=0.2, future_days=10, batch_size=50))
+        self.assertEqual(Room.objects.count(), 10)
+        self.assertEqual(Reservation.objects.count(), result.counts['reservations'])
+        self.assertGreater(result.counts['reservations'], 10)
+        # Mỗi phòng tối đa một lượt đang ở và trạng thái phòng khớp với lượt đó
+        occupied = Reservation.objects.filter(status='Occupied')
+        self.assertEqual(occupied.count(), len(set(occupied.values_list('room_id', flat=True))))
+        self.assertEqual(set(occupied.values_list('room_id', flat=True)), set(Room.objects.filter(status='Occupied').values_list('id', flat=True)))
+        self.assertFalse(Reservation.objects.filter(occupants=None).exists())
+
+        clear_seed_data()
+        self.assertFalse(Room.objects.exists())
+        self.assertFalse(Guest.objects.exists())
+
+    def test_reseed_after_deletes(self):
+        options = SeedOptions(hotels=2, rooms_per_hotel=3, years=0.1, future_days=5, batch_size=50)
+        seed_hotel(options)
+        # Xóa bớt khách sạn và khách đầu tiên: lần sinh tiếp theo không được trùng mã còn lại
+        Hotel.objects.get(code='SEED001').delete()
+        Guest.objects.order_by('id_number').first().delete()
+        seed_hotel(options)
+        self.assertEqual(sorted(Hotel.objects.values_list('code', flat=True)), ['SEED002', 'SEED003', 'SEED004'])
+
+
+class FragmentCacheTests(PmsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(User.objects.create_superuser('quanly', password='x'))
+        self.room = Room.objects.create(hotel=Hotel.objects.create(name="KS", code="KS1"), room_number="101", room_type="Đơn")
+        self.guest = Guest.objects.create(full_name="Khách A", id_number="0791", address="HCM")
+        with self.captureOnCommitCallbacks(execute=True):
+            Reservation.objects.create(room=self.room, guest=self.guest, check_in_date=timezone.now(), status='Occupied')
+
+    def rename_guest(self, name):
+        self.guest.full_name = name
+        with self.captureOnCommitCallbacks(execute=True):
+            self.guest.save()
+
+    def test_room_card_cached_until_reservation_changes(self):
+        self.assertContains(self.client.get(reverse('dashboard')), "Khách A")
+        Guest.objects.filter(pk=self.guest.pk).update(full_name="Khách B")  # không signal: thẻ cũ vẫn dùng
+        self.assertContains(self.client.get(reverse('dashboard')), "Khách A")
+        self.rename_guest("Khách C")
+        self.assertContains(self.client.get(reverse('dashboard')), "Khách C")
+
+    def test_write_in_another_worker_refreshes_room_card(self):
+        self.assertContains(self.client.get(reverse('dashboard')), "Khách A")
+        generation, room_version = fragments.room_versions([self.room.id])[self.room.id].split('.')
+        self.rename_guest("Khách C")
+        # Worker này vẫn giữ fragment và phiên bản cũ trong cache riêng (LocMemCache)
+        cache.set_many({fragments.GENERATION_KEY: generation, fragments.ROOM_KEY.format(self.room.id): room_version}, timeout=None)
+        self.assertContains(self.client.get(reverse('dashboard')), "Khách C")
+
+    def test_room_card_key_includes_reservation(self):
+        self.client.get(reverse('dashboard'))
+        # Đổi lượt ở bằng update() (không signal): thẻ không được giữ thông tin lượt ở cũ
+        Reservation.objects.filter(room=self.room).update(check_out_date=timezone.make_aware(timezone.datetime(2031, 5, 6, 12)))
+        self.assertContains(self.client.get(reverse('dashboard')), "12:00 06/05")
+
+    def test_calendar_rows_follow_reservation_version(self):
+        url = reverse('booking-management')
+        self.assertContains(self.client.get(url), "Khách A")
+        self.rename_guest("Khách C")
+        response = self.client.get(url)
+        self.assertContains(response, "Khách C")
+        self.assertNotContains(response, "Khách A")
+
+    def test_bulk_merge_invalidates_everything(self):
+        self.client.get(reverse('dashboard'))
+        primary = Guest.objects.create(full_name="Khách Gộp", id_number="0792", address="HCM")
+        with self.captureOnCommitCallbacks(execute=True):
+            merge_guests(primary.pk, [self.guest.pk])
+        self.assertContains(self.client.get(reverse('dashboard')), "Khách Gộp")
+
+    def test_deploy_check_requires_cached_loader(self):
+        self.assertEqual(check_cached_template_loader(None), [])
+        engine = dict(settings.TEMPLATES[0], OPTIONS={'loaders': ['django.template.loaders.app_directories.Loader']})
+        with override_settings(TEMPLATES=[engine]):
+            self.assertEqual([error.id for error in check_cached_template_loader(None)], ['pms.E001'])
+
+
+class ArchiveTests(PmsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.room = Room.objects.create(hotel=Hotel.objects.create(name="KS", code="KS1"), room_number="101", room_type="Đơn", price_per_night=500000)
+        self.guest = Guest.objects.create(full_name="Khách A", id_number="0791", address="HCM")
+        now = timezone.now()
+        self.old = Reservation.objects.create(room=self.room, guest=self.guest, status='Completed',
+                                              check_in_date=now - timedelta(days=402), check_out_date=now - timedelta(days=400))
+        self.old.occupants.add(self.guest)
+        ServiceCharge.objects.create(reservation=self.old, item_name="Nước suối", quantity=1, price=10000)
+        GuestRequest.objects.create(room=self.room, reservation=self.old, content="Thêm khăn", status='Completed')
+        self.recent = Reservation.objects.create(room=self.room, guest=self.guest, status='Completed',
+                                                 check_in_date=now - timedelta(days=2), check_out_date=now - timedelta(hours=1))
+
+    def test_moves_closed_stays_with_children(self):
+        self.assertEqual(archive_reservations(batch_size=1), 1)
+        self.assertEqual(list(Reservation.objects.values_list('id', flat=True)), [self.recent.id])
+        archived = ArchivedReservation.objects.get(pk=self.old.id)
+        self.assertEqual(archived.service_charges.get().item_name, "Nước suối")
+        self.assertEqual(archived.requests.get().content, "Thêm khăn")
+        self.assertEqual(list(archived.occupants.all()), [self.guest])
+        self.assertFalse(ServiceCharge.objects.exists() or GuestRequest.objects.exists())
+        self.assertEqual(archive_reservations(), 0)
+
+    def test_reporting_reads_archive(self):
+        ServiceCharge.objects.create(reservation=self.recent, item_name="Mì ly", quantity=1, price=15000)
+        before = compute_kpis()['month_check_ins'], archive.service_revenue(status='Completed')
+        archive_reservations(cutoff=timezone.now())  # lưu trữ cả booking vừa trả phòng
+        self.assertFalse(Reservation.objects.exists())
+        self.assertEqual((compute_kpis()['month_check_ins'], archive.service_revenue(status='Completed')), before)
+        self.assertEqual(len(archive.stays_history(status='Completed')), 2)
+
+    def test_reports_keep_totals_after_archiving(self):
+        ServiceCharge.objects.create(reservation=self.recent, item_name="Mì ly", quantity=2, price=15000)
+        self.client.force_login(User.objects.create_superuser('quanly', password='x'))
+
+        def totals():
+            summary = self.client.get(reverse('service-summary')).context
+            dashboard = self.client.get(reverse('management-dashboard')).context
+            return summary['total_revenue'], len(summary['all_charges']), dashboard['revenue_month']
+
+        before = totals()
+        self.assertEqual(before[:2], (40000, 2))
+        archive_reservations(cutoff=timezone.now())
+        self.assertFalse(ServiceCharge.objects.exists())
+        self.assertEqual(totals(), before)
+
+    def test_merge_keeps_archived_history(self):
+        archive_reservations()
+        primary = Guest.objects.create(full_name="Khách A", id_number="0792", address="HCM")
+        merge_guests(primary.pk, [self.guest.pk])
+        archived = ArchivedReservation.objects.get(pk=self.old.id)
+        self.assertEqual((archived.guest_id, list(archived.occupants.values_list('id', flat=True))), (primary.pk, [primary.pk]))
+
+
+class PhotoRetentionTests(PmsTestCase):
+    def setUp(self):
+        super().setUp()
+        media, cold = tempfile.TemporaryDirectory(), tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.addCleanup(cold.cleanup)
+        self.cold = Path(cold.name)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        self.enterContext(override_settings(PHOTO_RETENTION=dict(settings.PHOTO_RETENTION, DIR=cold.name, AFTER_DAYS=30)))
+        room = Room.objects.create(hotel=Hotel.objects.create(name="KS", code="KS1"), room_number="101", room_type="Đơn")
+        long_ago = timezone.now() - timedelta(days=100)
+        self.guests = []
+        for i, status in enumerate(['Completed', 'Completed', 'Occupied']):
+            name = default_storage.save(f'guest_ids/cccd{i}.jpg', ContentFile(b'anh-%d' % i))
+            guest = Guest.objects.create(full_name=f"Khách {i}", id_number=f"079{i}", address="HCM", photo_front=name)
+            Reservation.objects.create(room=room, guest=guest, status=status, check_in_date=long_ago,
+                                       check_out_date=long_ago + timedelta(days=1) if status == 'Completed' else None)
+            self.guests.append(guest)
+        Guest.objects.update(created_at=long_ago)
+
+    def photo(self, guest):
+        return Guest.objects.values_list('photo_front', flat=True).get(pk=guest.pk)
+
+    def test_moves_only_expired_guests(self):
+        stats = retain_photos()
+        self.assertEqual((stats['guests'], stats['photos']), (2, 2))
+        guest = Guest.objects.get(pk=self.guests[0].pk)
+        self.assertEqual(guest.photo_front.name, f"cold/{timezone.localtime(guest.created_at):%Y-%m}/{guest.pk}-front.jpg")
+        self.assertFalse(default_storage.exists('guest_ids/cccd0.jpg'))
+        self.assertTrue(default_storage.exists(self.photo(self.guests[2])))  # còn đang ở
+        self.client.force_login(User.objects.create_user('letan', password='x'))
+        response = self.client.get(reverse('guest-photo', args=[self.guests[0].pk, 'front']))
+        self.assertEqual(b''.join(response.streaming_content), b'anh-0')
+        # Link "Hiện tại" của form sửa khách cũng đi qua view thay vì /media/cold/...
+        page = self.client.get(reverse('edit-guest', args=[self.guests[0].pk])).content.decode()
+        self.assertIn(f'href="{reverse("guest-photo", args=[self.guests[0].pk, "front"])}"', page)
+        self.assertNotIn('/media/cold/', page)
+        self.assertEqual(retain_photos()['guests'], 0)
+
+    def test_tarballs_resume_from_checkpoint(self):
+        with override_settings(PHOTO_RETENTION=dict(settings.PHOTO_RETENTION, FORMAT='tar.gz')):
+            self.assertEqual(retain_photos(limit=1)['photos'], 1)
+            self.assertEqual(self.photo(self.guests[1])[:5], 'guest')  # lần sau mới tới
+            self.assertEqual(retain_photos(limit=1)['photos'], 1)
+        name = self.photo(self.guests[1])
+        self.assertIn('.tar.gz#', name)
+        self.assertEqual(open_photo(name).read(), b'anh-1')
+        self.assertEqual(len(list(self.cold.glob('*/*.tar.gz'))), 2)
+
+    def test_interrupted_batch_only_deletes_unreferenced_files(self):
+        orphan = default_storage.save('guest_ids/da-chep.jpg', ContentFile(b'x'))
+        with open(self.cold / 'checkpoint.json', 'w') as fh:  # lô trước dừng sau khi đổi tham chiếu
+            json.dump({'last_id': 0, 'pending_delete': [orphan, self.photo(self.guests[2])]}, fh)
+        retain_photos()
+        self.assertFalse(default_storage.exists(orphan))
+        self.assertTrue(default_storage.exists(self.photo(self.guests[2])))
+
+
+class RateCalendarTests(PmsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.room = Room.objects.create(hotel=Hotel.objects.create(name="KS", code="KS1"), room_number="101", room_type="Đơn", price_per_night=500000)
+        self.today = timezone.localdate()
+
+    def add_rule(self, offset, length, kind, value, priority=0, weekdays=''):
+        with self.captureOnCommitCallbacks(execute=True):
+            RateRule.objects.create(room_type="Đơn", name=f"{kind} {value}", kind=kind, value=value, priority=priority, weekdays=weekdays,
+                                    date_from=self.today + timedelta(days=offset), date_to=self.today + timedelta(days=offset + length - 1))
+
+    def test_rules_layer_by_priority_and_weekday(self):
+        self.add_rule(0, 60, 'percent', 110)
+        self.add_rule(0, 60, 'percent', 120, priority=1, weekdays='45')
+        self.add_rule(20, 3, 'fixed', 1500000, priority=2)
+        calendar = rates.get_calendar()
+        expected = []
+        for offset in range(-5, 70):
+            day = self.today + timedelta(days=offset)
+            if 20 <= offset < 23:
+                expected.append(1500000)
+            elif 0 <= offset < 60:
+                expected.append(600000 if day.weekday() in (4, 5) else 550000)
+            else:
+                expected.append(500000)
+        first = self.today - timedelta(days=5)
+        self.assertEqual(calendar.nightly_rates("Đơn", 500000, first, 75), expected)
+        self.assertEqual(calendar.stay_total("Đơn", 500000, first, 75), sum(expected))
+        totals = calendar.stay_totals(["Đơn", "Đôi"], [500000, 800000], np.array([first, first], dtype='datetime64[D]'), [75, 2])
+        self.assertEqual(totals.tolist(), [sum(expected), 1600000])
+        # Ngoài cửa sổ tính sẵn: giá gốc
+        self.assertEqual(calendar.stay_total("Đơn", 500000, self.today + timedelta(days=4000), 365), 365 * 500000)
+
+    def test_billing_and_booking_use_calendar(self):
+        rates.get_calendar()
+        self.add_rule(-30, 60, 'fixed', 700000)
+        guest = Guest.objects.create(full_name="Khách A", id_number="0791", address="HCM")
+        reservation = Reservation.objects.create(room=self.room, guest=guest, status='Occupied',
+                                                 check_in_date=timezone.now() - timedelta(days=2))
+        bill = calculate_bill_details(reservation)
+        self.assertEqual((bill['total_room_cost'], bill['room_rate'], bill['rate_varies']),
+                         (bill['num_nights'] * 700000, 700000, True))
+        user = User.objects.create_user('letan', password='x')
+        client = APIClient()
+        client.force_authenticate(user)
+        data = client.get(reverse('api-checkout', args=[reservation.id])).json()
+        self.assertEqual(Decimal(data['total_room_cost']), data['num_nights'] * 700000)
+        response = client.post(reverse('reservation-list'), {
+            'room_id': self.room.id, 'guest_id': guest.id, 'deposit': 0,
+            'check_in_date': (timezone.now() + timedelta(days=3)).isoformat(),
+            'check_out_date': (timezone.now() + timedelta(days=5)).isoformat(),
+        }, format='json')
+        self.assertEqual(Decimal(response.json()['quoted_room_cost']), 1400000)
+
+    def test_rule_saved_in_another_worker_reprices(self):
+        stale = rates.get_calendar()
+        self.add_rule(0, 10, 'fixed', 700000)
+        # Worker này vẫn giữ lịch và phiên bản cũ trong bộ nhớ/LocMemCache riêng của nó
+        rates._local['calendar'] = stale
+        cache.set(rates.VERSION_KEY, stale.version, timeout=None)
+        self.assertEqual(rates.quote_room(self.room, timezone.now(), 2), (1400000, 700000))
+
+
+class QuoteTests(PmsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.enterContext(override_settings(RATES=dict(settings.RATES, DAYS_AFTER=3000)))  # tới năm 2031
+        hotel = Hotel.objects.create(name="KS", code="KS1")
+        self.rooms = {number: Room.objects.create(hotel=hotel, room_number=number, room_type=room_type, price_per_night=price)
+                      for number, room_type, price in [("101", "Đôi", 600000), ("102", "Đôi", 600000), ("201", "Đơn", 400000)]}
+        guest = Guest.objects.create(full_name="Khách A", id_number="0791", address="HCM")
+        Reservation.objects.create(room=self.rooms["101"], guest=guest, status='Confirmed',
+                                   check_in_date=timezone.make_aware(timezone.datetime(2031, 3, 1, 14)),
+                                   check_out_date=timezone.make_aware(timezone.datetime(2031, 3, 3, 12)))
+        RateRule.objects.create(room_type="Đơn", name="Lễ", kind='fixed', value=700000,
+                                date_from=date(2031, 3, 2), date_to=date(2031, 3, 2))
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('sale', password='x'))
+
+    def post(self, lines):
+        return self.client.post(reverse('api-quote'), {'lines': lines}, format='json')
+
+    def test_allocates_and_prices_every_line(self):
+        stay = {'check_in': '2031-03-01', 'check_out': '2031-03-03'}
+        data = self.post([
+            {'room_type': 'Đôi', **stay}, {'room_type': 'Đôi', **stay},
+            {'room_id': self.rooms["201"].id, **stay}, {'room_type': 'Đôi', 'check_in': '2031-03-05'},
+            {'room_type': 'Suite', **stay}, {'room_type': 'Đôi', 'check_in': 'mai'},
+        ]).json()
+        lines = data['lines']
+        self.assertEqual([(line.get('room_number'), line.get('available')) for line in lines[:4]],
+                         [("102", True), ("101", False), ("201", True), ("101", True)])
+        self.assertEqual([Decimal(line['total']) for line in lines[:4]], [1200000, 1200000, 1100000, 600000])
+        self.assertEqual(Decimal(data['available_total']), 1200000 + 1100000 + 600000)
+        self.assertEqual(lines[4]['error'], "Không tìm thấy phòng phù hợp.")
+        self.assertIn("không hợp lệ", lines[5]['error'])
+
+    def test_query_count_does_not_grow_with_lines(self):
+        lines = [{'room_type': 'Đôi', 'check_in': f'2031-04-{day:02d}'} for day in range(1, 29)]
+        rates.get_calendar()
+        with self.assertNumQueries(2):
+            self.post(lines[:1])
+        with self.assertNumQueries(2):
+            response = self.post(lines * 5)
+        self.assertEqual(len(response.json()['lines']), 140)
+        self.assertEqual(self.post([]).status_code, 400)
+
+    def test_non_object_body_rejected(self):
+        response = self.client.post(reverse('api-quote'), [{'room_type': 'Đôi', 'check_in': '2031-04-01'}], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], "Cần danh sách 'lines' không rỗng.")
+
+
+class ForecastTests(PmsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.hotel = Hotel.objects.create(name="KS", code="KS1")
+        self.rooms = [Room.objects.create(hotel=self.hotel, room_number=f"10{i}", room_type="Đơn") for i in range(4)]
+        self.guest = Guest.objects.create(full_name="Khách A", id_number="0791", address="HCM")
+        self.today = timezone.localdate()
+
+    def stay(self, room, first, nights, status='Completed', booked_before=3):
+        check_in = timezone.make_aware(timezone.datetime.combine(self.today + timedelta(days=first), timezone.datetime.min.time().replace(hour=14)))
+        reservation = Reservation.objects.create(room=room, guest=self.guest, status=status, check_in_date=check_in,
+                                                 check_out_date=check_in + timedelta(days=nights, hours=-2) if nights else None)
+        Reservation.objects.filter(pk=reservation.pk).update(created_at=min(check_in - timedelta(days=booked_before), timezone.now()))
+        return reservation
+
+    def test_on_the_books_seasonal_and_pickup(self):
+        self.stay(self.rooms[0], -1, None, status='Occupied', booked_before=10)  # đang ở, chưa có ngày trả
+        self.stay(self.rooms[1], 2, 3, status='Confirmed')
+        self.stay(self.rooms[2], 2, 3, status='Cancelled')
+        for lag in (364, 728):  # cùng kỳ các năm trước: 2 phòng cho đêm +10
+            self.stay(self.rooms[1], 10 - lag, 1)
+            self.stay(self.rooms[2], 10 - lag, 1)
+        self.stay(self.rooms[3], -10, 10, booked_before=1)  # đặt sát ngày: lead 1..10
+        archive_reservations(cutoff=timezone.now() - timedelta(days=500))  # năm kia nằm ở bảng lưu trữ
+        self.assertTrue(ArchivedReservation.objects.exists())
+        with override_settings(FORECAST=dict(settings.FORECAST, PICKUP_WINDOW_DAYS=10)):
+            days = forecast.compute_forecast(self.today)['hotels'][0]['days']
+        self.assertEqual([day['on_the_books'] for day in days[:6]], [1, 0, 1, 1, 1, 0])
+        self.assertEqual(days[10]['seasonal'], round(4 / 6, 1))  # 2 phòng x 2 năm trên 6 mẫu cùng thứ
+        # 10 đêm qua: 11 đêm-booking, lead 1..10 và 10: còn 5 ngày thì thường có thêm 4/10 phòng
+        self.assertEqual([days[1]['pickup'], days[5]['pickup'], days[30]['pickup']], [0.0, 0.4, 1.1])
+        self.assertTrue(all(day['on_the_books'] <= day['forecast'] <= 4 for day in days))
+
+    def test_cached_per_day_and_exposed_over_api(self):
+        self.stay(self.rooms[1], 2, 3, status='Confirmed')
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('quanly', password='x'))
+        response = client.get(reverse('api-forecast'), {'hotel': self.hotel.id})
+        self.assertEqual((len(response.json()['days']), response.json()['rooms']), (90, 4))
+        with self.assertNumQueries(0):
+            self.assertEqual(forecast.get_forecast()['days'][2]['on_the_books'], 1)
+        self.assertEqual(client.get(reverse('api-forecast'), {'hotel': 999}).status_code, 404)
+
+
+class QueryBudgetMixin:
+    """Chạy bảng ngân sách truy vấn (pms/query_budgets.py) trên dữ liệu của seed_hotel."""
+    seed_options = None
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_hotel(cls.seed_options)
+        cls.user = User.objects.create_superuser('ngansach', 'ns@example.com', 'ngansach')
+        cls.token = Token.objects.create(user=cls.user).key
+        occupied = Reservation.objects.filter(status='Occupied').first()
+        # Phòng trống riêng, có một booking xa trong tương lai (không trùng ngày với các request đặt phòng mẫu)
+        room = Room.objects.create(hotel=occupied.room.hotel, room_number='NS-1', room_type='Đơn')
+        confirmed = Reservation.objects.create(
+            room=room, guest=occupied.guest, status='Confirmed',
+            check_in_date=timezone.make_aware(timezone.datetime(2031, 6, 1, 14)),
+            check_out_date=timezone.make_aware(timezone.datetime(2031, 6, 3, 12)),
+        )
+        cls.samples = {
+            'room': room.id,
+            'occupied': occupied.id,
+            'occupied_room': occupied.room_id,
+            'confirmed': confirmed.id,
+            'guest': occupied.guest_id,
+            'request': GuestRequest.objects.create(room_id=occupied.room_id, reservation=occupied, content="Thêm nước").id,
+            'service': ServiceItem.objects.first().id,
+            'staff': User.objects.create_user('nhanvien', password='x').id,
+            'catalog': 'services',
+            'side': 'front',
+        }
+
+    def setUp(self):
+        super().setUp()
+        client_limiter.clear()
+        room_limiter.clear()
+
+    def run_budget(self, budget):
+        client = APIClient() if budget.auth == 'token' else self.client_class()
+        if budget.auth == 'token':
+            client.credentials(HTTP_AUTHORIZATION='Token ' + self.token)
+        elif budget.auth == 'session':
+            client.force_login(self.user)
+        url = reverse(budget.name, args=[self.samples[key] for key in budget.args])
+        data = {key: value.format(**self.samples) if isinstance(value, str) else value for key, value in budget.data.items()}
+        for local in (cache, version_cache, auth_cache, lookup_cache, kpi_cache, portal_cache):
+            local.clear()
+        recorder = QueryRecorder()
+        # Mỗi request trong một savepoint riêng để các request ghi không ảnh hưởng nhau
+        savepoint = transaction.savepoint()
+        try:
+            with connection.execute_wrapper(recorder):
+                if budget.method == 'GET':
+                    response = client.get(url, data)
+                elif budget.auth == 'token':
+                    response = client.post(url, data, format='json')
+                else:
+                    response = client.post(url, data)
+        finally:
+            transaction.savepoint_rollback(savepoint)
+        return response, recorder
+
+    def test_every_url_has_a_budget(self):
+        def names(patterns):
+            for pattern in patterns:
+                if isinstance(pattern, URLResolver):
+                    yield from names(pattern.url_patterns)
+                elif pattern.name:
+                    yield pattern.name
+
+        missing = set(names(get_resolver('pms.urls').url_patterns)) - {budget.name for budget in BUDGETS}
+        self.assertFalse(missing, f"Thiếu ngân sách truy vấn cho: {', '.join(sorted(missing))}")
+
+    def test_query_budgets(self):
+        for budget in BUDGETS:
+            with self.subTest(url=budget.name, method=budget.method):
+                response, recorder = self.run_budget(budget)
+                self.assertEqual(response.status_code, budget.status, f"{budget.method} {budget.name}")
+                if len(recorder.queries) > budget.queries:
+                    self.fail(
+                        f"{budget.method} {budget.name}: {len(recorder.queries)} truy vấn, ngân sách {budget.queries}\n"
+                        + recorder.report()
+                    )
+
+
+class SmallHotelQueryBudgetTests(QueryBudgetMixin, PmsTestCase):
+    seed_options = SeedOptions(hotels=1, rooms_per_hotel=8, years=0.2, future_days=20)
+
+
+class LargeHotelQueryBudgetTests(QueryBudgetMixin, PmsTestCase):
+    seed_options = SeedOptions(hotels=2, rooms_per_hotel=40, years=1, future_days=60)
+
+
+class LoadTestHarnessTests(LiveServerTestCase):
+    def setUp(self):
+        cache.clear()
+        version_cache.clear()
+        auth_cache.clear()
+        User.objects.create_user('letan', password='mat-khau-123')
+        hotel = Hotel.objects.create(name="KS", code="KS1")
+        for number in ('101', '102', '103'):
+            Room.objects.create(hotel=hotel, room_number=number, room_type="Đơn")
+        ServiceItem.objects.create(item_name="Nước suối", price=10000)
+
+    def test_scenarios_against_live_server(self):
+        options = {
+            'username': 'letan', 'password': 'mat-khau-123', 'timeout': 10, 'seed': 1, 'think_ms': 20,
+            'weights': {'poll': 2, 'walk_in': 2, 'add_service': 2, 'checkout': 1, 'booking': 1},
+        }
+        report = asyncio.run(run_load(self.live_server_url, 2, 1.5, options))
+        self.assertEqual(report['failed_devices'], 0)
+        self.assertEqual(report['error_rate'], 0)
+        self.assertIn('GET /api/dashboard/', report['endpoints'])
+        self.assertGreater(report['endpoints']['GET /ajax/new-requests-count/']['requests'], 0)
+        self.assertTrue(Reservation.objects.exists())
@@ -1,9 +1,9 @@
 from django.urls import path, include
 from . import views
 from . import api_views  # Import file api_views
+from . import async_views
 from django.contrib.auth.views import LoginView, LogoutView
 from rest_framework.routers import DefaultRouter  # Import Router của DRF
-from rest_framework.authtoken.views import obtain_auth_token
 
 # --- CẤU HÌNH ROUTER CHO API ---
 router = DefaultRouter()
@@ -28,6 +28,7 @@ urlpatterns = [
     path('guests/', views.manage_guests, name='manage-guests'),
     path('guests/edit/<int:guest_id>/', views.edit_guest, name='edit-guest'),
     path('guests/delete/<int:guest_id>/', views.delete_guest, name='delete-guest'),
+    path('guests/<int:guest_id>/photo/<str:side>/', views.guest_photo, name='guest-photo'),
     
     # QUẢN LÝ PHÒNG
     path('rooms/manage/', views.manage_rooms, name='manage-rooms'),
@@ -46,13 +47,16 @@ urlpatterns = [
     
     # XUẤT FILE & REQUEST
     path('export/registry/', views.export_temporary_registry, name='export-registry'),
-    path('guest/request/<int:room_id>/', views.guest_request_portal, name='guest-request-portal'),
+    path('metrics', views.metrics_endpoint, name='metrics'),
+    path('guest/request/<int:room_id>/', async_views.guest_request_portal, name='guest-request-portal'),
     path('requests/', views.manage_requests, name='manage-requests'), 
     path('requests/complete/<int:request_id>/', views.complete_request, name='complete-request'),
-    path('ajax/new-requests-count/', views.check_new_requests_count, name='ajax-new-requests-count'),
+    path('ajax/new-requests-count/', async_views.check_new_requests_count, name='ajax-new-requests-count'),
+    path('ajax/guest-lookup/', views.guest_lookup, name='ajax-guest-lookup'),
     
     # LỊCH & DỊCH VỤ
     path('reservations/calendar/', views.reservation_calendar, name='reservation-calendar'),
+    path('services/summary/', views.service_charge_summary, name='service-summary'),
     path('services/inventory/', views.manage_service_inventory, name='manage-service-inventory'),
     path('services/inventory/create/', views.service_item_create, name='service-item-create'),
     path('services/inventory/edit/<int:item_id>/', views.service_item_edit, name='service-item-edit'),
@@ -74,7 +78,8 @@ urlpatterns = [
     path('api/', include(router.urls)),
     
     # API Authentication
-    path('api/login/', obtain_auth_token, name='api_token_auth'),
+    path('api/login/', api_views.LoginAPIView.as_view(), name='api_token_auth'),
+    path('api/logout/', api_views.LogoutAPIView.as_view(), name='api-logout'),
     
     # API Dashboard & Room Detail
     path('api/dashboard/', api_views.DashboardAPIView.as_view(), name='api-dashboard'),
@@ -89,4 +94,22 @@ urlpatterns = [
     # 👇 MỚI THÊM
     path('api/staff-schedule/', api_views.StaffScheduleAPIView.as_view(), name='api-staff-schedule'),
     path('api/management-stats/', api_views.ManagementStatsAPIView.as_view(), name='api-management-stats'),
+
+    # Danh mục có cache + phiên bản
+    path('api/catalog-version/', api_views.CatalogVersionAPIView.as_view(), name='api-catalog-version'),
+    path('api/catalog/<str:name>/', api_views.CatalogAPIView.as_view(), name='api-catalog'),
+
+    # Gộp các lệnh gọi lúc App khởi động
+    path('api/bootstrap/', api_views.BootstrapAPIView.as_view(), name='api-bootstrap'),
+
+    # Báo giá hàng loạt
+    path('api/quotes/', api_views.QuoteAPIView.as_view(), name='api-quote'),
+
+    # Dự báo công suất 90 ngày (cache theo ngày)
+    path('api/forecast/', api_views.ForecastAPIView.as_view(), name='api-forecast'),
+
+    # Endpoint async cho polling (chạy tốt nhất dưới ASGI, xem core/asgi.py)
+    path('api/live/dashboard/', async_views.live_dashboard, name='api-live-dashboard'),
+    path('api/live/management-stats/', async_views.live_management_stats, name='api-live-management-stats'),
+    path('api/live/availability/', async_views.live_availability, name='api-live-availability'),
 ]
\ No newline at end of file
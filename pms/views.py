@@ -1,20 +1,30 @@
+from django.conf import settings
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
-from django.http import HttpResponse, JsonResponse
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse
 from django.utils import timezone
 from django.db import transaction
 from django.contrib import messages
-from django.db.models import Q, Sum
+from django.db.models import F, Q, Window
+from django.db.models.functions import RowNumber
 from django.forms import modelform_factory, modelformset_factory
 from django.urls import reverse
 from django.contrib.auth import logout
 from django.contrib.auth.models import User
 from datetime import datetime, timedelta, date
+from functools import partial
+import os
 import pandas as pd
 from io import BytesIO
 
 from .models import Room, Guest, Reservation, GuestRequest, ServiceCharge, ServiceItem, StaffSchedule
 from .forms import GuestForm, ReservationForm, ServiceChargeForm, ServiceItemForm, StaffScheduleForm, StaffUserForm
+from .pagination import keyset_page, get_page_size, InvalidCursor
+from .lookup import lookup_guests
+from .catalog import get_catalog
+from .kpi import get_kpis, local_month_range
+from .db_router import reporting_reads
+from . import archive, forecast, fragments, metrics, photo_retention, rates
 
 # Form sửa đổi nhanh thông tin Room
 RoomEditForm = modelform_factory(
@@ -85,6 +95,11 @@ def dashboard(request):
     }
     return render(request, 'pms/dashboard.html', context)
 
+class BookingConflict(Exception):
+    def __init__(self, reservation):
+        super().__init__(reservation)
+        self.reservation = reservation
+
 @login_required
 def create_booking(request, room_id):
     room = get_object_or_404(Room, id=room_id)
@@ -115,18 +130,17 @@ def create_booking(request, room_id):
                 status__in=['Confirmed', 'Occupied'],
                 check_in_date__lt=new_check_out, 
                 check_out_date__gt=new_check_in
-            )
-
-            if overlapping_bookings.exists():
-                conflict_res = overlapping_bookings.first()
-                conflict_out_str = conflict_res.check_out_date.strftime('%d/%m') if conflict_res.check_out_date else "??"
-                msg = f"Lỗi: Phòng {room.room_number} đã kẹt lịch của khách {conflict_res.guest.full_name} ({conflict_res.check_in_date.strftime('%d/%m')} - {conflict_out_str})."
-                messages.error(request, msg)
-                context = {'room': room, 'main_guest_form': main_guest_form, 'reservation_form': reservation_form, 'guest_formset': guest_formset}
-                return render(request, 'pms/booking_form.html', context)
+            ).select_related('guest')
 
             try:
                 with transaction.atomic():
+                    # Kiểm tra trùng lịch ngay trong transaction ghi (BEGIN IMMEDIATE trên SQLite,
+                    # khóa dòng phòng trên PostgreSQL) để hai lễ tân không đặt cùng một khoảng
+                    Room.objects.select_for_update().filter(id=room.id).exists()
+                    conflict_res = overlapping_bookings.first()
+                    if conflict_res:
+                        raise BookingConflict(conflict_res)
+
                     main_guest = main_guest_form.save()
                     
                     reservation = reservation_form.save(commit=False)
@@ -153,13 +167,20 @@ def create_booking(request, room_id):
                     if reservation.check_in_date.date() <= timezone.now().date():
                         if room.status == 'Vacant': 
                              room.status = 'Booked'
-                             room.save()
+                             room.save(update_fields=['status'])
 
-                messages.success(request, f"Tạo Booking thành công cho khách {main_guest.full_name}.")
+                nights = rates.booking_nights(new_check_in, new_check_out)
+                room_cost, _ = rates.quote_room(room, new_check_in, nights)
+                messages.success(request, f"Tạo Booking thành công cho khách {main_guest.full_name}. Tiền phòng dự kiến: {room_cost:,} VND ({nights} đêm).")
                 if 'next' in request.GET:
                     return redirect(request.GET['next'])
                 return redirect('dashboard')
 
+            except BookingConflict as conflict:
+                conflict_res = conflict.reservation
+                conflict_out_str = conflict_res.check_out_date.strftime('%d/%m') if conflict_res.check_out_date else "??"
+                msg = f"Lỗi: Phòng {room.room_number} đã kẹt lịch của khách {conflict_res.guest.full_name} ({conflict_res.check_in_date.strftime('%d/%m')} - {conflict_out_str})."
+                messages.error(request, msg)
             except Exception as e:
                 messages.error(request, f"Lỗi hệ thống: {e}")
         else:
@@ -205,7 +226,7 @@ def perform_check_in(request, reservation_id):
     reservation.save()
 
     room.status = 'Occupied'
-    room.save()
+    room.save(update_fields=['status'])
 
     messages.success(request, f"Phòng {room.room_number}: Check-in thành công. Giờ vào: {reservation.check_in_date.strftime('%d/%m %H:%M')}")
     return redirect('dashboard')
@@ -224,7 +245,7 @@ def cancel_booking(request, reservation_id):
         reservation.status = 'Cancelled'
         reservation.save()
         room.status = 'Vacant'
-        room.save()
+        room.save(update_fields=['status'])
         messages.success(request, f"Đã hủy đặt phòng của {reservation.guest.full_name}. Phòng {room.room_number} đã trống.")
         return redirect('dashboard')
     
@@ -246,7 +267,8 @@ def calculate_bill_details(reservation):
     if num_nights <= 0:
         num_nights = 1
 
-    total_room_cost = num_nights * room.price_per_night
+    # Giá theo lịch giá (RateRule), đêm đầu tiên là ngày nhận phòng
+    total_room_cost, room_rate = rates.quote_room(room, actual_check_in, num_nights)
 
     service_charges = ServiceCharge.objects.filter(reservation=reservation)
     total_service_cost = sum(charge.total_price for charge in service_charges)
@@ -259,7 +281,8 @@ def calculate_bill_details(reservation):
 
     return {
         'num_nights': num_nights,
-        'room_rate': room.price_per_night,
+        'room_rate': room_rate,
+        'rate_varies': total_room_cost != num_nights * room.price_per_night,
         'total_room_cost': total_room_cost,
         'service_charges': service_charges,
         'total_service_cost': total_service_cost,
@@ -310,7 +333,7 @@ def perform_check_out(request, reservation_id):
     reservation.save()
 
     room.status = 'Vacant'
-    room.save()
+    room.save(update_fields=['status'])
 
     messages.success(request, f"Phòng {room.room_number}: Check-out thành công. Tổng tiền thanh toán: {final_bill:,} VND.")
     return redirect('dashboard')
@@ -372,14 +395,8 @@ def booking_management(request):
                 booking_map[(res.room.id, curr)] = res
                 curr += timedelta(days=1)
 
-    calendar_data = []
-    for d in date_list:
-        row = {
-            'date': d,
-            'is_weekend': d.weekday() >= 5,
-            'is_today': d == today,
-            'room_cells': []
-        }
+    def build_cells(d):
+        room_cells = []
         for r in rooms:
             booking = booking_map.get((r.id, d))
             cell = {
@@ -399,8 +416,16 @@ def booking_management(request):
                         cell['status_class'] = 'bg-warning text-dark'  # Vàng: Chưa cọc
                     # ---------------------------------------------
             
-            row['room_cells'].append(cell)
-        calendar_data.append(row)
+            room_cells.append(cell)
+        return room_cells
+
+    # room_cells là hàm: template chỉ gọi (dựng ô) khi hàng lịch chưa có trong cache fragment
+    calendar_data = [{
+        'date': d,
+        'is_weekend': d.weekday() >= 5,
+        'is_today': d == today,
+        'room_cells': partial(build_cells, d),
+    } for d in date_list]
 
     context = {
         'page_title': 'Lịch Đặt Phòng (30 Ngày)',
@@ -410,11 +435,15 @@ def booking_management(request):
         'prev_date': (start_date - timedelta(days=15)).strftime('%Y-%m-%d'),
         'next_date': (start_date + timedelta(days=15)).strftime('%Y-%m-%d'),
         'today_str': today.strftime('%Y-%m-%d'),
+        'calendar_version': fragments.calendar_version(),
+        'fragment_timeout': fragments.timeout(),
     }
     return render(request, 'pms/booking_management.html', context)
 
 # ... (Giữ nguyên các hàm khác: export_temporary_registry, manage_requests...) ...
 @login_required
+@reporting_reads()
+@metrics.timed_export('temporary_registry')
 def export_temporary_registry(request):
     reservations = Reservation.objects.filter(status='Occupied').prefetch_related('occupants', 'room')
     data = []
@@ -454,21 +483,9 @@ def export_temporary_registry(request):
     messages.success(request, f"Đã xuất thành công {len(data)} hồ sơ đăng ký tạm trú.")
     return response
 
-def guest_request_portal(request, room_id):
-    room = get_object_or_404(Room, id=room_id)
-    current_res = Reservation.objects.filter(room=room, status='Occupied').first()
-    if not current_res: return render(request, 'pms/guest_inactive.html', {'room': room})
-    if request.method == 'POST':
-        content = request.POST.get('content')
-        if content:
-            GuestRequest.objects.create(room=room, reservation=current_res, content=content, status='New')
-            return render(request, 'pms/guest_success.html', {'room': room, 'message': 'Yêu cầu của quý khách đã được ghi nhận. Nhân viên sẽ xử lý sớm nhất.'})
-    context = {'room': room, 'guest_name': current_res.guest.full_name}
-    return render(request, 'pms/guest_request_form.html', context)
-
 @login_required
 def manage_requests(request):
-    requests_list = GuestRequest.objects.filter(status__in=['New', 'Processing']).select_related('room', 'reservation').order_by('created_at')
+    requests_list = GuestRequest.objects.filter(status__in=['New', 'Processing']).select_related('room', 'reservation__guest').order_by('created_at')
     context = {'page_title': 'Quản lý Yêu cầu Khách hàng (QR)', 'requests_list': requests_list}
     return render(request, 'pms/manage_requests.html', context)
 
@@ -493,7 +510,7 @@ def manage_room_services(request, reservation_id):
         return redirect('dashboard')
     service_charges = ServiceCharge.objects.filter(reservation=reservation).order_by('-created_at')
     service_form = ServiceChargeForm()
-    inventory_items = ServiceItem.objects.all().order_by('item_name')
+    inventory_items = get_catalog('services').objects
     total_service_cost = sum(charge.total_price for charge in service_charges)
     context = {
         'page_title': f"Dịch vụ phòng {room.room_number}",
@@ -554,10 +571,24 @@ def room_edit(request, room_id):
 
 @login_required
 def manage_service_inventory(request):
-    service_items = ServiceItem.objects.all().order_by('item_name')
+    service_items = get_catalog('services').objects
     context = {'page_title': 'Quản lý Danh mục Dịch vụ', 'service_items': service_items}
     return render(request, 'pms/service_inventory_management.html', context)
 
+@login_required
+@reporting_reads()
+def service_charge_summary(request):
+    """Phụ phí dịch vụ ghi nhận trong tháng, gồm cả booking đã lưu trữ (archive.py)."""
+    today = timezone.localdate()
+    month_start, month_end = local_month_range(today)
+    all_charges = archive.service_charges(created_at__gte=month_start, created_at__lt=month_end)
+    context = {
+        'page_title': f'Tổng hợp Dịch vụ - Tháng {today.month}',
+        'all_charges': all_charges,
+        'total_revenue': sum(charge.total_price for charge in all_charges),
+    }
+    return render(request, 'pms/service_charge_summary.html', context)
+
 @login_required
 def service_item_create(request):
     if request.method == 'POST':
@@ -610,10 +641,15 @@ def room_qr_code(request, room_id):
 def manage_guests(request):
     search_query = request.GET.get('q', '')
     if search_query:
-        guests = Guest.objects.filter(Q(full_name__icontains=search_query) | Q(id_number__icontains=search_query) | Q(phone__icontains=search_query)).order_by('-created_at')
+        guests = Guest.objects.filter(Q(full_name__icontains=search_query) | Q(id_number__icontains=search_query) | Q(phone__icontains=search_query))
     else:
-        guests = Guest.objects.all().order_by('-created_at')
-    context = {'page_title': 'Quản lý Hồ sơ Khách hàng', 'guests': guests, 'search_query': search_query}
+        guests = Guest.objects.all()
+    # Phân trang keyset (created_at, id): không COUNT(*), không OFFSET
+    try:
+        guests, next_cursor, prev_cursor = keyset_page(guests, request.GET.get('cursor'), get_page_size(request.GET.get('page_size')))
+    except InvalidCursor:
+        return redirect('manage-guests')
+    context = {'page_title': 'Quản lý Hồ sơ Khách hàng', 'guests': guests, 'search_query': search_query, 'next_cursor': next_cursor, 'prev_cursor': prev_cursor}
     return render(request, 'pms/manage_guests.html', context)
 
 @login_required
@@ -631,6 +667,19 @@ def edit_guest(request, guest_id):
     context = {'page_title': f"Sửa hồ sơ: {guest.full_name}", 'form': form, 'guest': guest}
     return render(request, 'pms/guest_edit_form.html', context)
 
+@login_required
+def guest_photo(request, guest_id, side):
+    """Ảnh giấy tờ của khách, kể cả ảnh đã chuyển sang kho lạnh (photo_retention.py)."""
+    field = photo_retention.PHOTO_FIELDS.get(side)
+    name = Guest.objects.filter(pk=guest_id).values_list(field, flat=True).first() if field else None
+    if not name:
+        raise Http404
+    try:
+        photo = photo_retention.open_photo(name)
+    except FileNotFoundError:
+        raise Http404
+    return FileResponse(photo, filename=os.path.basename(name.partition('#')[2] or name))
+
 @login_required
 @transaction.atomic
 def delete_guest(request, guest_id):
@@ -682,31 +731,43 @@ def room_create(request):
 
 @login_required
 def management_dashboard(request):
-    today = timezone.now()
+    today = timezone.localtime()
     current_month = today.month
-    current_year = today.year
-    occupied_rooms_count = Room.objects.filter(status='Occupied').count()
-    guest_count_month = Reservation.objects.filter(check_in_date__month=current_month, check_in_date__year=current_year).count()
-    completed_reservations = Reservation.objects.filter(status='Completed', check_out_date__month=current_month, check_out_date__year=current_year)
-    total_revenue = 0
-    for res in completed_reservations:
-        duration = res.check_out_date - res.check_in_date
-        nights = duration.days if duration.days > 0 else 1
-        room_revenue = nights * res.room.price_per_night
-        service_revenue = ServiceCharge.objects.filter(reservation=res).aggregate(Sum('price'))['price__sum'] or 0
-        total_revenue += (room_revenue + service_revenue)
+    # KPI đọc từ default: micro-cache dùng chung với dashboard lễ tân, không được chứa số liệu trễ của replica
+    kpis = get_kpis()
+    occupied_rooms_count = kpis['occupied_rooms']
+    guest_count_month = kpis['month_check_ins']
+    # Khoảng thời gian thay cho __month/__year để dùng được index
+    month_start, month_end = local_month_range(today.date())
+    # Doanh thu đọc cả booking đã lưu trữ (archive.py)
+    completed = {'status': 'Completed', 'check_out_date__gte': month_start, 'check_out_date__lt': month_end}
     start_of_week = today.date() - timedelta(days=today.weekday())
     week_dates = [start_of_week + timedelta(days=i) for i in range(7)]
     shifts = ['Morning', 'Afternoon', 'Night']
     shift_labels = {'Morning': 'Ca Sáng', 'Afternoon': 'Ca Chiều', 'Night': 'Ca Đêm'}
+    total_revenue = 0
+    schedules_by_cell = {}
+    with reporting_reads():
+        for check_in, check_out, price in archive.stays_history(**completed):
+            duration = check_out - check_in
+            nights = duration.days if duration.days > 0 else 1
+            total_revenue += nights * price
+        total_revenue += archive.service_revenue(**completed)
+        # Cả tuần trong một truy vấn thay vì một truy vấn mỗi ô (ca x ngày)
+        for schedule in StaffSchedule.objects.filter(date__gte=week_dates[0], date__lte=week_dates[-1]).order_by('id'):
+            schedules_by_cell.setdefault((schedule.shift, schedule.date), []).append(schedule)
     timetable = []
     for shift_code in shifts:
         row_data = {'label': shift_labels[shift_code], 'days': []}
         for day in week_dates:
-            staffs = StaffSchedule.objects.filter(date=day, shift=shift_code)
-            row_data['days'].append(staffs)
+            row_data['days'].append(schedules_by_cell.get((shift_code, day), []))
         timetable.append(row_data)
-    context = {'page_title': f'Báo cáo Quản trị - Tháng {current_month}', 'occupied_count': occupied_rooms_count, 'guest_month_count': guest_count_month, 'revenue_month': total_revenue, 'week_dates': week_dates, 'timetable': timetable, 'today': today.date()}
+    # Dự báo công suất (forecast.py, cache theo ngày) để xếp ca
+    outlook = forecast.get_forecast()
+    outlook_by_date = {day['date']: day for day in outlook['days']}
+    week_forecast = [outlook_by_date.get(day) for day in week_dates]
+    context = {'page_title': f'Báo cáo Quản trị - Tháng {current_month}', 'occupied_count': occupied_rooms_count, 'guest_month_count': guest_count_month, 'revenue_month': total_revenue, 'week_dates': week_dates, 'timetable': timetable, 'today': today.date(),
+               'week_forecast': week_forecast, 'forecast_days': outlook['days'][:14], 'forecast_rooms': outlook['rooms']}
     return render(request, 'pms/management_dashboard.html', context)
 
 @login_required
@@ -726,13 +787,28 @@ def add_staff_schedule(request):
         else: messages.error(request, "Lỗi nhập liệu.")
     else:
         form = StaffScheduleForm(initial={'date': timezone.now().date()})
-    context = {'page_title': 'Thêm Lịch làm việc', 'form': form}
+    outlook = forecast.get_forecast()
+    context = {'page_title': 'Thêm Lịch làm việc', 'form': form, 'forecast_days': outlook['days'][:14], 'forecast_rooms': outlook['rooms']}
     return render(request, 'pms/staff_schedule_form.html', context)
 
 @login_required
-def check_new_requests_count(request):
-    count = GuestRequest.objects.filter(status='New').count()
-    return JsonResponse({'count': count})
+def guest_lookup(request):
+    """Gợi ý khách cũ theo tiền tố CCCD/SĐT cho form đặt phòng (?q=...)"""
+    return JsonResponse({'results': lookup_guests(request.GET.get('q', ''))})
+
+def metrics_endpoint(request):
+    """Số liệu cho Prometheus (xem pms/metrics.py); 404 khi METRICS tắt.
+    Có METRICS_TOKEN thì cần header Bearer, không có thì chỉ nhân viên quản trị (is_staff) xem được:
+    gauge có công suất/doanh thu từng khách sạn nên không để công khai."""
+    config = settings.METRICS
+    if not config['ENABLED']:
+        raise Http404
+    if config['TOKEN']:
+        if request.headers.get('Authorization') != f"Bearer {config['TOKEN']}":
+            return HttpResponse(status=401, headers={'WWW-Authenticate': 'Bearer'})
+    elif not request.user.is_staff:
+        return HttpResponse(status=403)
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
 
 @login_required
 def manage_staff(request):
@@ -751,7 +827,7 @@ def manage_staff(request):
             return redirect('manage-staff')
         else: messages.error(request, f"Lỗi tạo nhân viên: {form.errors}")
     else: form = StaffUserForm()
-    staff_list = User.objects.all().order_by('-date_joined')
+    staff_list = get_catalog('staff').objects
     context = {'page_title': 'Quản lý Nhân sự & Phân quyền', 'staff_list': staff_list, 'form': form}
     return render(request, 'pms/manage_staff.html', context)
 
@@ -768,18 +844,26 @@ def delete_staff(request, user_id):
 @login_required
 def dashboard(request):
     rooms = Room.objects.all().order_by('room_number')
+    # Mỗi phòng chỉ cần booking sớm nhất của từng trạng thái: lọc bằng ROW_NUMBER() trong DB
+    # thay vì nạp mọi booking tương lai
     all_reservations = Reservation.objects.filter(
         status__in=['Confirmed', 'Occupied']
-    ).select_related('guest').order_by('check_in_date')
+    ).annotate(
+        rank=Window(RowNumber(), partition_by=[F('room_id'), F('status')], order_by=F('check_in_date').asc())
+    ).filter(rank=1).select_related('guest').order_by('check_in_date')
 
     room_data = []
     CHECKIN_ALERT_WINDOW = timezone.timedelta(minutes=30)
     now = timezone.now()
 
+    # Một truy vấn cho mọi phòng: ưu tiên booking Occupied, không có thì Confirmed sớm nhất
+    occupied_by_room, confirmed_by_room = {}, {}
+    for res in all_reservations:
+        (occupied_by_room if res.status == 'Occupied' else confirmed_by_room).setdefault(res.room_id, res)
+
+    versions = fragments.room_versions([room.id for room in rooms])
     for room in rooms:
-        current_res = all_reservations.filter(room=room, status='Occupied').first()
-        if not current_res:
-            current_res = all_reservations.filter(room=room, status='Confirmed').first()
+        current_res = occupied_by_room.get(room.id) or confirmed_by_room.get(room.id)
 
         is_alerting = False
         display_status = room.status 
@@ -808,7 +892,8 @@ def dashboard(request):
             'reservation': current_res,
             'guest_name': current_res.guest.full_name if current_res else "",
             'is_alerting': is_alerting,
-            'display_status': display_status 
+            'display_status': display_status,
+            'version': versions[room.id],
         }
         room_data.append(data)
 
@@ -825,7 +910,8 @@ def dashboard(request):
     context = {
         'page_title': "Dashboard Quản lý Phòng",
         'room_data': room_data,
-        'now': now
+        'now': now,
+        'fragment_timeout': fragments.timeout(),
     }
     
     # === QUAN TRỌNG: PHẢI CÓ DÒNG RETURN NÀY Ở CẤP ĐỘ NGOÀI CÙNG ===